@@ -0,0 +1,273 @@
+import cv2
+import numpy as np
+
+from metricas import medir
+
+# Emociones del modelo de DeepFace, en su orden de salida
+EMOCIONES = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+_emotion_model = None
+_nombre_motor = "deepface"
+_motor = None
+_detector_backend = None
+_escala_deteccion = 1.0
+
+
+def get_deepface():
+    """
+    Importa DeepFace (y con él TensorFlow) solo cuando se necesita
+    """
+    from deepface import DeepFace
+    return DeepFace
+
+
+def analizar_frame(frame, detector=None, **kwargs):
+    """
+    Ejecuta el análisis de emociones de DeepFace sobre una imagen BGR
+    y devuelve el resultado sin procesar.
+    """
+    detector = detector or get_deepface()
+    return detector.analyze(
+        frame,
+        actions=['emotion'],
+        enforce_detection=False,
+        **kwargs
+    )
+
+
+def interpretar_resultado(resultado):
+    """
+    Extrae la emoción dominante, su confianza y el diccionario de
+    emociones del resultado devuelto por DeepFace.
+    """
+    if isinstance(resultado, list):
+        res = resultado[0]
+    else:
+        res = resultado
+
+    dominant = res['dominant_emotion']
+    # DeepFace y los motores propios ya dan porcentajes (0-100)
+    confidence = res['emotion'][dominant] if 'emotion' in res else 0.0
+    return dominant, confidence, res.get('emotion', {})
+
+
+def interpretar_resultados(resultado):
+    """
+    Igual que interpretar_resultado pero para todas las caras: retorna una
+    lista de diccionarios con 'dominant_emotion', 'confidence', 'emotion',
+    'region' y 'face_id' (si existe).
+    """
+    if not isinstance(resultado, list):
+        resultado = [resultado]
+
+    caras = []
+    for res in resultado:
+        dominant, confidence, emotions = interpretar_resultado(res)
+        caras.append({
+            'face_id': res.get('face_id'),
+            'dominant_emotion': dominant,
+            'confidence': confidence,
+            'emotion': emotions,
+            'region': res.get('region'),
+        })
+    return caras
+
+
+def formatear_resultado(dominant, confidence):
+    """
+    Retorna el texto y el porcentaje tal como se muestran en pantalla
+    """
+    return f"{dominant.capitalize()}", f"{confidence:05.2f}%"
+
+
+def get_emotion_model():
+    """
+    Construye una sola vez el clasificador de emociones de DeepFace
+    """
+    global _emotion_model
+    if _emotion_model is None:
+        _emotion_model = get_deepface().build_model(model_name="Emotion", task="facial_attribute")
+    return _emotion_model
+
+
+def usar_motor(nombre):
+    """
+    Selecciona el clasificador de emociones: "deepface" (por defecto),
+    "keras" o "tflite" (ver motor_emociones). Se construye al usarse.
+    """
+    global _nombre_motor, _motor
+    _nombre_motor = nombre or "deepface"
+    _motor = None
+
+
+def usar_detector(detector_backend=None, escala=1.0):
+    """
+    Backend de detección de DeepFace (None = el predeterminado) y escala a
+    la que se reduce el frame antes de detectar (ver autotune_detector.py)
+    """
+    global _detector_backend, _escala_deteccion
+    _detector_backend = detector_backend
+    _escala_deteccion = escala or 1.0
+
+
+def configuracion_detector():
+    return _detector_backend, _escala_deteccion
+
+
+def get_motor():
+    """
+    Retorna el motor propio seleccionado, o None si se usa el de DeepFace
+    """
+    global _motor
+    if _motor is None and _nombre_motor != "deepface":
+        from motor_emociones import crear_motor
+        _motor = crear_motor(_nombre_motor)
+    return _motor
+
+
+def clases_motor():
+    """
+    Nombres de las emociones que produce el clasificador seleccionado, en
+    el orden de salida del modelo
+    """
+    if _nombre_motor == "deepface":
+        return EMOCIONES
+    if _motor is not None:
+        return _motor.clases
+    # Sin construir el modelo (puede estar cargándose en otro hilo)
+    from motor_emociones import cargar_clases
+    return cargar_clases()
+
+
+def preparar_cara(cara):
+    """
+    Convierte un recorte de cara a la entrada del clasificador (48x48 gris en
+    [0, 1]). Acepta recortes BGR uint8 del frame o caras RGB flotantes
+    devueltas por DeepFace.extract_faces.
+    """
+    if cara.dtype == np.uint8:
+        gray = cv2.cvtColor(cara, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+    else:
+        gray = cv2.cvtColor(cara.astype(np.float32), cv2.COLOR_RGB2GRAY)
+    return cv2.resize(gray, (48, 48))
+
+
+def clasificar_caras(caras):
+    """
+    Clasifica todas las caras en una sola llamada al modelo. Retorna una lista
+    de diccionarios emoción -> porcentaje, con el mismo formato que DeepFace.
+    """
+    if not caras:
+        return []
+    motor = get_motor()
+    if motor is not None:
+        return motor.clasificar_caras(caras)
+    from deepface.models.demography.Emotion import labels
+
+    lote = np.stack([preparar_cara(cara) for cara in caras])[..., np.newaxis]
+    predicciones = np.asarray(get_emotion_model().model(lote, training=False))
+
+    resultados = []
+    for pred in predicciones:
+        total = pred.sum() or 1.0
+        resultados.append({label: float(100 * p / total) for label, p in zip(labels, pred)})
+    return resultados
+
+
+def construir_resultado(emotions, region, face_confidence):
+    """
+    Arma un resultado por cara con el formato de DeepFace.analyze
+    """
+    return {
+        'emotion': emotions,
+        'dominant_emotion': max(emotions, key=emotions.get),
+        'region': region,
+        'face_confidence': face_confidence,
+    }
+
+
+def detectar_caras(frame, detector=None, detector_backend=None, escala=None):
+    """
+    Detecta las caras del frame con DeepFace.extract_faces. Con 'escala' < 1
+    la detección corre sobre una copia reducida del frame y las cajas se
+    llevan a la resolución original; 'face' es entonces el recorte BGR del
+    frame completo, no el de la copia reducida.
+    """
+    detector = detector or get_deepface()
+    detector_backend = detector_backend or _detector_backend
+    escala = escala or _escala_deteccion
+    kwargs = {}
+    if detector_backend:
+        kwargs["detector_backend"] = detector_backend
+    with medir("deteccion"):
+        if escala >= 1.0:
+            return detector.extract_faces(frame, enforce_detection=False, **kwargs)
+        reducido = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+        caras = detector.extract_faces(reducido, enforce_detection=False, **kwargs)
+
+    alto, ancho = frame.shape[:2]
+    for cara in caras:
+        area = cara['facial_area']
+        x0 = min(ancho - 1, max(0, int(area['x'] / escala)))
+        y0 = min(alto - 1, max(0, int(area['y'] / escala)))
+        x1 = min(ancho, max(x0 + 1, int(round((area['x'] + area['w']) / escala))))
+        y1 = min(alto, max(y0 + 1, int(round((area['y'] + area['h']) / escala))))
+        # Los puntos (ojos, nariz...) también vuelven a la escala original
+        puntos = {k: (int(v[0] / escala), int(v[1] / escala)) for k, v in area.items()
+                  if isinstance(v, (tuple, list)) and len(v) == 2}
+        cara['facial_area'] = dict(area, **puntos, x=x0, y=y0, w=x1 - x0, h=y1 - y0)
+        cara['face'] = frame[y0:y1, x0:x1]
+    return caras
+
+
+def construir_resultados(caras, emociones):
+    """
+    Une las caras de detectar_caras con sus emociones clasificadas
+    """
+    resultado = []
+    for cara, emotions in zip(caras, emociones):
+        area = cara['facial_area']
+        region = {'x': area['x'], 'y': area['y'], 'w': area['w'], 'h': area['h']}
+        resultado.append(construir_resultado(emotions, region, cara.get('confidence', 0)))
+    return resultado
+
+
+def analizar_caras(frame, detector=None, detector_backend=None):
+    """
+    Detecta todas las caras del frame y las clasifica en un único lote.
+    Retorna una lista con el mismo formato que DeepFace.analyze.
+    """
+    caras = detectar_caras(frame, detector=detector, detector_backend=detector_backend)
+    with medir("clasificacion"):
+        emociones = clasificar_caras([cara['face'] for cara in caras])
+    return construir_resultados(caras, emociones)
+
+
+def analizar_imagen(img_bgr, detector=None, detector_backend=None):
+    """
+    Analiza una imagen fija: detecta y clasifica todas sus caras y retorna
+    la lista de interpretar_resultados, numerando las caras desde 1.
+    """
+    resultado = analizar_caras(img_bgr, detector=detector, detector_backend=detector_backend)
+    for face_id, res in enumerate(resultado, start=1):
+        res['face_id'] = face_id
+    return interpretar_resultados(resultado)
+
+
+def cara_principal(caras):
+    """
+    Retorna la cara de mayor tamaño, o None si no hay caras
+    """
+    if not caras:
+        return None
+    return max(caras, key=lambda c: c['region']['w'] * c['region']['h'] if c['region'] else 0)
+
+
+def precalentar(detector_backend=None):
+    """
+    Carga los modelos y ejecuta una inferencia de prueba para que el primer
+    frame real no pague la inicialización de TensorFlow
+    """
+    if get_motor() is None:
+        get_emotion_model()
+    analizar_caras(np.zeros((240, 320, 3), np.uint8), detector_backend=detector_backend)
@@ -0,0 +1,191 @@
+"""
+Análisis de emociones sin interfaz sobre directorios o patrones de imágenes.
+
+Reparte la decodificación, detección y clasificación entre un grupo de
+procesos (cada uno carga el modelo una sola vez) y escribe cada resultado en
+JSONL o CSV en cuanto termina su imagen.
+
+Uso:
+    python analisis_lote.py fotos/ "otras/*.png" --procesos 4 --formato csv --salida resultados.csv
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from analisis import EMOCIONES
+from autotune_detector import RUTA_CONFIG, cargar_config
+from motor_emociones import MOTORES, cargar_clases
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+def buscar_imagenes(rutas):
+    """
+    Expande directorios (recursivamente) y patrones glob a una lista ordenada
+    de imágenes
+    """
+    encontradas = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for carpeta, _, archivos in os.walk(ruta):
+                encontradas.extend(os.path.join(carpeta, a) for a in archivos
+                                   if a.lower().endswith(EXTENSIONES))
+        else:
+            encontradas.extend(glob.glob(ruta, recursive=True))
+    return sorted(set(encontradas))
+
+
+def _iniciar_worker(detector_backend, escala, motor):
+    """
+    Se ejecuta una vez por proceso: configura el detector como la interfaz y
+    carga el modelo antes de recibir trabajo
+    """
+    from analisis import usar_detector, usar_motor, precalentar
+    usar_detector(detector_backend, escala)
+    usar_motor(motor)
+    precalentar()
+
+
+def analizar_ruta(ruta):
+    """
+    Analiza una imagen con la misma lógica que EmotionApp.load_image
+    """
+    import cv2
+    from analisis import analizar_imagen
+
+    inicio = time.perf_counter()
+    registro = {"imagen": ruta, "caras": [], "error": None}
+    img_bgr = cv2.imread(ruta)
+    if img_bgr is None:
+        registro["error"] = "No se pudo cargar la imagen"
+    else:
+        try:
+            registro["caras"] = analizar_imagen(img_bgr)
+        except Exception as e:
+            registro["error"] = f"Error al analizar: {e}"
+    registro["latencia_ms"] = (time.perf_counter() - inicio) * 1000
+    return registro
+
+
+def _a_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable: {type(obj)}")
+
+
+class EscritorJSONL:
+    def __init__(self, salida):
+        self.salida = salida
+
+    def escribir(self, registro):
+        self.salida.write(json.dumps(registro, default=_a_json, ensure_ascii=False) + "\n")
+        self.salida.flush()
+
+
+class EscritorCSV:
+    """
+    Una fila por cara (o una fila vacía si la imagen no tiene resultados)
+    """
+    campos = ["imagen", "face_id", "dominant_emotion", "confidence",
+              "x", "y", "w", "h", "latencia_ms", "error"]
+
+    def __init__(self, salida, emociones=EMOCIONES):
+        self.salida = salida
+        self.campos = self.campos + list(emociones)
+        self.writer = csv.DictWriter(salida, fieldnames=self.campos, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def escribir(self, registro):
+        base = {"imagen": registro["imagen"], "latencia_ms": f"{registro['latencia_ms']:.2f}",
+                "error": registro["error"] or ""}
+        if not registro["caras"]:
+            self.writer.writerow(base)
+        for cara in registro["caras"]:
+            fila = dict(base)
+            fila.update({
+                "face_id": cara["face_id"],
+                "dominant_emotion": cara["dominant_emotion"],
+                "confidence": f"{cara['confidence']:.4f}",
+            })
+            fila.update(cara["region"] or {})
+            fila.update({e: f"{v:.4f}" for e, v in cara["emotion"].items()})
+            self.writer.writerow(fila)
+        self.salida.flush()
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rutas", nargs="+", help="directorios o patrones glob de imágenes")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--formato", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--salida", help="archivo de salida (por defecto, la salida estándar)")
+    parser.add_argument("--detector-backend", default=None,
+                        help="backend de detección de DeepFace (opencv, mtcnn, retinaface...)")
+    parser.add_argument("--escala-deteccion", type=float,
+                        help="escala de la imagen al detectar (0.5 = mitad); las caras se recortan a resolución completa")
+    parser.add_argument("--config-detector", default=RUTA_CONFIG,
+                        help="configuración elegida por autotune_detector.py, si existe")
+    parser.add_argument("--motor", choices=MOTORES, default="deepface",
+                        help="clasificador de emociones (ver motor_emociones.py)")
+    args = parser.parse_args()
+
+    # El mismo detector que emociones.py: la configuración guardada, salvo
+    # lo que se indique en la línea de comandos
+    config = cargar_config(args.config_detector) or {}
+    detector_backend = args.detector_backend or config.get("detector_backend")
+    escala = args.escala_deteccion or config.get("escala", 1.0)
+
+    imagenes = buscar_imagenes(args.rutas)
+    if not imagenes:
+        print("No se encontraron imágenes.", file=sys.stderr)
+        return 1
+
+    salida = open(args.salida, "w", newline="", encoding="utf-8") if args.salida else sys.stdout
+    if args.formato == "csv":
+        # El modelo propio tiene sus propias clases
+        escritor = EscritorCSV(salida, EMOCIONES if args.motor == "deepface" else cargar_clases())
+    else:
+        escritor = EscritorJSONL(salida)
+
+    # 'spawn' evita heredar el estado de TensorFlow del proceso principal
+    contexto = multiprocessing.get_context("spawn")
+    latencias = []
+    errores = 0
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procesos, mp_context=contexto,
+                             initializer=_iniciar_worker,
+                             initargs=(detector_backend, escala, args.motor)) as pool:
+        futuros = [pool.submit(analizar_ruta, ruta) for ruta in imagenes]
+        for futuro in as_completed(futuros):
+            registro = futuro.result()
+            latencias.append(registro["latencia_ms"])
+            errores += registro["error"] is not None
+            escritor.escribir(registro)
+    total = time.perf_counter() - inicio
+
+    if args.salida:
+        salida.close()
+
+    print(f"{len(imagenes)} imágenes ({errores} con error) en {total:.2f}s "
+          f"con {args.procesos} procesos", file=sys.stderr)
+    print(f"Rendimiento: {len(imagenes) / total:.2f} imágenes/s", file=sys.stderr)
+    print(f"Latencia por imagen: media {np.mean(latencias):.1f} ms, "
+          f"p50 {percentil(latencias, 50):.1f} ms, p95 {percentil(latencias, 95):.1f} ms",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Autoajuste del detector de caras: prueba cada backend de DeepFace disponible
+(opencv, mtcnn, retinaface...) a varias escalas de detección sobre un
+conjunto pequeño de imágenes etiquetadas, y elige la configuración más
+rápida que alcanza el recall objetivo. La elección se guarda en
+detector_config.json, que emociones.py carga al iniciar.
+
+Las etiquetas son un JSON en la carpeta de calibración con las cajas de las
+caras de cada imagen (rutas relativas a la carpeta):
+
+    {"foto1.jpg": [[x, y, w, h], ...], "foto2.png": []}
+
+--etiquetar genera ese archivo con un backend de referencia a escala
+completa, para revisarlo a mano antes de calibrar.
+
+Uso:
+    python autotune_detector.py calibracion/ --etiquetar retinaface
+    python autotune_detector.py calibracion/ --recall 0.9 --escalas 1 0.75 0.5 0.35
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from analisis import detectar_caras, usar_detector
+from seguimiento import iou
+
+BACKENDS = ["opencv", "ssd", "yunet", "mediapipe", "mtcnn", "retinaface", "centerface", "yolov8"]
+ESCALAS = [1.0, 0.75, 0.5, 0.35, 0.25]
+RUTA_CONFIG = "detector_config.json"
+ETIQUETAS = "etiquetas.json"
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+
+
+def cajas_detectadas(caras):
+    """
+    Cajas de las caras reales (sin cara, DeepFace devuelve el frame completo
+    con confianza 0)
+    """
+    cajas = []
+    for cara in caras:
+        if not cara.get('confidence'):
+            continue
+        area = cara['facial_area']
+        cajas.append({'x': area['x'], 'y': area['y'], 'w': area['w'], 'h': area['h']})
+    return cajas
+
+
+def emparejar(predichas, reales, min_iou=0.5):
+    """
+    Número de caras reales encontradas (emparejamiento voraz por IoU)
+    """
+    pares = sorted(((iou(p, r), i, j) for i, p in enumerate(predichas) for j, r in enumerate(reales)),
+                   reverse=True)
+    usadas_p, usadas_r = set(), set()
+    for score, i, j in pares:
+        if score < min_iou:
+            break
+        if i in usadas_p or j in usadas_r:
+            continue
+        usadas_p.add(i)
+        usadas_r.add(j)
+    return len(usadas_r)
+
+
+def cargar_calibracion(carpeta, etiquetas=ETIQUETAS):
+    """
+    Lista de (ruta, imagen BGR, cajas reales) de las imágenes etiquetadas
+    """
+    with open(os.path.join(carpeta, etiquetas), encoding="utf-8") as f:
+        datos = json.load(f)
+    imagenes = []
+    for nombre, cajas in sorted(datos.items()):
+        ruta = os.path.join(carpeta, nombre)
+        img = cv2.imread(ruta)
+        if img is None:
+            print(f"No se pudo cargar {ruta}; se omite", file=sys.stderr)
+            continue
+        imagenes.append((ruta, img, [{'x': x, 'y': y, 'w': w, 'h': h} for x, y, w, h in cajas]))
+    return imagenes
+
+
+def etiquetar(carpeta, backend, etiquetas=ETIQUETAS):
+    """
+    Genera las etiquetas con 'backend' a escala completa
+    """
+    datos = {}
+    for nombre in sorted(os.listdir(carpeta)):
+        if not nombre.lower().endswith(EXTENSIONES):
+            continue
+        img = cv2.imread(os.path.join(carpeta, nombre))
+        if img is None:
+            continue
+        cajas = cajas_detectadas(detectar_caras(img, detector_backend=backend, escala=1.0))
+        datos[nombre] = [[c['x'], c['y'], c['w'], c['h']] for c in cajas]
+    with open(os.path.join(carpeta, etiquetas), "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2)
+    return datos
+
+
+def disponible(backend):
+    """
+    Retorna None si el backend funciona, o el motivo por el que no
+    """
+    try:
+        detectar_caras(np.zeros((120, 160, 3), np.uint8), detector_backend=backend, escala=1.0)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def evaluar_configuracion(imagenes, backend, escala, min_iou=0.5):
+    """
+    Recall, precisión y latencia de detección de una configuración
+    """
+    # Calentamiento: el primer uso construye el modelo del backend
+    detectar_caras(imagenes[0][1], detector_backend=backend, escala=escala)
+    latencias = []
+    encontradas = reales = predichas = 0
+    for _, img, cajas in imagenes:
+        inicio = time.perf_counter()
+        caras = detectar_caras(img, detector_backend=backend, escala=escala)
+        latencias.append(time.perf_counter() - inicio)
+        detectadas = cajas_detectadas(caras)
+        encontradas += emparejar(detectadas, cajas, min_iou)
+        reales += len(cajas)
+        predichas += len(detectadas)
+    ms = np.array(latencias) * 1000
+    return {
+        "detector_backend": backend,
+        "escala": escala,
+        "recall": encontradas / reales if reales else 1.0,
+        "precision": encontradas / predichas if predichas else 1.0,
+        "latencia_ms": float(ms.mean()),
+        "p95_ms": float(np.percentile(ms, 95)),
+    }
+
+
+def elegir(resultados, objetivo):
+    """
+    La configuración más rápida que cumple el recall objetivo o, si
+    ninguna lo cumple, la de mayor recall
+    """
+    validas = [r for r in resultados if r["recall"] >= objetivo]
+    if validas:
+        return min(validas, key=lambda r: r["latencia_ms"])
+    return max(resultados, key=lambda r: (r["recall"], -r["latencia_ms"]))
+
+
+def cargar_config(ruta=RUTA_CONFIG):
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolver_config(ruta=RUTA_CONFIG, detector_backend=None, escala=None):
+    """
+    (backend, escala) de la elección guardada, si existe, salvo lo que se
+    indique explícitamente (opciones de línea de comandos)
+    """
+    config = cargar_config(ruta) or {}
+    return (detector_backend or config.get("detector_backend"),
+            escala or config.get("escala", 1.0))
+
+
+def aplicar_config(ruta=RUTA_CONFIG, detector_backend=None, escala=None):
+    """
+    Configura analisis con la elección guardada y retorna (backend, escala)
+    """
+    backend, escala = resolver_config(ruta, detector_backend, escala)
+    usar_detector(backend, escala)
+    return backend, escala
+
+
+def agregar_argumentos_detector(parser):
+    """
+    Opciones del detector comunes a los modos sin interfaz
+    """
+    parser.add_argument("--detector-backend",
+                        help="backend de detección de DeepFace (opencv, mtcnn, retinaface...)")
+    parser.add_argument("--escala-deteccion", type=float,
+                        help="escala de la imagen al detectar (0.5 = mitad); las caras se recortan a resolución completa")
+    parser.add_argument("--config-detector", default=RUTA_CONFIG,
+                        help="configuración elegida por autotune_detector.py, si existe")
+
+
+def aplicar_argumentos_detector(args):
+    return aplicar_config(args.config_detector, args.detector_backend, args.escala_deteccion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpeta", help="carpeta de calibración con imágenes y etiquetas.json")
+    parser.add_argument("--etiquetar", metavar="BACKEND", help="generar etiquetas.json con este backend y salir")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS)
+    parser.add_argument("--escalas", type=float, nargs="+", default=ESCALAS)
+    parser.add_argument("--recall", type=float, default=0.9, help="recall mínimo aceptable")
+    parser.add_argument("--min-iou", type=float, default=0.5)
+    parser.add_argument("--salida", default=RUTA_CONFIG)
+    args = parser.parse_args()
+
+    if args.etiquetar:
+        datos = etiquetar(args.carpeta, args.etiquetar)
+        print(f"{sum(map(len, datos.values()))} caras en {len(datos)} imágenes; revisa "
+              f"{os.path.join(args.carpeta, ETIQUETAS)} antes de calibrar")
+        return 0
+
+    imagenes = cargar_calibracion(args.carpeta)
+    if not imagenes:
+        print("No hay imágenes etiquetadas.", file=sys.stderr)
+        return 1
+
+    print(f"{len(imagenes)} imágenes, {sum(len(c) for _, _, c in imagenes)} caras; recall objetivo {args.recall:.0%}")
+    print(f"{'backend':>12} | {'escala':>6} | {'recall':>6} | {'precisión':>9} | {'media ms':>8} | {'p95 ms':>7}")
+    print("-" * 64)
+    resultados = []
+    for backend in args.backends:
+        motivo = disponible(backend)
+        if motivo:
+            print(f"{backend:>12} | no disponible ({motivo[:60]})")
+            continue
+        for escala in args.escalas:
+            r = evaluar_configuracion(imagenes, backend, escala, args.min_iou)
+            resultados.append(r)
+            print(f"{backend:>12} | {escala:>6.2f} | {r['recall']:>6.1%} | {r['precision']:>9.1%} | "
+                  f"{r['latencia_ms']:>8.1f} | {r['p95_ms']:>7.1f}")
+    if not resultados:
+        print("Ningún backend está disponible.", file=sys.stderr)
+        return 1
+
+    eleccion = elegir(resultados, args.recall)
+    config = dict(eleccion, recall_objetivo=args.recall, imagenes=len(imagenes),
+                  cumple_objetivo=eleccion["recall"] >= args.recall, resultados=resultados)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    aviso = "" if config["cumple_objetivo"] else " (ninguna cumple el objetivo; se eligió la de mayor recall)"
+    print(f"\nElegido: {eleccion['detector_backend']} a escala {eleccion['escala']:g} "
+          f"({eleccion['latencia_ms']:.1f} ms, recall {eleccion['recall']:.1%}){aviso}")
+    print(f"Guardado en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark de arranque: mide en procesos nuevos (arranque en frío) el tiempo
+hasta que la ventana se pinta, hasta que los modelos quedan listos y hasta
+la primera inferencia sobre un frame sintético.
+
+Necesita un servidor gráfico (o Xvfb: xvfb-run python bench_arranque.py).
+
+Uso:
+    python bench_arranque.py --repeticiones 5
+"""
+import time
+
+_INICIO = time.perf_counter()
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+def medir_arranque():
+    """
+    Se ejecuta en el proceso hijo y retorna los tiempos en segundos
+    """
+    import tkinter as tk
+    import numpy as np
+    from emociones import EmotionApp
+
+    tiempos = {"importacion": time.perf_counter() - _INICIO}
+
+    root = tk.Tk()
+    app = EmotionApp(root)
+    root.update()
+    tiempos["ventana"] = time.perf_counter() - _INICIO
+
+    while not app.models_ready.is_set():
+        root.update()
+        time.sleep(0.005)
+    root.update()
+    tiempos["modelos_listos"] = time.perf_counter() - _INICIO
+
+    frame = np.random.default_rng(0).integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    app.analyze_frame(frame)
+    tiempos["primera_inferencia"] = time.perf_counter() - _INICIO
+
+    root.destroy()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(medir_arranque()))
+        return 0
+
+    resultados = []
+    for i in range(args.repeticiones):
+        salida = subprocess.run([sys.executable, __file__, "--hijo"],
+                                capture_output=True, text=True, check=True)
+        resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        print(f"Ejecución {i + 1}: " + ", ".join(f"{k} {v:.2f}s" for k, v in resultados[-1].items()))
+
+    print("Mediana:")
+    for clave in resultados[0]:
+        valores = sorted(r[clave] for r in resultados)
+        print(f"  {clave}: {valores[len(valores) // 2]:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Benchmark del camino de cada frame de la webcam, sin interfaz: pasa frames
+sintéticos (o de un video grabado) a 480p, 720p y 1080p por las mismas
+etapas que update_frame y mide el rendimiento y la memoria de cada una.
+
+Etapas:
+    analyze_<backend>        DeepFace.analyze con ese detector (camino original)
+    analizar_caras_<backend> detección + clasificación en lote (analisis.py)
+    conversion               redimensión + BGR->RGB en búferes (Pantalla.preparar)
+    dibujo                   draw_emotion_display
+    tk                       Pantalla.mostrar (si hay servidor gráfico)
+    pil                      Image.fromarray (si no lo hay)
+
+draw_emotion_display se llama sobre una EmotionApp sin ventana; el tamaño del
+display es fijo, como si Tk hubiera enviado un único <Configure>.
+
+Uso:
+    python bench_frames.py --salida resultados.json
+    python bench_frames.py --guardar-base bench_frames_base.json
+    python bench_frames.py --comparar bench_frames_base.json --tolerancia 0.15
+    python bench_frames.py --video sesion.mp4 --backends opencv ssd
+    python bench_frames.py --sin-deepface --resoluciones 720p
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from overlay import OverlayRenderer
+from pantalla import Pantalla
+
+RESOLUCIONES = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+BACKENDS = ["opencv", "ssd", "mtcnn", "retinaface", "mediapipe", "yunet"]
+
+
+def app_sin_ventana(ancho=880, alto=560, root=None):
+    """
+    EmotionApp sin ventana, suficiente para el camino de display. La
+    Pantalla solo tiene un Label real si hay una raíz de Tk.
+    """
+    from emociones import EmotionApp
+    app = EmotionApp.__new__(EmotionApp)
+    app.overlay = OverlayRenderer()
+    if root is not None:
+        import tkinter as tk
+        app.pantalla = Pantalla(tk.Label(root))
+    else:
+        app.pantalla = Pantalla(None)
+    app.pantalla.configurar(ancho, alto)
+    return app
+
+
+def frames_sinteticos(ancho, alto, n, rng):
+    """
+    Genera 'n' frames BGR con fondo, ruido de sensor y una cara dibujada que
+    se desplaza entre frames
+    """
+    fondo = np.zeros((alto, ancho, 3), np.uint8)
+    fondo[:] = np.linspace(40, 120, ancho, dtype=np.uint8)[None, :, None]
+    frames = []
+    for i in range(n):
+        frame = fondo.copy()
+        r = alto // 6
+        cx = ancho // 2 + int(ancho * 0.2 * np.sin(i / n * 2 * np.pi))
+        cy = alto // 2
+        cv2.ellipse(frame, (cx, cy), (r, int(r * 1.3)), 0, 0, 360, (140, 170, 215), -1)
+        for dx in (-r // 2, r // 2):
+            cv2.circle(frame, (cx + dx, cy - r // 3), max(2, r // 8), (40, 40, 40), -1)
+        cv2.ellipse(frame, (cx, cy + r // 2), (r // 2, r // 5), 0, 0, 180, (60, 60, 150), max(2, r // 15))
+        ruido = rng.integers(-8, 9, size=frame.shape, dtype=np.int16)
+        frames.append(np.clip(frame.astype(np.int16) + ruido, 0, 255).astype(np.uint8))
+    return frames
+
+
+def frames_de_video(ruta, ancho, alto, n):
+    cap = cv2.VideoCapture(ruta)
+    frames = []
+    try:
+        while len(frames) < n:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, (ancho, alto), interpolation=cv2.INTER_AREA))
+    finally:
+        cap.release()
+    if not frames:
+        raise IOError(f"No se pudieron leer frames de {ruta}")
+    return frames
+
+
+def medir_etapa(fn, entradas, repeticiones, calentamiento=2, muestras_memoria=5):
+    """
+    Ejecuta fn sobre las entradas (de forma cíclica) y retorna latencias en ms,
+    rendimiento en llamadas/s y memoria según tracemalloc. La memoria se mide
+    en una pasada aparte para que tracemalloc no altere los tiempos.
+    """
+    for i in range(calentamiento):
+        fn(entradas[i % len(entradas)])
+
+    tiempos = np.empty(repeticiones)
+    inicio_total = time.perf_counter()
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(entradas[i % len(entradas)])
+        tiempos[i] = time.perf_counter() - inicio
+    total = time.perf_counter() - inicio_total
+
+    tracemalloc.start()
+    antes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for i in range(muestras_memoria):
+        fn(entradas[i % len(entradas)])
+    despues, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": float(np.percentile(tiempos, 50) * 1000),
+        "p95_ms": float(np.percentile(tiempos, 95) * 1000),
+        "media_ms": float(tiempos.mean() * 1000),
+        "por_segundo": repeticiones / total,
+        "pico_kb": (pico - antes) / 1024,
+        "retenido_kb": (despues - antes) / 1024,
+    }
+
+
+def crear_tk():
+    """
+    Retorna una raíz de Tk oculta o None si no hay servidor gráfico
+    """
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    return root
+
+
+def etapas_display(app, root):
+    """
+    Etapas del frame posteriores a la inferencia, en el orden de show_frame
+    """
+    etapas = {
+        "conversion": lambda f: app.pantalla.preparar(f)[0],
+        "dibujo": lambda f: app.draw_emotion_display(f, "Happy", "87.50%"),
+    }
+    if root is not None:
+        etapas["tk"] = app.pantalla.mostrar
+    else:
+        etapas["pil"] = Image.fromarray
+    return etapas
+
+
+def etapas_inferencia(backends):
+    from analisis import analizar_caras, analizar_frame, get_deepface
+    detector = get_deepface()
+    etapas = {}
+    for backend in backends:
+        etapas[f"analyze_{backend}"] = (
+            lambda f, b=backend: analizar_frame(f, detector=detector, detector_backend=b))
+        etapas[f"analizar_caras_{backend}"] = (
+            lambda f, b=backend: analizar_caras(f, detector=detector, detector_backend=b))
+    return etapas
+
+
+def ejecutar(args):
+    rng = np.random.default_rng(0)
+    root = None if args.sin_tk else crear_tk()
+    app = app_sin_ventana(*args.display, root=root)
+    inferencia = {} if args.sin_deepface else etapas_inferencia(args.backends)
+
+    resultados = {}
+    for nombre in args.resoluciones:
+        ancho, alto = RESOLUCIONES[nombre]
+        if args.video:
+            frames = frames_de_video(args.video, ancho, alto, args.frames)
+        else:
+            frames = frames_sinteticos(ancho, alto, args.frames, rng)
+        resultados[nombre] = etapas = {}
+
+        for etapa, fn in inferencia.items():
+            try:
+                etapas[etapa] = medir_etapa(fn, frames, args.repeticiones_inferencia)
+            except Exception as e:
+                # El backend no está instalado o falló al cargar
+                etapas[etapa] = {"error": f"{type(e).__name__}: {e}"}
+            imprimir(nombre, etapa, etapas[etapa])
+
+        # Cada etapa de display recibe la salida de la anterior, como en show_frame
+        entradas = frames
+        for etapa, fn in etapas_display(app, root).items():
+            etapas[etapa] = medir_etapa(fn, entradas, args.repeticiones)
+            imprimir(nombre, etapa, etapas[etapa])
+            # Copias: Pantalla.preparar devuelve siempre el mismo búfer
+            entradas = [np.array(fn(e.copy())) for e in entradas]
+
+    if root is not None:
+        root.destroy()
+    return {
+        "maquina": {
+            "plataforma": platform.platform(),
+            "procesador": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "config": {
+            "fuente": args.video or "sintetica",
+            "display": list(args.display),
+            "frames": args.frames,
+            "repeticiones": args.repeticiones,
+            "repeticiones_inferencia": args.repeticiones_inferencia,
+            "tk": root is not None,
+        },
+        "resultados": resultados,
+    }
+
+
+def imprimir(resolucion, etapa, datos):
+    if "error" in datos:
+        print(f"{resolucion:>6} {etapa:<28} error: {datos['error']}")
+        return
+    print(f"{resolucion:>6} {etapa:<28} p50 {datos['p50_ms']:8.2f} ms  p95 {datos['p95_ms']:8.2f} ms  "
+          f"{datos['por_segundo']:9.1f}/s  pico {datos['pico_kb']:9.1f} KB  retenido {datos['retenido_kb']:7.1f} KB")
+
+
+def comparar(actual, base, tolerancia, margen_kb=64):
+    """
+    Retorna la lista de regresiones: etapas cuya p50 o memoria pico supera a
+    la de la línea base en más de 'tolerancia' (fracción)
+    """
+    regresiones = []
+    for resolucion, etapas in actual["resultados"].items():
+        for etapa, datos in etapas.items():
+            previo = base.get("resultados", {}).get(resolucion, {}).get(etapa)
+            if not previo or "error" in previo or "error" in datos:
+                continue
+            if datos["p50_ms"] > previo["p50_ms"] * (1 + tolerancia):
+                regresiones.append(f"{resolucion} {etapa}: p50 {previo['p50_ms']:.2f} -> {datos['p50_ms']:.2f} ms")
+            if datos["pico_kb"] > previo["pico_kb"] * (1 + tolerancia) + margen_kb:
+                regresiones.append(f"{resolucion} {etapa}: pico {previo['pico_kb']:.0f} -> {datos['pico_kb']:.0f} KB")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resoluciones", nargs="+", choices=list(RESOLUCIONES), default=list(RESOLUCIONES))
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, help="detectores de DeepFace a comparar")
+    parser.add_argument("--video", help="usar frames de un video grabado en lugar de sintéticos")
+    parser.add_argument("--frames", type=int, default=30, help="frames distintos por resolución")
+    parser.add_argument("--repeticiones", type=int, default=200, help="llamadas por etapa de display")
+    parser.add_argument("--repeticiones-inferencia", type=int, default=20, help="llamadas por etapa de DeepFace")
+    parser.add_argument("--display", type=int, nargs=2, default=(880, 560), metavar=("ANCHO", "ALTO"),
+                        help="tamaño del display_frame simulado")
+    parser.add_argument("--sin-deepface", action="store_true", help="medir solo las etapas de display")
+    parser.add_argument("--sin-tk", action="store_true", help="no medir ImageTk aunque haya servidor gráfico")
+    parser.add_argument("--salida", help="archivo JSON con los resultados")
+    parser.add_argument("--guardar-base", metavar="RUTA", help="guardar los resultados como línea base")
+    parser.add_argument("--comparar", metavar="RUTA", help="comparar contra una línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.15,
+                        help="empeoramiento relativo permitido antes de marcar una regresión")
+    args = parser.parse_args()
+
+    actual = ejecutar(args)
+    for ruta in (args.salida, args.guardar_base):
+        if ruta:
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(actual, f, indent=2)
+            print(f"Resultados guardados en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(actual, base, args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones respecto a {args.comparar}:")
+            for linea in regresiones:
+                print(f"  {linea}")
+            return 1
+        print(f"\nSin regresiones respecto a {args.comparar} (tolerancia {args.tolerancia:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
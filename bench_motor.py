@@ -0,0 +1,96 @@
+"""
+Benchmark del motor propio: compara latencia y precisión del modelo Keras
+(my_emotion_model.h5) contra su exportación cuantizada en TFLite, usando la
+partición de validación del dataset (el primer 20% de cada clase, igual que
+flow_from_directory con validation_split=0.2).
+
+Uso:
+    python motor_emociones.py exportar --cuantizacion dinamica
+    python bench_motor.py --datos dataset/ --lotes 1 8 32
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from motor_emociones import MotorKeras, MotorTFLite, RUTA_TFLITE, preprocesar
+
+
+def cargar_validacion(dataset, fraccion=0.2, maximo=None):
+    """
+    Retorna (imágenes BGR, nombres de clase) de la partición de validación
+    """
+    imagenes, etiquetas = [], []
+    for clase in sorted(os.listdir(dataset)):
+        carpeta = os.path.join(dataset, clase)
+        if not os.path.isdir(carpeta):
+            continue
+        archivos = sorted(a for a in os.listdir(carpeta) if a.lower().endswith((".jpg", ".jpeg", ".png")))
+        for archivo in archivos[:int(fraccion * len(archivos))]:
+            img = cv2.imread(os.path.join(carpeta, archivo))
+            if img is not None:
+                imagenes.append(img)
+                etiquetas.append(clase)
+    if maximo:
+        imagenes, etiquetas = imagenes[:maximo], etiquetas[:maximo]
+    return imagenes, etiquetas
+
+
+def latencia(motor, imagenes, tamano_lote, repeticiones):
+    """
+    Mediana en ms de preprocesar + predecir un lote
+    """
+    lote = (imagenes * (tamano_lote // len(imagenes) + 1))[:tamano_lote]
+    motor.predecir(preprocesar(lote))  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        motor.predecir(preprocesar(lote))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return float(np.median(tiempos))
+
+
+def predecir_todo(motor, imagenes, tamano_lote=32):
+    predicciones = [motor.predecir(preprocesar(imagenes[i:i + tamano_lote]))
+                    for i in range(0, len(imagenes), tamano_lote)]
+    return np.concatenate(predicciones)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datos", default="dataset/")
+    parser.add_argument("--tflite", default=RUTA_TFLITE)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--max-imagenes", type=int, default=None)
+    args = parser.parse_args()
+
+    imagenes, etiquetas = cargar_validacion(args.datos, maximo=args.max_imagenes)
+    if not imagenes:
+        print(f"No hay imágenes de validación en {args.datos}")
+        return 1
+    motores = [MotorKeras(), MotorTFLite(args.tflite)]
+    print(f"{len(imagenes)} imágenes de validación; TFLite: {os.path.getsize(args.tflite) / 1e6:.1f} MB")
+
+    print(f"\n{'motor':>7} | " + " | ".join(f"lote {n:>3} (ms/img)" for n in args.lotes))
+    for motor in motores:
+        celdas = [latencia(motor, imagenes, n, args.repeticiones) / n for n in args.lotes]
+        print(f"{motor.nombre:>7} | " + " | ".join(f"{c:>18.2f}" for c in celdas))
+
+    predicciones = {motor.nombre: predecir_todo(motor, imagenes) for motor in motores}
+    print()
+    for motor in motores:
+        indices = np.array([motor.clases.index(e) for e in etiquetas])
+        precision = np.mean(predicciones[motor.nombre].argmax(axis=1) == indices)
+        print(f"Precisión {motor.nombre}: {100 * precision:.2f}%")
+    keras, tflite = predicciones["keras"], predicciones["tflite"]
+    print(f"Coincidencia top-1 Keras/TFLite: {100 * np.mean(keras.argmax(1) == tflite.argmax(1)):.2f}%")
+    print(f"Diferencia media de probabilidad: {np.abs(keras - tflite).mean():.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
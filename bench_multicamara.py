@@ -0,0 +1,174 @@
+"""
+Benchmark de multicamara.py: fps de inferencia agregados y por fuente, CPU y
+memoria con 1, 2, 4 y 8 cámaras simuladas, comparando el trabajador
+compartido por turnos (con lotes) contra un trabajador independiente por
+fuente (como abrir N FramePipeline).
+
+Las cámaras son sintéticas (una "cara" que se mueve sobre un degradado, al
+ritmo de --fps). Con --simulado la detección y la clasificación son esperas
+con el costo indicado, serializadas como un modelo que atiende una llamada a
+la vez; sin él se usa el modelo real.
+
+Uso:
+    python bench_multicamara.py --fuentes 1 2 4 8 --duracion 5 --simulado
+    python bench_multicamara.py --fuentes 1 4 --motor tflite
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from multicamara import Flujo, InferenciaCompartida
+
+RESOLUCIONES = {"480p": (640, 480), "720p": (1280, 720)}
+
+
+class CamaraSintetica:
+    """
+    Imita un cv2.VideoCapture: genera frames en movimiento a 'fps'
+    """
+
+    def __init__(self, ancho=640, alto=480, fps=30.0, semilla=0):
+        y, x = np.mgrid[0:alto, 0:ancho]
+        self.fondo = np.dstack([x * 255 // ancho, y * 255 // alto, np.full_like(x, 128)]).astype(np.uint8)
+        self.frame = np.empty_like(self.fondo)
+        self.periodo = 1.0 / fps
+        self.fase = semilla
+        self.siguiente = None
+
+    def read(self):
+        ahora = time.monotonic()
+        if self.siguiente is not None and self.siguiente > ahora:
+            time.sleep(self.siguiente - ahora)
+        self.siguiente = max(ahora, self.siguiente or ahora) + self.periodo
+        self.fase += 1
+        alto, ancho = self.fondo.shape[:2]
+        centro = (int(ancho / 2 + ancho / 4 * np.sin(self.fase / 15)), alto // 2)
+        frame = self.fondo.copy()
+        cv2.ellipse(frame, centro, (ancho // 10, alto // 6), 0, 0, 360, (150, 180, 220), -1)
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def funciones_simuladas(caras, deteccion_ms, llamada_ms, cara_ms):
+    """
+    Detector y clasificador que solo esperan, de a una llamada a la vez
+    """
+    modelo = threading.Lock()
+    recorte = np.zeros((48, 48, 3), np.uint8)
+
+    def detectar(frame):
+        with modelo:
+            time.sleep(deteccion_ms / 1000)
+        return [{'face': recorte, 'facial_area': {'x': 40 * i, 'y': 0, 'w': 48, 'h': 48}, 'confidence': 1.0}
+                for i in range(caras)]
+
+    def clasificar(recortes):
+        with modelo:
+            time.sleep((llamada_ms + cara_ms * len(recortes)) / 1000)
+        return [{'neutral': 60.0, 'happy': 40.0} for _ in recortes]
+
+    return detectar, clasificar
+
+
+def medir(n, modo, args, detectar, clasificar):
+    """
+    Ejecuta 'n' fuentes durante args.duracion segundos
+    """
+    ancho, alto = RESOLUCIONES[args.resolucion]
+    tracemalloc.start()
+    flujos = [Flujo(f"cam{i}", CamaraSintetica(ancho, alto, args.fps, semilla=7 * i),
+                    reutilizar=args.reutilizar) for i in range(n)]
+    if modo == "compartido":
+        trabajadores = [InferenciaCompartida(flujos, args.lote, detectar, clasificar)]
+    else:
+        trabajadores = [InferenciaCompartida([f], 1, detectar, clasificar) for f in flujos]
+
+    inicio, cpu = time.monotonic(), time.process_time()
+    for flujo in flujos:
+        flujo.inicio = inicio
+        flujo.captura.start()
+    for trabajador in trabajadores:
+        trabajador.start()
+    time.sleep(args.duracion)
+    for flujo in flujos:
+        flujo.captura.stop()
+    for trabajador in trabajadores:
+        trabajador.stop()
+    for hilo in [f.captura for f in flujos] + trabajadores:
+        hilo.join(1.0)
+    transcurrido = time.monotonic() - inicio
+    cpu = (time.process_time() - cpu) / transcurrido
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    por_fuente = [f.analizados / transcurrido for f in flujos]
+    lotes = sum(t.lotes for t in trabajadores)
+    return {
+        "fuentes": n,
+        "modo": modo,
+        "fps_total": sum(por_fuente),
+        "fps_min": min(por_fuente),
+        "fps_max": max(por_fuente),
+        "lote_medio": sum(t.frames for t in trabajadores) / lotes if lotes else 0.0,
+        "cpu": cpu,
+        "memoria_pico_mb": pico / 1e6,
+        "hilos": len(flujos) + len(trabajadores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fuentes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modos", nargs="+", choices=["compartido", "independiente"],
+                        default=["compartido", "independiente"])
+    parser.add_argument("--duracion", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=30.0, help="fps de cada cámara")
+    parser.add_argument("--resolucion", choices=RESOLUCIONES, default="480p")
+    parser.add_argument("--lote", type=int, default=8)
+    parser.add_argument("--reutilizar", action="store_true",
+                        help="reutilizar resultados de frames sin cambios (oculta el costo de inferencia)")
+    parser.add_argument("--motor", default=None)
+    parser.add_argument("--simulado", action="store_true", help="detector y clasificador simulados")
+    parser.add_argument("--caras", type=int, default=1, help="caras por frame (simulado)")
+    parser.add_argument("--deteccion-ms", type=float, default=10.0, help="costo de detección (simulado)")
+    parser.add_argument("--llamada-ms", type=float, default=15.0, help="costo fijo por lote (simulado)")
+    parser.add_argument("--cara-ms", type=float, default=1.0, help="costo por cara del lote (simulado)")
+    parser.add_argument("--salida", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    if args.simulado:
+        detectar, clasificar = funciones_simuladas(args.caras, args.deteccion_ms, args.llamada_ms, args.cara_ms)
+    else:
+        from analisis import precalentar, usar_motor
+        usar_motor(args.motor)
+        precalentar()
+        detectar = clasificar = None
+
+    print(f"{'fuentes':>7} | {'modo':>13} | {'fps total':>9} | {'fps mín':>7} | {'fps máx':>7} | "
+          f"{'lote':>4} | {'cpu':>5} | {'memoria MB':>10} | {'hilos':>5}")
+    print("-" * 92)
+    filas = []
+    for n in args.fuentes:
+        for modo in args.modos:
+            fila = medir(n, modo, args, detectar, clasificar)
+            filas.append(fila)
+            print(f"{n:>7} | {modo:>13} | {fila['fps_total']:>9.1f} | {fila['fps_min']:>7.1f} | "
+                  f"{fila['fps_max']:>7.1f} | {fila['lote_medio']:>4.1f} | {fila['cpu']:>5.0%} | "
+                  f"{fila['memoria_pico_mb']:>10.1f} | {fila['hilos']:>5}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(filas, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Benchmark: rendimiento de la clasificación de emociones según el número de
+caras por frame, comparando una llamada al modelo por cara contra una única
+llamada por lote (clasificar_caras).
+
+Uso:
+    python bench_multicara.py --caras 1 2 4 8 16 --repeticiones 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from analisis import clasificar_caras, get_emotion_model
+
+
+def caras_sinteticas(n, rng):
+    """
+    Genera 'n' recortes BGR uint8 de tamaños variados
+    """
+    return [
+        rng.integers(0, 256, size=(int(s), int(s), 3), dtype=np.uint8)
+        for s in rng.integers(80, 240, size=n)
+    ]
+
+
+def medir(fn, repeticiones):
+    fn()  # calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caras", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    get_emotion_model()
+
+    print(f"{'caras':>5} | {'por cara (ms)':>13} | {'lote (ms)':>9} | {'caras/s por cara':>16} | {'caras/s lote':>12} | {'aceleración':>11}")
+    print("-" * 82)
+    for n in args.caras:
+        caras = caras_sinteticas(n, rng)
+        t_individual = medir(lambda: [clasificar_caras([c]) for c in caras], args.repeticiones)
+        t_lote = medir(lambda: clasificar_caras(caras), args.repeticiones)
+        print(f"{n:>5} | {t_individual * 1000:>13.2f} | {t_lote * 1000:>9.2f} | "
+              f"{n / t_individual:>16.1f} | {n / t_lote:>12.1f} | {t_individual / t_lote:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark del servicio HTTP (servidor.py): throughput y latencia de cola
+(p50/p95/p99) según el número de clientes concurrentes, y cuántas peticiones
+rechaza el servidor con 503 cuando su cola se llena.
+
+Por defecto levanta el servidor en este proceso, una vez por cada
+combinación de --max-lote y --esperas-ms (lote 1 = sin agrupar; espera 0 =
+agrupar solo lo que ya esté en cola). Con --simulado el detector
+y el clasificador se reemplazan por esperas con el costo indicado (fijo por
+llamada más un costo por cara), para ver el efecto del agrupado sin
+TensorFlow; con --url se mide un servidor ya en marcha.
+
+Uso:
+    python bench_servidor.py --clientes 1 2 4 8 16 32 --duracion 5 --imagen foto.jpg
+    python bench_servidor.py --simulado --esperas-ms 0 2 5 10
+    python bench_servidor.py --url http://localhost:5000 --clientes 1 8 32
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+
+def imagen_codificada(ruta):
+    """
+    JPEG a enviar: el archivo indicado o un frame sintético de 640x480 (un
+    degradado con una "cara", que pesa como una foto y no como ruido)
+    """
+    if ruta:
+        with open(ruta, "rb") as f:
+            return f.read()
+    y, x = np.mgrid[0:480, 0:640]
+    frame = np.dstack([x * 255 // 640, y * 255 // 480, np.full_like(x, 128)]).astype(np.uint8)
+    cv2.ellipse(frame, (320, 240), (90, 120), 0, 0, 360, (150, 180, 220), -1)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def funciones_simuladas(caras, deteccion_ms, llamada_ms, cara_ms):
+    """
+    Detector y clasificador que solo esperan: la detección es por petición
+    (en paralelo entre hilos) y la clasificación cuesta 'llamada_ms' por
+    llamada al modelo más 'cara_ms' por cara del lote
+    """
+    recorte = np.zeros((48, 48, 3), np.uint8)
+    area = {'x': 0, 'y': 0, 'w': 48, 'h': 48}
+
+    def detectar(img):
+        time.sleep(deteccion_ms / 1000)
+        return [{'face': recorte, 'facial_area': area, 'confidence': 1.0} for _ in range(caras)]
+
+    def clasificar(recortes):
+        time.sleep((llamada_ms + cara_ms * len(recortes)) / 1000)
+        return [{'neutral': 100.0} for _ in recortes]
+
+    return detectar, clasificar
+
+
+class ServidorLocal:
+    """
+    servidor.crear_app sobre el servidor de Werkzeug en un hilo propio
+    """
+
+    def __init__(self, **kwargs):
+        import logging
+        from werkzeug.serving import make_server
+        from servidor import crear_app
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        self.app = crear_app(**kwargs)
+        self.servidor = make_server("127.0.0.1", 0, self.app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}"
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.app.config["agrupador"].cerrar()
+
+
+def cliente(url, cuerpo, fin, latencias, estados):
+    """
+    Envía peticiones en una conexión persistente hasta 'fin'
+    """
+    destino = urlparse(url)
+    conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+    cabeceras = {"Content-Type": "image/jpeg"}
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        try:
+            conexion.request("POST", "/analizar", body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            estado = respuesta.status
+        except (OSError, http.client.HTTPException):
+            conexion.close()
+            conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+            estado = 0
+        if estado == 200:
+            latencias.append(time.perf_counter() - inicio)
+        estados.append(estado)
+        if estado == 503:
+            time.sleep(0.01)
+    conexion.close()
+
+
+def medir_carga(url, cuerpo, clientes, duracion):
+    latencias = []
+    estados = []
+    fin = time.perf_counter() + duracion
+    hilos = [threading.Thread(target=cliente, args=(url, cuerpo, fin, latencias, estados))
+             for _ in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - inicio
+    estados = Counter(estados)
+
+    ms = np.array(latencias) * 1000 if latencias else np.zeros(1)
+    return {
+        "clientes": clientes,
+        "peticiones_s": len(latencias) / transcurrido,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "rechazadas": estados.get(503, 0),
+        "errores": sum(n for estado, n in estados.items() if estado not in (200, 503)),
+    }
+
+
+def estado_servidor(url):
+    destino = urlparse(url)
+    conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=5)
+    conexion.request("GET", "/estado")
+    datos = json.loads(conexion.getresponse().read())
+    conexion.close()
+    return datos
+
+
+def imprimir(titulo, filas):
+    print(f"\n{titulo}")
+    print(f"{'clientes':>8} | {'pet/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'lote':>5} | {'503':>5} | {'err':>4}")
+    print("-" * 72)
+    for f in filas:
+        print(f"{f['clientes']:>8} | {f['peticiones_s']:>8.1f} | {f['p50_ms']:>8.1f} | {f['p95_ms']:>8.1f} | "
+              f"{f['p99_ms']:>8.1f} | {f.get('lote_medio', 0):>5.1f} | {f['rechazadas']:>5} | {f['errores']:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor ya en marcha (por defecto se levanta uno local)")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duracion", type=float, default=5.0, help="segundos por nivel de concurrencia")
+    parser.add_argument("--imagen", help="imagen a enviar (por defecto, un frame sintético)")
+    parser.add_argument("--esperas-ms", type=float, nargs="+", default=[0.0, 5.0])
+    parser.add_argument("--max-lote", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--cola-max", type=int, default=64)
+    parser.add_argument("--motor", default=None)
+    parser.add_argument("--simulado", action="store_true", help="detector y clasificador simulados")
+    parser.add_argument("--caras", type=int, default=1, help="caras por imagen (simulado)")
+    parser.add_argument("--deteccion-ms", type=float, default=5.0, help="costo de detección (simulado)")
+    parser.add_argument("--llamada-ms", type=float, default=8.0, help="costo fijo por lote (simulado)")
+    parser.add_argument("--cara-ms", type=float, default=0.5, help="costo por cara del lote (simulado)")
+    parser.add_argument("--salida", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    cuerpo = imagen_codificada(args.imagen)
+    resultados = {}
+    configuraciones = [(None, None)] if args.url else [
+        (lote, espera) for lote in args.max_lote for espera in (args.esperas_ms if lote > 1 else [0.0])]
+    for max_lote, espera in configuraciones:
+        servidor = None
+        if args.url:
+            url, titulo = args.url, args.url
+        else:
+            kwargs = dict(max_lote=max_lote, max_espera_ms=espera, cola_max=args.cola_max, motor=args.motor)
+            if args.simulado:
+                kwargs["detectar"], kwargs["clasificar"] = funciones_simuladas(
+                    args.caras, args.deteccion_ms, args.llamada_ms, args.cara_ms)
+            servidor = ServidorLocal(**kwargs)
+            url, titulo = servidor.url, f"lote máx. {max_lote}, espera {espera:g} ms"
+        try:
+            filas = []
+            for clientes in args.clientes:
+                previo = estado_servidor(url)
+                fila = medir_carga(url, cuerpo, clientes, args.duracion)
+                actual = estado_servidor(url)
+                lotes = actual["lotes"] - previo["lotes"]
+                fila["lote_medio"] = (actual["elementos"] - previo["elementos"]) / lotes if lotes else 0.0
+                filas.append(fila)
+        finally:
+            if servidor:
+                servidor.cerrar()
+        imprimir(titulo, filas)
+        resultados[titulo] = filas
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
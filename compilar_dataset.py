@@ -0,0 +1,296 @@
+"""
+Compilador del dataset de entrenamiento a fragmentos (shards) uint8 de forma
+fija que se leen con np.memmap.
+
+Recorre una sola vez las carpetas de clases de dataset/, y en un grupo de
+procesos decodifica cada imagen, recorta la cara más grande (Haar de OpenCV;
+si no encuentra ninguna usa la imagen completa) y la guarda redimensionada a
+224x224 RGB en su posición del fragmento. El índice (indice.json) guarda para
+cada imagen su clase, su subconjunto y su posición; la división
+entrenamiento/validación es la misma que flow_from_directory con
+validation_split=0.2 (por clase, los primeros int(0.2 * n) archivos en orden
+son de validación).
+
+Recompilar es incremental: las imágenes sin cambios (mismo tamaño y fecha)
+conservan su posición y solo se procesan las nuevas o modificadas, que
+ocupan los huecos de las borradas.
+
+Uso:
+    python compilar_dataset.py dataset/ --salida dataset_compilado --procesos 4
+    python my_emotion_model.py --compilado dataset_compilado
+    python evaluar_modelo.py dataset_compilado --motor tflite
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+SALIDA = "dataset_compilado"
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")
+VALIDACION = 0.2
+TAMANO = 224
+CAPACIDAD = 1024
+VERSION = 1
+RECORTES = ["haar", "ninguno"]
+
+
+def listar_dataset(dataset="dataset/", validacion=VALIDACION):
+    """
+    Lista las imágenes con la misma división que flow_from_directory con
+    validation_split: por clase (en orden alfabético), los primeros
+    int(validacion * n) archivos ordenados son de validación. Retorna
+    (clases, (rutas, etiquetas) de entrenamiento, (rutas, etiquetas) de validación).
+    """
+    clases = sorted(d for d in os.listdir(dataset) if os.path.isdir(os.path.join(dataset, d)))
+    entrenamiento, validacion_ = ([], []), ([], [])
+    for etiqueta, clase in enumerate(clases):
+        carpeta = os.path.join(dataset, clase)
+        archivos = sorted(os.path.join(raiz, a) for raiz, _, nombres in os.walk(carpeta)
+                          for a in nombres if a.lower().endswith(EXTENSIONES))
+        corte = int(validacion * len(archivos))
+        for i, ruta in enumerate(archivos):
+            destino = validacion_ if i < corte else entrenamiento
+            destino[0].append(ruta)
+            destino[1].append(etiqueta)
+    return clases, entrenamiento, validacion_
+
+
+def ruta_fragmento(carpeta, numero):
+    return os.path.join(carpeta, f"fragmento_{numero:05d}.u8")
+
+
+def abrir_fragmento(ruta, modo="r", capacidad=CAPACIDAD, tamano=TAMANO):
+    return np.memmap(ruta, np.uint8, modo, shape=(capacidad, tamano, tamano, 3))
+
+
+_clasificador = None
+_fragmentos = {}
+
+
+def recortar_cara(img, margen=0.1):
+    """
+    Recorta la cara más grande que encuentra el detector Haar de OpenCV, con
+    un margen; retorna (recorte, True) o (img, False) si no hay caras
+    """
+    import cv2
+    global _clasificador
+    if _clasificador is None:
+        _clasificador = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    gris = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    caras = _clasificador.detectMultiScale(gris, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+    if len(caras) == 0:
+        return img, False
+    x, y, w, h = max(caras, key=lambda c: c[2] * c[3])
+    mx, my = int(w * margen), int(h * margen)
+    x0, y0 = max(0, x - mx), max(0, y - my)
+    x1, y1 = min(img.shape[1], x + w + mx), min(img.shape[0], y + h + my)
+    return img[y0:y1, x0:x1], True
+
+
+def procesar_imagen(ruta, destino, fila, recorte, capacidad, tamano):
+    """
+    Se ejecuta en un proceso del grupo: decodifica, recorta y escribe la
+    imagen directamente en su fila del fragmento. Retorna (ruta, estado)
+    con estado "cara", "completa" o "error".
+    """
+    import cv2
+    img = cv2.imread(ruta, cv2.IMREAD_COLOR)
+    if img is None:
+        return ruta, "error"
+    cara = False
+    if recorte == "haar":
+        img, cara = recortar_cara(img)
+    fragmento = _fragmentos.get(destino)
+    if fragmento is None:
+        fragmento = _fragmentos[destino] = abrir_fragmento(destino, "r+", capacidad, tamano)
+    # Igual que load_img: interpolación 'nearest' y RGB
+    pequena = cv2.resize(img, (tamano, tamano), interpolation=cv2.INTER_NEAREST)
+    cv2.cvtColor(pequena, cv2.COLOR_BGR2RGB, dst=fragmento[fila])
+    return ruta, "cara" if cara else "completa"
+
+
+def cargar_indice(carpeta):
+    ruta = os.path.join(carpeta, "indice.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compilar(dataset="dataset/", salida=SALIDA, procesos=None, recorte="haar", capacidad=CAPACIDAD,
+             tamano=TAMANO, validacion=VALIDACION, progreso=None):
+    """
+    Compila (o actualiza) el dataset en 'salida' y retorna un resumen
+    """
+    inicio = time.perf_counter()
+    os.makedirs(salida, exist_ok=True)
+    clases, entrenamiento, validacion_ = listar_dataset(dataset, validacion)
+    listado = [(r, e, "validation") for r, e in zip(*validacion_)] + \
+              [(r, e, "training") for r, e in zip(*entrenamiento)]
+
+    # Reutilizar las posiciones de las imágenes sin cambios si los
+    # parámetros del compilado anterior son los mismos
+    previo = cargar_indice(salida)
+    parametros = {"version": VERSION, "tamano": tamano, "capacidad": capacidad, "recorte": recorte}
+    if previo is None or any(previo.get(k) != v for k, v in parametros.items()):
+        previo = {"fragmentos": 0, "imagenes": []}
+    previas = {e["ruta"]: e for e in previo["imagenes"]}
+
+    imagenes, pendientes, ocupadas = [], [], set()
+    for ruta, etiqueta, subconjunto in listado:
+        estado = os.stat(ruta)
+        entrada = {"ruta": ruta, "bytes": estado.st_size, "mtime": int(estado.st_mtime),
+                   "clase": clases[etiqueta], "etiqueta": etiqueta, "subconjunto": subconjunto}
+        anterior = previas.get(ruta)
+        if anterior and anterior["bytes"] == entrada["bytes"] and anterior["mtime"] == entrada["mtime"]:
+            entrada.update(fragmento=anterior["fragmento"], fila=anterior["fila"], cara=anterior["cara"])
+            ocupadas.add((anterior["fragmento"], anterior["fila"]))
+        else:
+            pendientes.append(entrada)
+        imagenes.append(entrada)
+
+    # Las nuevas o modificadas ocupan primero los huecos y luego fragmentos nuevos
+    fragmentos = previo["fragmentos"]
+    libres = [(f, i) for f in range(fragmentos) for i in range(capacidad) if (f, i) not in ocupadas]
+    libres.reverse()
+    for entrada in pendientes:
+        if not libres:
+            abrir_fragmento(ruta_fragmento(salida, fragmentos), "w+", capacidad, tamano).flush()
+            libres = [(fragmentos, i) for i in reversed(range(capacidad))]
+            fragmentos += 1
+        entrada["fragmento"], entrada["fila"] = libres.pop()
+
+    errores = set()
+    if pendientes:
+        # 'spawn' como en analisis_lote para no heredar estado del proceso principal
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), mp_context=contexto) as pool:
+            futuros = {pool.submit(procesar_imagen, e["ruta"], ruta_fragmento(salida, e["fragmento"]),
+                                   e["fila"], recorte, capacidad, tamano): e for e in pendientes}
+            for hechas, futuro in enumerate(as_completed(futuros), start=1):
+                ruta, estado = futuro.result()
+                if estado == "error":
+                    errores.add(ruta)
+                futuros[futuro]["cara"] = estado == "cara"
+                if progreso is not None:
+                    progreso(hechas, len(pendientes))
+
+    imagenes = [e for e in imagenes if e["ruta"] not in errores]
+    indice = dict(parametros, clases=clases, validacion=validacion, fragmentos=fragmentos, imagenes=imagenes)
+    temporal = os.path.join(salida, "indice.json.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False)
+    os.replace(temporal, os.path.join(salida, "indice.json"))
+    return {
+        "imagenes": len(imagenes),
+        "procesadas": len(pendientes) - len(errores),
+        "reutilizadas": len(imagenes) - len(pendientes) + len(errores),
+        "errores": len(errores),
+        "sin_cara": sum(not e["cara"] for e in imagenes) if recorte == "haar" else None,
+        "fragmentos": fragmentos,
+        "tiempo_s": time.perf_counter() - inicio,
+    }
+
+
+class DatasetCompilado:
+    """
+    Lectura de un dataset compilado: los fragmentos se abren con np.memmap
+    y solo se leen las filas pedidas
+    """
+
+    def __init__(self, carpeta=SALIDA):
+        self.carpeta = carpeta
+        self.nombre = "compilado_" + os.path.basename(os.path.normpath(carpeta))
+        self.indice = cargar_indice(carpeta)
+        if self.indice is None:
+            raise FileNotFoundError(f"No existe {carpeta}/indice.json; ejecuta 'python compilar_dataset.py'")
+        self.clases = self.indice["clases"]
+        self.tamano = self.indice["tamano"]
+        self.fragmentos = [abrir_fragmento(ruta_fragmento(carpeta, f), "r", self.indice["capacidad"], self.tamano)
+                           for f in range(self.indice["fragmentos"])]
+
+    def subconjunto(self, nombre):
+        """
+        Entradas del índice de "training" o "validation"
+        """
+        return [e for e in self.indice["imagenes"] if e["subconjunto"] == nombre]
+
+    def etiquetas(self, nombre):
+        return np.array([e["etiqueta"] for e in self.subconjunto(nombre)], np.int64)
+
+    def firma(self, nombre):
+        return [[e["ruta"], e["bytes"], e["mtime"]] for e in self.subconjunto(nombre)]
+
+    def parametros(self):
+        """
+        Parámetros con que se compilaron los fragmentos: con otros, las mismas
+        rutas dan otros píxeles
+        """
+        return {k: self.indice[k] for k in ("version", "tamano", "recorte", "validacion")}
+
+    def leer(self, entradas, salida=None):
+        """
+        Lote uint8 (n, 224, 224, 3) en RGB con las imágenes de 'entradas'
+        """
+        if salida is None:
+            salida = np.empty((len(entradas), self.tamano, self.tamano, 3), np.uint8)
+        for i, e in enumerate(entradas):
+            salida[i] = self.fragmentos[e["fragmento"]][e["fila"]]
+        return salida
+
+    def lotes(self, nombre, lote=32, mezclar=False, semilla=None, etiquetas=False):
+        """
+        Genera lotes float32 en [0, 1] (y sus etiquetas si 'etiquetas')
+        """
+        entradas = self.subconjunto(nombre)
+        orden = np.arange(len(entradas))
+        if mezclar:
+            orden = np.random.default_rng(semilla).permutation(orden)
+        buffer = np.empty((lote, self.tamano, self.tamano, 3), np.uint8)
+        for inicio in range(0, len(orden), lote):
+            seleccion = [entradas[i] for i in orden[inicio:inicio + lote]]
+            # Se lee en orden de disco, pero cada fila vuelve a su posición en
+            # el lote: quien consume los lotes asume el orden del índice
+            disco = np.lexsort(([e["fila"] for e in seleccion], [e["fragmento"] for e in seleccion]))
+            crudo = buffer[:len(seleccion)]
+            for k in disco:
+                e = seleccion[k]
+                crudo[k] = self.fragmentos[e["fragmento"]][e["fila"]]
+            x = np.multiply(crudo, np.float32(1.0 / 255), dtype=np.float32)
+            if etiquetas:
+                yield x, np.array([e["etiqueta"] for e in seleccion], np.int64)
+            else:
+                yield x
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default="dataset/")
+    parser.add_argument("--salida", default=SALIDA)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--recorte", choices=RECORTES, default="haar")
+    parser.add_argument("--capacidad", type=int, default=CAPACIDAD, help="imágenes por fragmento")
+    args = parser.parse_args()
+
+    def progreso(hechas, total):
+        if hechas % 200 == 0 or hechas == total:
+            print(f"\r{hechas}/{total} imágenes procesadas", end="", file=sys.stderr)
+
+    resumen = compilar(args.dataset, args.salida, args.procesos, args.recorte, args.capacidad,
+                       progreso=progreso)
+    print(file=sys.stderr)
+    print(f"{resumen['imagenes']} imágenes en {resumen['fragmentos']} fragmentos: "
+          f"{resumen['procesadas']} procesadas, {resumen['reutilizadas']} sin cambios, "
+          f"{resumen['errores']} con error en {resumen['tiempo_s']:.1f}s")
+    if resumen["sin_cara"]:
+        print(f"{resumen['sin_cara']} imágenes sin cara detectada (se guardaron completas)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
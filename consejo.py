@@ -1,13 +1,59 @@
 import tkinter as tk
-import numpy as np
 from collections import Counter
-from qwen_agent.agents import Assistant
-from qwen_agent.utils.output_beautify import typewriter_print
+import json
+import os
 import threading
 
+from servicio_consejo import MODELO, obtener_servicio
+
+RUTA_CACHE = "consejos_cache.json"
+
+
+class CacheConsejos:
+    """
+    Consejos ya generados, guardados en disco y indexados por la
+    distribución de emociones redondeada a 'precision' puntos porcentuales
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, precision=5.0):
+        self.ruta = ruta
+        self.precision = precision
+        self.lock = threading.Lock()
+        self.entradas = None
+
+    def clave(self, porcentajes, modelo=MODELO):
+        redondeados = {}
+        for emocion, porcentaje in sorted(porcentajes.items()):
+            valor = round(porcentaje / self.precision) * self.precision if self.precision else porcentaje
+            if valor:
+                redondeados[emocion] = round(valor, 4)
+        return json.dumps([modelo, redondeados], sort_keys=True)
+
+    def _cargar(self):
+        if self.entradas is None:
+            try:
+                with open(self.ruta, encoding="utf-8") as f:
+                    self.entradas = json.load(f)
+            except (OSError, ValueError):
+                self.entradas = {}
+        return self.entradas
+
+    def obtener(self, clave):
+        with self.lock:
+            return self._cargar().get(clave)
+
+    def guardar(self, clave, texto):
+        with self.lock:
+            self._cargar()[clave] = texto
+            # Escribir a un temporal y reemplazar para no dejar el archivo a medias
+            temporal = self.ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.entradas, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.ruta)
+
 
 class consejo(tk.Toplevel):
-    def __init__(self, master, emotion_history: list):
+    def __init__(self, master, historial, precision=5.0, cache=None, refresco_ms=50):
         super().__init__(master)
         self.title("Consejo y Recomendaciones")
         self.geometry("900x450")
@@ -15,32 +61,20 @@ class consejo(tk.Toplevel):
         self.resizable(True, True)
         self.transient(master)
 
-        # Configuración del bot
-        self.llm_cfg = {
-            "model": "qwen3:1.7b",
-            "model_server": "http://localhost:11434/v1",
-        }
-        self.system_message = """
-        Eres un Psicólogo experto en análisis de emociones y un consejero empático. Tu objetivo principal es ayudar a las personas a entender y gestionar sus estados emocionales.
-
-        Cuando se te presente un sconjunto de emociones, debes:
-        1.  Validar y reconocer las emociones del usuario de forma empática.
-        2.  Analizar la combinación de emociones para identificar posibles causas subyacentes o interacciones.
-        3.  Proporcionar una serie de consejos cortos y concisos para que el usuario pueda tomar para gestionar esas emociones de forma constructiva.
-
-        Tu tono debe ser siempre comprensivo, alentador y profesional.
-        """
-        self.bot = Assistant(llm=self.llm_cfg, system_message=self.system_message)
-
-        # Calcular estadísticas
-        emotion_counts = Counter(emotion_history)
-        total_detections = len(emotion_history)
-        # Gráfica 1: Frecuencia de emociones (barras)
-        emotions = list(emotion_counts.keys())
-        frequencies = [emotion_counts[emotion] for emotion in emotions]
-        percentages = [(count/total_detections)*100 for count in frequencies]
+        # Calcular estadísticas: 'historial' es un HistorialEmociones o una
+        # lista de emociones dominantes
+        if hasattr(historial, "porcentajes"):
+            emotion_percentages = historial.porcentajes()
+        else:
+            emotion_counts = Counter(historial)
+            total_detections = len(historial)
+            emotion_percentages = {emotion: (count/total_detections)*100
+                                   for emotion, count in emotion_counts.items()}
+        # Los perfiles parecidos comparten consejo guardado en disco
+        self.cache = cache if cache is not None else CacheConsejos(precision=precision)
+        clave = self.cache.clave(emotion_percentages)
+        
         # Diccionario de emociones
-        emotion_percentages = dict(zip(emotions, percentages))
         for emotion, percentage in emotion_percentages.items():
             emotion_percentages[emotion] = f"{percentage:.2f}%"
 
@@ -53,17 +87,71 @@ class consejo(tk.Toplevel):
         # Prompt para el bot
         prompt = f"{emotion_percentages}"
 
-        # Obtener respuesta del bot en segundo plano
-        def obtener_consejo():
-            response_plain_text = ''
-            for response in self.bot.run(messages=[{'role': 'user', 'content': prompt}]):
-                response_plain_text = typewriter_print(response, response_plain_text)
-                # Insertar texto de consejo en el hilo principal
-                self.texto.after(0, lambda: [
-                self.texto.config(state="normal"),
-                self.texto.delete("1.0", "end"),
-                self.texto.insert("1.0", f"{response_plain_text}"),
-                self.texto.config(state="disabled")
-                ])
-
-        threading.Thread(target=obtener_consejo, daemon=True).start()
\ No newline at end of file
+        # El hilo del bot solo acumula texto; la interfaz lo agrega a un ritmo
+        # fijo insertando únicamente lo nuevo
+        self.refresco_ms = refresco_ms
+        self.lock = threading.Lock()
+        self.recibido = ""
+        self.mostrado = ""
+        self.terminado = False
+        self._after_id = None
+        self.peticion = None
+
+        guardado = self.cache.obtener(clave)
+        if guardado is not None:
+            self.recibido = guardado
+            self.terminado = True
+            self.refrescar()
+            return
+
+        # Pedir el consejo al servicio compartido (ver servicio_consejo.py)
+        def al_texto(texto):
+            with self.lock:
+                self.recibido = texto
+
+        def al_terminar(futuro):
+            if futuro.cancelled():
+                return
+            error = futuro.exception()
+            if error is None:
+                if futuro.result()["texto"]:
+                    self.cache.guardar(clave, futuro.result()["texto"])
+            else:
+                with self.lock:
+                    self.recibido += f"\n\nNo se pudo obtener el consejo: {error}"
+            self.terminado = True
+
+        self.peticion = obtener_servicio().pedir(prompt, al_texto)
+        self.peticion.add_done_callback(al_terminar)
+        self.refrescar()
+
+    def refrescar(self):
+        """
+        Agrega al widget el texto recibido desde el último refresco
+        """
+        with self.lock:
+            recibido = self.recibido
+            terminado = self.terminado
+        if recibido != self.mostrado:
+            self.texto.config(state="normal")
+            if recibido.startswith(self.mostrado):
+                self.texto.insert("end", recibido[len(self.mostrado):])
+            else:
+                # El bot reescribió la respuesta: reemplazarla entera
+                self.texto.delete("1.0", "end")
+                self.texto.insert("1.0", recibido)
+            self.texto.config(state="disabled")
+            self.mostrado = recibido
+        if terminado:
+            self._after_id = None
+        else:
+            self._after_id = self.after(self.refresco_ms, self.refrescar)
+
+    def destroy(self):
+        # Cerrar la ventana cancela la petición en curso
+        if self.peticion is not None:
+            self.peticion.cancel()
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Panel de estadísticas en vivo junto al video de la webcam.
+
+La figura y sus artistas (barras, sectores y líneas) se crean una sola vez;
+cada actualización solo cambia sus datos y los vuelve a pintar sobre el
+fondo guardado (blitting). La frecuencia de actualización tiene un tope y se
+reduce sola si el costo medido supera el presupuesto de tiempo del frame.
+"""
+import time
+
+import numpy as np
+
+from analisis import EMOCIONES
+from metricas import METRICAS
+
+# Colores de las emociones (RGB normalizados), compartidos con las estadísticas
+COLORES_EMOCIONES = {
+    'happy': (1.0, 0.84, 0.0),      # Amarillo-naranja
+    'sad': (0.39, 0.39, 1.0),       # Azul
+    'angry': (1.0, 0.2, 0.2),       # Rojo
+    'fear': (0.5, 0.0, 1.0),        # Púrpura
+    #'surprise': (1.0, 1.0, 0.0),    # Amarillo
+    'disgust': (0.0, 0.5, 0.0),     # Verde
+    #'neutral': (0.78, 0.78, 0.78),  # Gris
+    'contempt': (0.6, 0.4, 0.2),    # Marrón
+}
+COLOR_POR_DEFECTO = (0.8, 0.8, 0.8)
+
+
+class PanelEmociones:
+    """
+    Panel de Tk con tres gráficas: frecuencia de la emoción dominante,
+    puntuación media (sectores) y línea de tiempo de los últimos 'ventana'
+    segundos. 'presupuesto' es la fracción máxima del tiempo de pared que
+    puede consumir el panel.
+    """
+
+    def __init__(self, master, emociones=EMOCIONES, ventana=60.0, fps_max=4.0, presupuesto=0.05,
+                 ancho=360, alto=560, puntos=300):
+        import tkinter as tk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.emociones = list(emociones)
+        self.ventana = ventana
+        self.fps_max = fps_max
+        self.presupuesto = presupuesto
+        self.puntos = puntos
+        self.ancho = ancho
+        self.costo = None            # EMA de la duración de una actualización
+        self.ultima = 0.0
+        self.actualizaciones = 0
+        self.fondo = None
+        self.visible = False
+
+        self.frame = tk.Frame(master, bg="#34495e", width=ancho)
+        # Figure directamente (no pyplot) para que no quede registrada ni se acumule
+        self.figura = Figure(figsize=(ancho / 100, alto / 100), dpi=100)
+        self.figura.patch.set_facecolor('#34495e')
+        self.ax_barras, self.ax_sectores, self.ax_linea = self.figura.subplots(3, 1, height_ratios=[1.2, 1, 1])
+        colores = [COLORES_EMOCIONES.get(e, COLOR_POR_DEFECTO) for e in self.emociones]
+        x = np.arange(len(self.emociones))
+
+        # Barras con su etiqueta de porcentaje
+        ax = self.ax_barras
+        self.barras = ax.bar(x, np.zeros(len(x)), color=colores, alpha=0.8, edgecolor='white',
+                             linewidth=1, animated=True)
+        self.etiquetas = [ax.text(i, 0, "", ha='center', va='bottom', color='white', fontsize=7,
+                                  animated=True) for i in x]
+        ax.set_xticks(x, self.emociones, rotation=45, fontsize=7)
+        ax.set_ylim(0, 110)
+        ax.set_title('Frecuencia (%)', color='white', fontsize=9)
+
+        # Sectores: los ángulos se actualizan en cada refresco
+        ax = self.ax_sectores
+        self.sectores, _ = ax.pie(np.ones(len(x)), colors=colores, startangle=90,
+                                  wedgeprops={'animated': True, 'edgecolor': '#34495e'})
+        ax.set_title('Puntuación media', color='white', fontsize=9)
+
+        # Línea de tiempo con el eje fijo en segundos relativos al último dato
+        ax = self.ax_linea
+        self.lineas = [ax.plot([], [], color=c, linewidth=1, animated=True)[0] for c in colores]
+        ax.set_xlim(-ventana, 0)
+        ax.set_ylim(0, 100)
+        ax.set_title(f'Últimos {ventana:.0f} s', color='white', fontsize=9)
+
+        for ax in (self.ax_barras, self.ax_linea):
+            ax.set_facecolor('#2c3e50')
+            ax.tick_params(colors='white', labelsize=7)
+            ax.grid(True, alpha=0.3, color='white')
+        self.figura.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figura, self.frame)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Cada redibujado completo (por ejemplo, al cambiar de tamaño)
+        # renueva el fondo guardado
+        self.canvas.mpl_connect('draw_event', self._al_dibujar)
+
+    @property
+    def artistas(self):
+        return [*self.barras, *self.etiquetas, *self.sectores, *self.lineas]
+
+    def _al_dibujar(self, event):
+        self.fondo = self.canvas.copy_from_bbox(self.figura.bbox)
+        self._pintar()
+
+    def _pintar(self):
+        for artista in self.artistas:
+            artista.axes.draw_artist(artista)
+
+    def mostrar(self, antes=None):
+        self.frame.pack(side="right", fill="y", before=antes)
+        self.frame.pack_propagate(False)
+        self.visible = True
+        self.canvas.draw()
+
+    def ocultar(self):
+        self.frame.pack_forget()
+        self.visible = False
+
+    def reset(self):
+        self.ultima = 0.0
+        self.costo = None
+
+    def intervalo(self):
+        """
+        Segundos mínimos entre actualizaciones: el tope de frecuencia o lo
+        que permita el presupuesto según el costo medido
+        """
+        intervalo = 1.0 / self.fps_max
+        if self.costo:
+            intervalo = max(intervalo, self.costo / self.presupuesto)
+        return intervalo
+
+    def actualizar(self, historial, ahora=None):
+        """
+        Refresca el panel si ya pasó el intervalo; retorna True si lo hizo
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        if self.fondo is None or ahora - self.ultima < self.intervalo():
+            return False
+        self.ultima = ahora
+        inicio = time.perf_counter()
+
+        self._actualizar_datos(historial)
+        self.canvas.restore_region(self.fondo)
+        self._pintar()
+        self.canvas.blit(self.figura.bbox)
+
+        costo = time.perf_counter() - inicio
+        self.costo = costo if self.costo is None else self.costo + 0.2 * (costo - self.costo)
+        self.actualizaciones += 1
+        METRICAS.registrar("panel", costo)
+        return True
+
+    def _actualizar_datos(self, historial):
+        columnas = [historial.indices.get(e) for e in self.emociones]
+        total = len(historial)
+
+        # Barras: porcentaje de veces como emoción dominante
+        for barra, etiqueta, columna in zip(self.barras, self.etiquetas, columnas):
+            porcentaje = 100 * historial.conteo[columna] / total if total and columna is not None else 0.0
+            barra.set_height(porcentaje)
+            etiqueta.set_y(porcentaje + 1)
+            etiqueta.set_text(f"{porcentaje:.0f}" if porcentaje else "")
+
+        # Sectores: puntuación media de cada emoción
+        medias = np.array([historial.media[c] if c is not None and historial.muestras[c] else 0.0
+                           for c in columnas])
+        suma = medias.sum()
+        angulo = 90.0
+        for sector, media in zip(self.sectores, medias):
+            paso = 360.0 * media / suma if suma else 0.0
+            sector.set_theta1(angulo)
+            sector.set_theta2(angulo + paso)
+            angulo += paso
+
+        # Línea de tiempo: puntuaciones recientes dentro de la ventana
+        tiempos, puntuaciones, _ = historial.recientes()
+        if len(tiempos):
+            dentro = tiempos >= tiempos[-1] - self.ventana
+            tiempos, puntuaciones = tiempos[dentro], puntuaciones[dentro]
+            paso = max(1, len(tiempos) // self.puntos)
+            tiempos, puntuaciones = tiempos[::paso] - tiempos[-1], puntuaciones[::paso]
+        for linea, columna in zip(self.lineas, columnas):
+            if columna is None or not len(tiempos) or columna >= puntuaciones.shape[1]:
+                linea.set_data([], [])
+            else:
+                linea.set_data(tiempos, puntuaciones[:, columna])
@@ -1,39 +1,109 @@
 import cv2
-from deepface import DeepFace
+import logging
 import tkinter as tk
 from tkinter import filedialog
-from PIL import Image, ImageTk
+import threading
+import time
 import numpy as np
-import matplotlib.pyplot as plt
-from keras.src.saving import load_model
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from collections import defaultdict, Counter
-
-from tensorflow.python.ops.signal.shape_ops import frame
 
+# TensorFlow, DeepFace y matplotlib se importan al usarse por primera vez
+# para que la ventana aparezca de inmediato
 from consejo import consejo
+from servicio_consejo import obtener_servicio
+from analisis import (analizar_caras, analizar_imagen, interpretar_resultados,
+                      formatear_resultado, cara_principal, get_deepface, precalentar,
+                      usar_motor, usar_detector, configuracion_detector, clases_motor)
+from autotune_detector import RUTA_CONFIG, aplicar_config
+from pipeline import FramePipeline
+from seguimiento import FaceTrackScheduler, FaceIdentifier
+from historial import HistorialEmociones
+from video import analizar_video, FrecuenciaFija
+from motor_emociones import MOTORES
+from sesion import GrabadorSesion, LectorSesion, nueva_ruta
+from metricas import METRICAS, ServidorMetricas
+from overlay import OverlayRenderer, cuantizar
+from pantalla import Pantalla
+from perfilado import Perfilador
+from reutilizacion import ReutilizadorFrames, CacheImagenes
+from planificador import PlanificadorAdaptativo, SuavizadorEmociones
+from dashboard import PanelEmociones, COLORES_EMOCIONES, COLOR_POR_DEFECTO
+
+logger = logging.getLogger(__name__)
 
-custom_emotion_model = load_model("my_emotion_model.h5")
 class EmotionApp:
-    def __init__(self, root):
+    def __init__(self, root, modo_pipeline=True, seguimiento=True, detectar_cada=10, video_hz=2.0,
+                 grabar=True, hud=False, metricas_json=None, metricas_puerto=None, umbral_cambio=3.0,
+                 max_cpu=0.8, min_fps_inferencia=5.0, fps_display=30.0, suavizado=0.3,
+                 precalentar_llm=True, panel=False, perfil_segundos=30.0):
         self.root = root
         self.root.title("Detector Avanzado de Emociones")
         self.root.geometry("900x700")
         self.root.configure(bg="#2c3e50")
         
-        self.detector = DeepFace
+        # Se asigna cuando los modelos terminan de cargar en segundo plano
+        self.detector = None
+        self.models_ready = threading.Event()
+        self.models_error = None
         
         # Variables de estado
         self.cap = None
         self.streaming = False
-        self.current_image = None
+        self.overlay = OverlayRenderer()
+        
+        # Modo pipeline: captura e inferencia en hilos separados del mainloop
+        self.modo_pipeline = modo_pipeline
+        self.pipeline = None
+        self.ultimas_caras = []
+        
+        # Frecuencias de inferencia y de display elegidas según la latencia y
+        # la CPU medidas; las puntuaciones se suavizan entre inferencias
+        self.planificador = PlanificadorAdaptativo(max_cpu=max_cpu, min_fps_inferencia=min_fps_inferencia,
+                                                   fps_display=fps_display)
+        self.suavizador = SuavizadorEmociones(suavizado)
+        
+        # Detección completa cada N frames y seguimiento barato entre medias
+        self.scheduler = FaceTrackScheduler(self.detector, detect_every=detectar_cada) if seguimiento else None
+        # Identificador estable por persona cuando hay varias caras
+        self.identifier = FaceIdentifier()
+        # Reutilizar el último resultado si el frame apenas cambió y los
+        # resultados de las fotos ya analizadas
+        self.reutilizador = ReutilizadorFrames(umbral_cambio) if umbral_cambio > 0 else None
+        self.cache_imagenes = CacheImagenes()
+        # Último resultado guardado en el historial: el reutilizador retorna
+        # el mismo objeto mientras el frame no cambia
+        self.ultimo_registrado = None
         
         # Variables para estadísticas de emociones
-        self.emotion_history = []
-        self.emotion_stats = defaultdict(list)
+        self.historial = HistorialEmociones()
+        self.session_start = time.monotonic()
+        
+        # Grabación de cada sesión de webcam en disco (ver sesion.py)
+        self.grabar = grabar
+        self.grabador = None
+        
+        # Métricas de latencia por etapa (ver metricas.py); F2 alterna el HUD
+        self.hud = hud
+        self.metricas_json = metricas_json
+        self.servidor_metricas = ServidorMetricas(METRICAS, metricas_puerto) if metricas_puerto else None
+        self.root.bind("<F2>", lambda event: self.toggle_hud())
+        
+        # Análisis de archivos de video en segundo plano
+        self.video_hz = video_hz
+        self.video_thread = None
+        self.video_cancel = threading.Event()
         self.chart_frame = None
         self.chart_canvas = None
         
+        # Panel de estadísticas en vivo junto al video (F3 lo alterna)
+        self.panel = None
+        self.mostrar_panel = panel
+        self.root.bind("<F3>", lambda event: self.toggle_panel())
+        
+        # Captura de perfil de CPU y memoria bajo demanda (ver perfilado.py);
+        # F4 la inicia o la detiene antes de tiempo
+        self.perfilador = Perfilador(perfil_segundos)
+        self.root.bind("<F4>", lambda event: self.toggle_profile())
+        
         # Estilos para botones
         self.btn_style = {
             "font": ("Helvetica", 14, "bold"),
@@ -56,7 +126,7 @@ class EmotionApp:
             command=self.load_image,
             **self.btn_style
         )
-        self.btn_image.grid(row=0, column=0, padx=20)
+        self.btn_image.grid(row=0, column=0, padx=10)
         
         self.btn_webcam = tk.Button(
             self.top_frame,
@@ -64,7 +134,23 @@ class EmotionApp:
             command=self.toggle_webcam,
             **self.btn_style
         )
-        self.btn_webcam.grid(row=0, column=1, padx=20)
+        self.btn_webcam.grid(row=0, column=1, padx=10)
+        
+        self.btn_video = tk.Button(
+            self.top_frame,
+            text="🎞 Analizar Video",
+            command=self.load_video,
+            **self.btn_style
+        )
+        self.btn_video.grid(row=0, column=2, padx=10)
+        
+        self.btn_session = tk.Button(
+            self.top_frame,
+            text="⏪ Ver Sesión",
+            command=self.load_session,
+            **self.btn_style
+        )
+        self.btn_session.grid(row=0, column=3, padx=10)
         
         # Marco central para mostrar imagen o video
         self.display_frame = tk.Frame(self.root, bg="#34495e", bd=2, relief="sunken")
@@ -73,6 +159,11 @@ class EmotionApp:
         self.display_label = tk.Label(self.display_frame, bg="#34495e")
         self.display_label.pack(expand=True)
         
+        # Búferes y PhotoImage reutilizados entre frames; el tamaño del
+        # display solo se vuelve a leer cuando Tk avisa que cambió
+        self.pantalla = Pantalla(self.display_label)
+        self.display_frame.bind("<Configure>", lambda event: self.resize_display(event.width, event.height))
+        
         # Marco inferior para texto de estado
         self.bottom_frame = tk.Frame(self.root, bg="#2c3e50")
         self.bottom_frame.pack(pady=10)
@@ -85,6 +176,39 @@ class EmotionApp:
             bg="#2c3e50"
         )
         self.result_label.pack()
+        
+        # Deshabilitar los botones hasta que los modelos estén listos
+        for btn in (self.btn_image, self.btn_webcam, self.btn_video, self.btn_session):
+            btn.config(state="disabled")
+        self.result_label.config(text="Estado: Cargando modelos...")
+        threading.Thread(target=self.load_models, daemon=True).start()
+        self.root.after(100, self.check_models_ready)
+        
+        # Que el modelo de consejos ya esté cargado cuando se pida el primero
+        if precalentar_llm:
+            obtener_servicio().precalentar()
+
+    def load_models(self):
+        """
+        Importa DeepFace/TensorFlow y precalienta los modelos (hilo secundario)
+        """
+        try:
+            precalentar()
+        except Exception as e:
+            self.models_error = e
+        self.models_ready.set()
+
+    def check_models_ready(self):
+        if not self.models_ready.is_set():
+            self.root.after(100, self.check_models_ready)
+            return
+        if self.models_error is not None:
+            self.result_label.config(text=f"Error al cargar modelos: {self.models_error}")
+            return
+        self.detector = get_deepface()
+        for btn in (self.btn_image, self.btn_webcam, self.btn_video, self.btn_session):
+            btn.config(state="normal")
+        self.result_label.config(text="Estado: Esperando acción...")
 
     def load_image(self):
         # Si la webcam está activa, la detenemos
@@ -100,40 +224,169 @@ class EmotionApp:
             self.result_label.config(text="Error: No se pudo cargar la imagen.")
             return
         
-        # Analizar emoción con DeepFace
+        # Analizar todas las caras de la imagen
         try:
-            resultado = DeepFace.analyze(
-                img_path=img_bgr,
-                actions=['emotion'],
-                models={"emotion": custom_emotion_model},  # << aquí tu modelo
-                enforce_detection=False
-            )
-            if isinstance(resultado, list):
-                res = resultado[0]
-            else:
-                res = resultado
-            
-            dominant = res['dominant_emotion']
-            confidence = res['emotion'][dominant] * 100 if 'emotion' in res else 0.0
-            texto = f"{dominant.capitalize()}"
-            porcentaje = f"{confidence:05.2f}%"
+            caras = self.cache_imagenes.obtener(
+                img_bgr, lambda img: analizar_imagen(img, detector=self.detector))
         except Exception as e:
-            texto = "Error al analizar"
-            porcentaje = "00.00%"
+            caras = None
+        
+        self.show_frame(img_bgr, caras, origen="Imagen", error="Error al analizar")
+
+    def load_video(self):
+        """
+        Analiza un archivo de video en segundo plano con muestreo a
+        frecuencia fija y muestra las estadísticas al terminar
+        """
+        if self.streaming:
+            self.stop_webcam()
+        if self.video_thread and self.video_thread.is_alive():
+            # Un segundo clic cancela el análisis en curso
+            self.video_cancel.set()
+            return
         
-        # Convertir la imagen a RGB y redimensionarla para el display
-        img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-        img_rgb = self.resize_for_display(img_rgb)
+        file_path = filedialog.askopenfilename(filetypes=[("Videos", "*.mp4 *.avi *.mkv *.mov")])
+        if not file_path:
+            return
         
-        # Dibujar la caja y el texto mejorado
-        img_completo = self.draw_emotion_display(img_rgb, texto, porcentaje)
+        self.historial.clear()
+        self.hide_chart()
+        self.pantalla.limpiar()
+        self.video_cancel.clear()
+        self.btn_image.config(state="disabled")
+        self.btn_webcam.config(state="disabled")
+        self.btn_session.config(state="disabled")
+        self.btn_video.config(text="❌ Cancelar Video", bg="#c0392b", activebackground="#e74c3c")
+        self.result_label.config(text="Video: analizando...")
+        
+        def al_resultado(timestamp, caras):
+            self.root.after(0, lambda: self.result_label.config(
+                text=f"Video: {timestamp:.1f}s analizados"))
+        
+        def analizar():
+            try:
+                resumen = analizar_video(file_path, FrecuenciaFija(self.video_hz), self.historial,
+                                         al_resultado=al_resultado, detener=self.video_cancel)
+            except Exception as e:
+                resumen = {"error": str(e)}
+            self.root.after(0, lambda: self.finish_video(resumen))
+        
+        self.video_thread = threading.Thread(target=analizar, daemon=True)
+        self.video_thread.start()
+
+    def finish_video(self, resumen):
+        self.btn_image.config(state="normal")
+        self.btn_webcam.config(state="normal")
+        self.btn_session.config(state="normal")
+        self.btn_video.config(text="🎞 Analizar Video", bg="#2980b9", activebackground="#3498db")
+        if "error" in resumen:
+            self.result_label.config(text=f"Error: {resumen['error']}")
+            return
+        rendimiento = (f"{resumen['frames_analizados']} frames analizados, "
+                       f"decodificación {resumen['fps_decodificacion']:.1f} fps, "
+                       f"análisis {resumen['fps_analisis']:.1f} fps")
+        logger.info("Video: %s", rendimiento)
+        if len(self.historial):
+            self.show_emotion_statistics()
+            consejo(self.root, self.historial)
+            self.result_label.config(text=f"{self.result_label.cget('text')}\nVideo: {rendimiento}")
+        else:
+            self.result_label.config(text=f"Video: sin detecciones ({rendimiento})")
+
+    def load_session(self):
+        """
+        Reproduce una sesión grabada: reconstruye las estadísticas y el
+        consejo a partir del archivo, sin recorrer detección por detección
+        """
+        if self.streaming:
+            self.stop_webcam()
         
-        img_pil = Image.fromarray(img_completo)
-        img_tk = ImageTk.PhotoImage(img_pil)
+        file_path = filedialog.askopenfilename(filetypes=[("Sesiones", "*.emo")])
+        if not file_path:
+            return
         
-        self.current_image = img_tk
-        self.display_label.config(image=img_tk)
-        self.result_label.config(text=f"Imagen: {texto} - {porcentaje}")
+        try:
+            lector = LectorSesion(file_path)
+        except (OSError, ValueError) as e:
+            self.result_label.config(text=f"Error: {e}")
+            return
+        
+        self.hide_chart()
+        self.historial = lector.historial()
+        if len(self.historial):
+            self.show_emotion_statistics()
+            consejo(self.root, self.historial)
+        else:
+            self.pantalla.limpiar()
+            self.result_label.config(text="Sesión: sin detecciones")
+
+    def toggle_hud(self):
+        self.hud = not self.hud
+
+    def toggle_panel(self):
+        self.mostrar_panel = not self.mostrar_panel
+        if self.streaming:
+            self.show_panel(self.mostrar_panel)
+
+    def toggle_profile(self):
+        if self.perfilador.activo:
+            self.perfilador.detener()
+            return
+        self.perfilador.iniciar()
+        self.root.title("Detector Avanzado de Emociones - perfilando (F4 detiene)")
+        self.root.after(500, self.check_profile)
+
+    def check_profile(self):
+        """
+        Espera a que la captura termine y avisa dónde quedó el resumen
+        """
+        if self.perfilador.activo:
+            self.root.after(500, self.check_profile)
+            return
+        if self.perfilador.error:
+            mensaje = f"Error en la captura de perfil: {self.perfilador.error}"
+            logger.error(mensaje)
+        else:
+            mensaje = f"Perfil guardado en {self.perfilador.ultimo_resumen}"
+            logger.info(mensaje)
+        # Con la webcam activa la etiqueta de estado cambia en cada frame: el
+        # aviso queda además unos segundos en el título
+        self.result_label.config(text=mensaje)
+        self.root.title(f"Detector Avanzado de Emociones - {mensaje}")
+        self.root.after(10000, lambda: self.perfilador.activo or self.root.title("Detector Avanzado de Emociones"))
+
+    def show_panel(self, visible):
+        """
+        Muestra u oculta el panel en vivo; la figura se crea una sola vez
+        """
+        if visible:
+            if self.panel is None:
+                self.panel = PanelEmociones(self.display_frame, clases_motor())
+            self.panel.reset()
+            self.panel.mostrar(antes=self.display_label)
+        elif self.panel is not None:
+            self.panel.ocultar()
+        self.resize_display()
+
+    def resize_display(self, ancho=None, alto=None):
+        """
+        Tamaño disponible para el video: el de display_frame menos el panel
+        """
+        if ancho is None:
+            ancho, alto = self.display_frame.winfo_width(), self.display_frame.winfo_height()
+        if self.panel is not None and self.panel.visible:
+            ancho -= self.panel.ancho
+        self.pantalla.configurar(ancho, alto)
+
+    def export_metrics(self):
+        """
+        Vuelca las métricas al archivo JSON cada 5 s mientras hay webcam
+        """
+        if not self.metricas_json:
+            return
+        METRICAS.exportar_json(self.metricas_json)
+        if self.streaming:
+            self.root.after(5000, self.export_metrics)
 
     def toggle_webcam(self):
         if not self.streaming:
@@ -144,9 +397,23 @@ class EmotionApp:
     def start_webcam(self):
         self.streaming = True
         # Limpiar estadísticas anteriores
-        self.emotion_history.clear()
-        self.emotion_stats.clear()
+        self.historial.clear()
+        self.session_start = time.monotonic()
         self.hide_chart()
+        if self.grabar:
+            self.grabador = GrabadorSesion(nueva_ruta())
+        METRICAS.reset()
+        if self.mostrar_panel:
+            self.show_panel(True)
+        if self.scheduler:
+            self.scheduler.reset()
+        if self.reutilizador:
+            self.reutilizador.reset()
+        self.ultimo_registrado = None
+        self.identifier.reset()
+        self.planificador.reset()
+        self.suavizador.reset()
+        self.ultimas_caras = []
         
         self.btn_webcam.config(
             text="❌ Detener Webcam",
@@ -154,159 +421,236 @@ class EmotionApp:
             activebackground="#e74c3c"
         )
         self.cap = cv2.VideoCapture(0)
-        self.update_frame()
+        if self.modo_pipeline:
+            self.pipeline = FramePipeline(self.cap, self.analyze_frame,
+                                          throttle=self.planificador.espera_inferencia)
+            self.pipeline.start()
+            self.render_frame()
+        else:
+            self.update_frame()
+        self.root.after(5000, self.export_metrics)
 
     def stop_webcam(self):
         self.streaming = False
-        if self.cap:
+        if self.pipeline:
+            # El hilo de captura libera la cámara al terminar su lectura
+            self.pipeline.stop()
+            self.pipeline = None
+        elif self.cap:
             self.cap.release()
-            self.cap = None
+        self.cap = None
+        grabada = ""
+        if self.grabador:
+            self.grabador.cerrar()
+            grabada = f"Sesión grabada en {self.grabador.ruta} ({self.grabador.registros} registros)"
+            logger.info(grabada)
+            self.grabador = None
+        self.export_metrics()
+        if self.panel is not None:
+            self.show_panel(False)
         
         # Mostrar estadísticas si hay datos
-        if self.emotion_history:
+        if len(self.historial):
             self.show_emotion_statistics()
-            consejo(self.root, self.emotion_history)
+            consejo(self.root, self.historial)
         else:
-            self.display_label.config(image='')
+            self.pantalla.limpiar()
             
         self.btn_webcam.config(
             text="📷 Iniciar Webcam",
             bg="#2980b9",
             activebackground="#3498db"
         )
-        self.result_label.config(text="Estado: Webcam detenida")
+        self.result_label.config(text=f"Estado: Webcam detenida\n{grabada}" if grabada else "Estado: Webcam detenida")
+
+    def analyze_frame(self, frame):
+        """
+        Analiza todas las caras de un frame BGR y retorna la lista de
+        interpretar_resultados. Puede ejecutarse fuera del hilo de Tk.
+        """
+        inicio = time.monotonic()
+        try:
+            if self.reutilizador:
+                caras = self.reutilizador.buscar(frame)
+                if caras is not None:
+                    return caras
+            if self.scheduler:
+                resultado = self.scheduler.process(frame)
+            else:
+                resultado = analizar_caras(frame, detector=self.detector)
+            caras = interpretar_resultados(self.identifier.assign(resultado))
+            if self.reutilizador:
+                self.reutilizador.guardar(caras)
+            return caras
+        finally:
+            self.planificador.registrar_inferencia(time.monotonic() - inicio)
+
+    def record_result(self, caras, timestamp=None, frame=None):
+        """
+        Guarda el resultado de cada cara en las estadísticas de la sesión y en
+        la grabación. 'timestamp' es el instante (time.monotonic) en que se
+        capturó el frame. Un resultado reutilizado (el mismo objeto que el
+        último registrado) no es una detección nueva y no se guarda.
+        """
+        if caras is self.ultimo_registrado:
+            return
+        self.ultimo_registrado = caras
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.historial.registrar(caras, timestamp - self.session_start)
+        if self.grabador:
+            self.grabador.agregar(timestamp - self.session_start, caras, frame)
+
+    def show_frame(self, frame, caras, origen="Webcam", error="Sin detección"):
+        """
+        Convierte el frame BGR, dibuja el resultado de cada cara y lo muestra
+        en la ventana. 'caras' es None si el análisis falló.
+        """
+        principal = cara_principal(caras)
+        if principal is not None:
+            # La confianza se cuantiza para reutilizar las etiquetas ya dibujadas
+            texto, porcentaje = formatear_resultado(principal['dominant_emotion'],
+                                                    cuantizar(principal['confidence']))
+        elif caras is None:
+            texto, porcentaje = error, "--"
+        else:
+            texto, porcentaje = "Sin detección", "--"
+        
+        # Redimensionar para display y convertir a RGB (en búferes reutilizados)
+        with METRICAS.medir("conversion"):
+            frame_rgb, escala = self.pantalla.preparar(frame)
+        
+        # Dibujar la caja de cada cara y el texto mejorado
+        with METRICAS.medir("dibujo"):
+            if caras and len(caras) > 1:
+                self.draw_face_boxes(frame_rgb, caras, escala)
+            frame_con_texto = self.draw_emotion_display(frame_rgb, texto, porcentaje)
+            if self.hud and origen == "Webcam":
+                self.draw_hud(frame_con_texto)
+        
+        with METRICAS.medir("tk"):
+            self.pantalla.mostrar(frame_con_texto)
+        if origen == "Webcam":
+            METRICAS.tick("video")
+            if self.panel is not None and self.panel.visible:
+                self.panel.actualizar(self.historial)
+        estado = f"{origen}: {texto} - {porcentaje}"
+        if caras and len(caras) > 1:
+            estado += f" [{len(caras)} caras]"
+        if origen == "Webcam" and self.scheduler:
+            estado += f" ({self.scheduler.summary()})"
+        if origen == "Webcam" and self.reutilizador:
+            estado += f" reuso {self.reutilizador.tasa:.0%}"
+            METRICAS.contar("reutilizados", self.reutilizador.reutilizados)
+        if origen == "Webcam":
+            estado += f" | {self.planificador.resumen()}"
+        self.result_label.config(text=estado)
 
     def update_frame(self):
         if not self.streaming or self.cap is None:
             return
         
-        ret, frame = self.cap.read()
+        inicio = time.monotonic()
+        self.planificador.actualizar(inicio)
+        with METRICAS.medir("captura"):
+            ret, frame = self.cap.read()
         if not ret:
             print("ret:", ret)
             self.result_label.config(text="Error al acceder a la cámara.")
             self.stop_webcam()
             return
         
-        # Analizar emoción en el frame
-        try:
-            resultado = self.detector.analyze(
-                frame,
-                actions=['emotion'],
-                #models={"emotion": custom_emotion_model},
-                #detector_backend="opencv",
-                enforce_detection=False
-            )
-            if isinstance(resultado, list):
-                res = resultado[0]
-            else:
-                res = resultado
-            
-            dominant = res['dominant_emotion']
-            confidence = res['emotion'][dominant] * 100 if 'emotion' in res else 0.0
-            texto = f"{dominant.capitalize()}"
-            porcentaje = f"{confidence:05.2f}%"
-            
-            # Guardar estadísticas
-            self.emotion_history.append(dominant)
-            for emotion, value in res['emotion'].items():
-                self.emotion_stats[emotion].append(value * 100)
+        # Analizar emoción solo cuando el planificador da el turno; entre
+        # inferencias se muestra el último resultado suavizado
+        if self.planificador.espera_inferencia() <= 0:
+            try:
+                caras = self.analyze_frame(frame)
                 
-        except:
-            texto = "Sin detección"
-            porcentaje = "--"
-        
-        # Convertir a RGB y redimensionar para display
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame_rgb = self.resize_for_display(frame_rgb)
-        
-        # Dibujar la caja y el texto mejorado
-        frame_con_texto = self.draw_emotion_display(frame_rgb, texto, porcentaje)
-        
-        img_pil = Image.fromarray(frame_con_texto)
-        img_tk = ImageTk.PhotoImage(img_pil)
+                # Guardar estadísticas
+                self.record_result(caras, frame=frame)
+                METRICAS.tick("inferencia")
+                self.ultimas_caras = self.suavizador.actualizar(caras)
+                    
+            except:
+                self.ultimas_caras = None
+        
+        inicio_display = time.monotonic()
+        self.show_frame(frame, self.ultimas_caras)
+        self.planificador.registrar_display(time.monotonic() - inicio_display)
+        METRICAS.registrar("frame", time.monotonic() - inicio)
+        
+        # Volver a llamar según la frecuencia de display elegida
+        self.root.after(self.planificador.intervalo_display_ms(time.monotonic() - inicio), self.update_frame)
+
+    def render_frame(self):
+        """
+        Renderizador del modo pipeline: muestra el frame más reciente con el
+        último resultado terminado, sin esperar a la inferencia.
+        """
+        if not self.streaming or self.pipeline is None:
+            return
         
-        self.current_image = img_tk
-        self.display_label.config(image=img_tk)
-        self.result_label.config(text=f"Webcam: {texto} - {porcentaje}")
+        if self.pipeline.failed:
+            self.result_label.config(text="Error al acceder a la cámara.")
+            self.stop_webcam()
+            return
         
-        # Volver a llamar en 30 ms
-        self.root.after(30, self.update_frame)
+        # Incorporar el resultado más reciente, si hay uno nuevo
+        packet = self.pipeline.results.get_nowait()
+        if packet is not None:
+            if packet.error is None:
+                self.ultimas_caras = self.suavizador.actualizar(packet.result)
+                self.record_result(packet.result, packet.timestamp, packet.frame)
+            else:
+                self.ultimas_caras = None
+            METRICAS.tick("inferencia")
+        
+        # Mostrar el frame más reciente; los anteriores ya se descartaron
+        inicio = time.monotonic()
+        self.planificador.actualizar(inicio)
+        packet = self.pipeline.frames.get_nowait()
+        if packet is not None:
+            self.show_frame(packet.frame, self.ultimas_caras)
+            self.planificador.registrar_display(time.monotonic() - inicio)
+            # Latencia de extremo a extremo: desde la captura hasta la pantalla
+            METRICAS.registrar("frame", time.monotonic() - packet.timestamp)
+        descartados_display, descartados_inferencia = self.pipeline.dropped_frames
+        METRICAS.contar("descartados_display", descartados_display)
+        METRICAS.contar("descartados_inferencia", descartados_inferencia)
+        
+        self.root.after(self.planificador.intervalo_display_ms(time.monotonic() - inicio), self.render_frame)
 
     def draw_emotion_display(self, img, emocion, porcentaje):
         """
-        Dibuja un display elegante con la emoción detectada y su porcentaje
+        Dibuja un display elegante con la emoción detectada y su porcentaje.
+        Solo se mezcla la región del contenedor (ver overlay.py).
         """
-        h, w = img.shape[:2]
-        overlay = img.copy()
-        
-        # Configuración de fuentes y tamaños
-        font_emotion = cv2.FONT_HERSHEY_DUPLEX
-        font_percentage = cv2.FONT_HERSHEY_SIMPLEX
-        
-        emotion_scale = 1.2
-        percentage_scale = 0.8
-        thickness = 2
-        
-        # Obtener dimensiones del texto
-        (emotion_w, emotion_h), _ = cv2.getTextSize(emocion, font_emotion, emotion_scale, thickness)
-        (percent_w, percent_h), _ = cv2.getTextSize(porcentaje, font_percentage, percentage_scale, thickness)
-        
-        # Configuración del contenedor principal
-        padding = 20
-        container_height = emotion_h + percent_h + padding * 3
-        container_width = max(emotion_w, percent_w) + padding * 2
-        
-        # Centrar el contenedor horizontalmente
-        container_x = (w - container_width) // 2
-        container_y = 15
-        
-        # Dibujar contenedor principal con gradiente simulado
-        # Capa base (más oscura)
-        cv2.rectangle(overlay, 
-                     (container_x - 5, container_y - 5), 
-                     (container_x + container_width + 5, container_y + container_height + 5), 
-                     (30, 30, 30), -1)
-        
-        # Capa principal
-        cv2.rectangle(overlay, 
-                     (container_x, container_y), 
-                     (container_x + container_width, container_y + container_height), 
-                     (45, 45, 45), -1)
-        
-        # Línea superior decorativa (color según emoción)
         color_emotion = self.get_emotion_color(emocion.lower())
-        cv2.rectangle(overlay, 
-                     (container_x, container_y), 
-                     (container_x + container_width, container_y + 4), 
-                     color_emotion, -1)
-        
-        # Aplicar transparencia
-        alpha = 0.85
-        cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-        
-        # Posiciones del texto
-        emotion_x = container_x + (container_width - emotion_w) // 2
-        emotion_y = container_y + padding + emotion_h
-        
-        percent_x = container_x + (container_width - percent_w) // 2
-        percent_y = emotion_y + padding + percent_h
-        
-        # Dibujar texto de emoción con sombra
-        # Sombra
-        cv2.putText(img, emocion, (emotion_x + 2, emotion_y + 2), 
-                   font_emotion, emotion_scale, (0, 0, 0), thickness + 1)
-        # Texto principal
-        cv2.putText(img, emocion, (emotion_x, emotion_y), 
-                   font_emotion, emotion_scale, (255, 255, 255), thickness)
-        
-        # Dibujar porcentaje con color de la emoción
-        # Sombra
-        cv2.putText(img, porcentaje, (percent_x + 1, percent_y + 1), 
-                   font_percentage, percentage_scale, (0, 0, 0), thickness)
-        # Texto principal
-        cv2.putText(img, porcentaje, (percent_x, percent_y), 
-                   font_percentage, percentage_scale, color_emotion, thickness)
-        
+        return self.overlay.contenedor(img, emocion, porcentaje, color_emotion)
+
+    def draw_face_boxes(self, img, caras, escala=1.0):
+        """
+        Dibuja la caja de cada cara con su identificador, emoción y porcentaje
+        """
+        colores, textos = [], []
+        for cara in caras:
+            texto, porcentaje = formatear_resultado(cara['dominant_emotion'], cuantizar(cara['confidence']))
+            colores.append(self.get_emotion_color(cara['dominant_emotion']))
+            textos.append(f"#{cara['face_id']} {texto} {porcentaje}")
+        return self.overlay.caras(img, caras, colores, textos, escala)
+
+    def draw_hud(self, img):
+        """
+        Dibuja las métricas de latencia (p50/p95/p99) y los FPS medidos
+        """
+        font = cv2.FONT_HERSHEY_PLAIN
+        # Una sola vez por frame: cada llamada recalcula los percentiles
+        lineas = METRICAS.lineas_hud()
+        y = img.shape[0] - 10 - 14 * (len(lineas) - 1)
+        for linea in lineas:
+            cv2.putText(img, linea, (9, y + 1), font, 1.0, (0, 0, 0), 2)
+            cv2.putText(img, linea, (8, y), font, 1.0, (0, 255, 0), 1)
+            y += 14
         return img
 
     def get_emotion_color(self, emotion):
@@ -329,8 +673,11 @@ class EmotionApp:
         """
         Muestra una gráfica con las estadísticas de emociones detectadas
         """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
         # Ocultar la imagen actual
-        self.display_label.config(image='')
+        self.pantalla.limpiar()
         
         # Crear frame para la gráfica si no existe
         if self.chart_frame is None:
@@ -338,38 +685,28 @@ class EmotionApp:
         
         self.chart_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Calcular estadísticas
-        emotion_counts = Counter(self.emotion_history)
-        total_detections = len(self.emotion_history)
+        # Leer los resúmenes del historial (sin recorrer las detecciones)
+        emotion_counts = self.historial.conteos()
+        total_detections = len(self.historial)
         
-        # Calcular promedios de confianza
-        avg_confidences = {}
-        for emotion, values in self.emotion_stats.items():
-            if values:
-                avg_confidences[emotion] = np.mean(values)
+        # Promedios de confianza
+        avg_confidences = self.historial.medias()
         
-        # Crear la figura con dos subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+        # Crear la figura con dos subplots. Figure directamente (no pyplot):
+        # pyplot la registraría y nunca se liberaría al cerrar la gráfica
+        fig = Figure(figsize=(12, 5))
+        ax1, ax2 = fig.subplots(1, 2)
         fig.patch.set_facecolor('#34495e')
         
         # Colores para las emociones (RGB normalizados)
-        emotion_colors_rgb = {
-            'happy': (1.0, 0.84, 0.0),      # Amarillo-naranja
-            'sad': (0.39, 0.39, 1.0),       # Azul
-            'angry': (1.0, 0.2, 0.2),       # Rojo
-            'fear': (0.5, 0.0, 1.0),        # Púrpura
-            #'surprise': (1.0, 1.0, 0.0),    # Amarillo
-            'disgust': (0.0, 0.5, 0.0),     # Verde
-            #'neutral': (0.78, 0.78, 0.78),  # Gris
-            'contempt': (0.6, 0.4, 0.2),    # Marrón
-        }
+        emotion_colors_rgb = COLORES_EMOCIONES
         
         # Gráfica 1: Frecuencia de emociones (barras)
         emotions = list(emotion_counts.keys())
         frequencies = [emotion_counts[emotion] for emotion in emotions]
         percentages = [(count/total_detections)*100 for count in frequencies]
         
-        colors1 = [emotion_colors_rgb.get(emotion, (0.8, 0.8, 0.8)) for emotion in emotions]
+        colors1 = [emotion_colors_rgb.get(emotion, COLOR_POR_DEFECTO) for emotion in emotions]
         
         bars = ax1.bar(emotions, percentages, color=colors1, alpha=0.8, edgecolor='white', linewidth=1.5)
         ax1.set_title('Frecuencia de Emociones Detectadas', color='white', fontsize=14, fontweight='bold')
@@ -390,7 +727,7 @@ class EmotionApp:
             # Filtrar solo emociones que fueron detectadas
             detected_emotions = [emotion for emotion in avg_confidences.keys() if emotion in emotions]
             avg_values = [avg_confidences[emotion] for emotion in detected_emotions]
-            colors2 = [emotion_colors_rgb.get(emotion, (0.8, 0.8, 0.8)) for emotion in detected_emotions]
+            colors2 = [emotion_colors_rgb.get(emotion, COLOR_POR_DEFECTO) for emotion in detected_emotions]
             
             wedges, texts, autotexts = ax2.pie(avg_values, labels=detected_emotions, autopct='%1.1f%%',
                                               colors=colors2, startangle=90, textprops={'color': 'white'})
@@ -403,11 +740,11 @@ class EmotionApp:
             ax2.set_title('Confianza Promedio por Emoción', color='white', fontsize=14, fontweight='bold')
         
         # Ajustar layout
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Crear canvas y mostrarlo
         if self.chart_canvas:
-            self.chart_canvas.destroy()
+            self.chart_canvas.get_tk_widget().destroy()
             
         self.chart_canvas = FigureCanvasTkAgg(fig, self.chart_frame)
         self.chart_canvas.draw()
@@ -430,7 +767,7 @@ class EmotionApp:
         close_btn.pack(pady=10)
         
         # Actualizar texto de estado
-        total_time = len(self.emotion_history) * 0.03  # Aproximadamente 30ms por frame
+        total_time = self.historial.duracion  # A partir de las marcas de tiempo reales
         self.result_label.config(
             text=f"Estadísticas: {total_detections} detecciones en {total_time:.1f}s - Emoción más frecuente: {max(emotion_counts, key=emotion_counts.get).capitalize()}"
         )
@@ -446,21 +783,70 @@ class EmotionApp:
         if self.chart_canvas:
             self.chart_canvas = None
 
-    def resize_for_display(self, img):
-        """
-        Redimensiona 'img' (RGB) para que quepa dentro de display_frame,
-        manteniendo proporción.
-        """
-        frame_h, frame_w = img.shape[:2]
-        disp_w = self.display_frame.winfo_width()
-        disp_h = self.display_frame.winfo_height()
-        if disp_w <= 0 or disp_h <= 0:
-            return img  # Aún no se ha renderizado el frame
-        scale = min(disp_w / frame_w, disp_h / frame_h)
-        new_w, new_h = int(frame_w * scale), int(frame_h * scale)
-        return cv2.resize(img, (new_w, new_h))
-
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Detector Avanzado de Emociones")
+    parser.add_argument("--sin-pipeline", action="store_true",
+                        help="analizar cada frame en el hilo de la interfaz (modo clásico)")
+    parser.add_argument("--sin-seguimiento", action="store_true",
+                        help="ejecutar la detección de caras en todos los frames")
+    parser.add_argument("--detectar-cada", type=int, default=10,
+                        help="frames entre detecciones completas cuando hay seguimiento")
+    parser.add_argument("--video-hz", type=float, default=2.0,
+                        help="frames por segundo de video analizados en el modo video")
+    parser.add_argument("--motor", choices=MOTORES, default="deepface",
+                        help="clasificador de emociones: DeepFace o my_emotion_model (Keras/TFLite)")
+    parser.add_argument("--sin-grabacion", action="store_true",
+                        help="no grabar las sesiones de webcam en sesiones/")
+    parser.add_argument("--umbral-cambio", type=float, default=3.0,
+                        help="diferencia media (0-255) bajo la cual se reutiliza el último resultado; 0 lo desactiva")
+    parser.add_argument("--cpu-max", type=float, default=0.8,
+                        help="uso de CPU objetivo como fracción de un núcleo (0.5 = 50%%)")
+    parser.add_argument("--min-fps-inferencia", type=float, default=5.0,
+                        help="inferencias por segundo mínimas, aunque se supere --cpu-max")
+    parser.add_argument("--fps-display", type=float, default=30.0,
+                        help="frames mostrados por segundo como máximo")
+    parser.add_argument("--suavizado", type=float, default=0.3,
+                        help="constante de tiempo en segundos del suavizado de emociones; 0 lo desactiva")
+    parser.add_argument("--sin-precalentar-llm", action="store_true",
+                        help="no enviar la petición de calentamiento al servidor de consejos al iniciar")
+    parser.add_argument("--panel", action="store_true",
+                        help="mostrar estadísticas en vivo junto al video (F3 lo alterna)")
+    parser.add_argument("--hud", action="store_true",
+                        help="mostrar las latencias por etapa sobre el video (F2 lo alterna)")
+    parser.add_argument("--metricas-json", metavar="RUTA",
+                        help="volcar las métricas a un archivo JSON cada 5 s")
+    parser.add_argument("--metricas-puerto", type=int, metavar="PUERTO",
+                        help="servir las métricas en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--detector-backend",
+                        help="backend de detección de DeepFace (opencv, mtcnn, retinaface...)")
+    parser.add_argument("--escala-deteccion", type=float,
+                        help="escala del frame al detectar (0.5 = mitad); las caras se recortan a resolución completa")
+    parser.add_argument("--config-detector", default=RUTA_CONFIG,
+                        help="configuración elegida por autotune_detector.py, si existe")
+    parser.add_argument("--perfil-segundos", type=float, default=30.0,
+                        help="duración de las capturas de perfil que inicia F4 (ver perfilado.py)")
+    args = parser.parse_args()
+    usar_motor(args.motor)
+    aplicar_config(args.config_detector)
+    backend, escala = configuracion_detector()
+    usar_detector(args.detector_backend or backend, args.escala_deteccion or escala)
+    
     root = tk.Tk()
-    app = EmotionApp(root)
+    app = EmotionApp(root, modo_pipeline=not args.sin_pipeline,
+                     seguimiento=not args.sin_seguimiento,
+                     detectar_cada=args.detectar_cada,
+                     video_hz=args.video_hz,
+                     grabar=not args.sin_grabacion,
+                     hud=args.hud,
+                     metricas_json=args.metricas_json,
+                     metricas_puerto=args.metricas_puerto,
+                     umbral_cambio=args.umbral_cambio,
+                     max_cpu=args.cpu_max,
+                     min_fps_inferencia=args.min_fps_inferencia,
+                     fps_display=args.fps_display,
+                     suavizado=args.suavizado,
+                     precalentar_llm=not args.sin_precalentar_llm,
+                     panel=args.panel,
+                     perfil_segundos=args.perfil_segundos)
     root.mainloop()
\ No newline at end of file
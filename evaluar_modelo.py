@@ -0,0 +1,98 @@
+"""
+Evaluación de my_emotion_model (Keras o TFLite) sobre un dataset compilado
+con compilar_dataset.py: exactitud, precisión/recall/F1 por clase, matriz de
+confusión y rendimiento en imágenes por segundo. Las imágenes se leen de los
+fragmentos con np.memmap, sin decodificar ni redimensionar.
+
+Uso:
+    python evaluar_modelo.py dataset_compilado --motor tflite --subconjunto validation
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from compilar_dataset import SALIDA, DatasetCompilado
+from motor_emociones import crear_motor
+
+
+def evaluar(motor, datos, subconjunto="validation", lote=64):
+    """
+    Retorna (verdaderas, predichas) como índices de datos.clases y el tiempo
+    de predicción en segundos
+    """
+    # Las clases del modelo pueden estar en otro orden que las del dataset
+    columnas = [motor.clases.index(c) if c in motor.clases else -1 for c in datos.clases]
+    faltantes = [c for c, i in zip(datos.clases, columnas) if i < 0]
+    if faltantes:
+        raise ValueError(f"El modelo no tiene las clases {faltantes}")
+
+    verdaderas, predichas = [], []
+    tiempo = 0.0
+    for x, etiquetas in datos.lotes(subconjunto, lote, etiquetas=True):
+        inicio = time.perf_counter()
+        pred = motor.predecir(x)
+        tiempo += time.perf_counter() - inicio
+        predichas.append(np.argmax(pred[:, columnas], axis=1))
+        verdaderas.append(etiquetas)
+    if not verdaderas:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), tiempo
+    return np.concatenate(verdaderas), np.concatenate(predichas), tiempo
+
+
+def metricas(verdaderas, predichas, n_clases):
+    confusion = np.zeros((n_clases, n_clases), np.int64)
+    np.add.at(confusion, (verdaderas, predichas), 1)
+    aciertos = np.diag(confusion).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(aciertos / confusion.sum(axis=0))
+        recall = np.nan_to_num(aciertos / confusion.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return {
+        "exactitud": float(aciertos.sum() / max(1, confusion.sum())),
+        "precision": precision.tolist(),
+        "recall": recall.tolist(),
+        "f1": f1.tolist(),
+        "confusion": confusion.tolist(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("compilado", nargs="?", default=SALIDA)
+    parser.add_argument("--motor", choices=["keras", "tflite"], default="keras")
+    parser.add_argument("--subconjunto", choices=["validation", "training"], default="validation")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--salida", help="guardar las métricas en JSON")
+    args = parser.parse_args()
+
+    datos = DatasetCompilado(args.compilado)
+    motor = crear_motor(args.motor)
+    verdaderas, predichas, tiempo = evaluar(motor, datos, args.subconjunto, args.lote)
+    if not len(verdaderas):
+        print(f"El subconjunto {args.subconjunto} está vacío.", file=sys.stderr)
+        return 1
+    resultado = metricas(verdaderas, predichas, len(datos.clases))
+    resultado.update(motor=args.motor, subconjunto=args.subconjunto, clases=datos.clases,
+                     imagenes=len(verdaderas), imagenes_s=len(verdaderas) / tiempo if tiempo else 0.0)
+
+    print(f"{len(verdaderas)} imágenes ({args.subconjunto}) con {args.motor}: "
+          f"exactitud {resultado['exactitud']:.2%}, {resultado['imagenes_s']:.1f} imágenes/s")
+    print(f"{'clase':>12} | {'precisión':>9} | {'recall':>6} | {'F1':>5}")
+    for i, clase in enumerate(datos.clases):
+        print(f"{clase:>12} | {resultado['precision'][i]:>9.2%} | {resultado['recall'][i]:>6.2%} | "
+              f"{resultado['f1'][i]:>5.2f}")
+    print("Matriz de confusión (filas: verdadera, columnas: predicha)")
+    for clase, fila in zip(datos.clases, resultado["confusion"]):
+        print(f"{clase:>12} " + " ".join(f"{v:>5}" for v in fila))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
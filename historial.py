@@ -0,0 +1,223 @@
+import numpy as np
+
+# Ventanas móviles por defecto: último minuto, 5 y 15 minutos
+VENTANAS = (60, 300, 900)
+
+
+class HistorialEmociones:
+    """
+    Estadísticas de una sesión con memoria acotada y actualización O(1):
+    conteo de emociones dominantes, media y varianza (Welford) de la
+    puntuación de cada emoción, conteos en ventanas móviles de tiempo
+    (cubetas de 1 s) y un anillo de tamaño fijo con las puntuaciones más
+    recientes. Lo comparten la webcam, el modo video y los modos sin interfaz.
+    Las puntuaciones se guardan como las da DeepFace, en porcentaje (0-100).
+    """
+
+    def __init__(self, capacidad=2048, max_emociones=16, horizonte=max(VENTANAS)):
+        self.capacidad = capacidad
+        self.max_emociones = max_emociones
+        self.horizonte = horizonte
+        self.clear()
+
+    def clear(self):
+        self.emociones = []   # columna -> emoción
+        self.indices = {}     # emoción -> columna
+        self.total = 0
+        self.inicio = None
+        self.fin = None
+
+        e = self.max_emociones
+        self.conteo = np.zeros(e, np.int64)
+        self.muestras = np.zeros(e, np.int64)
+        self.media = np.zeros(e, np.float64)
+        self.m2 = np.zeros(e, np.float64)
+        self.por_cara = {}    # face_id -> conteo de dominantes
+
+        # Una cubeta por segundo, reutilizadas de forma circular
+        self.cubeta_segundo = np.full(self.horizonte, -1, np.int64)
+        self.cubeta_conteo = np.zeros((self.horizonte, e), np.int32)
+
+        # Anillo con las detecciones más recientes
+        self.anillo_puntuaciones = np.zeros((self.capacidad, e), np.float32)
+        self.anillo_tiempos = np.zeros(self.capacidad, np.float64)
+        self.anillo_dominante = np.zeros(self.capacidad, np.int16)
+        self.anillo_cara = np.zeros(self.capacidad, np.int32)
+
+    def _columna(self, emocion):
+        columna = self.indices.get(emocion)
+        if columna is None:
+            if len(self.emociones) == self.max_emociones:
+                raise ValueError(f"Más de {self.max_emociones} emociones distintas")
+            columna = self.indices[emocion] = len(self.emociones)
+            self.emociones.append(emocion)
+        return columna
+
+    def registrar(self, caras, timestamp):
+        """
+        Incorpora el resultado de cada cara (ver interpretar_resultados)
+        tomado en 'timestamp' segundos
+        """
+        for cara in caras:
+            dominante = self._columna(cara['dominant_emotion'])
+            puntuaciones = np.zeros(self.max_emociones, np.float64)
+            presentes = np.zeros(self.max_emociones, bool)
+            for emocion, valor in cara['emotion'].items():
+                columna = self._columna(emocion)
+                puntuaciones[columna] = valor
+                presentes[columna] = True
+
+            # Media y varianza incrementales (Welford) de cada emoción presente
+            self.muestras[presentes] += 1
+            delta = puntuaciones[presentes] - self.media[presentes]
+            self.media[presentes] += delta / self.muestras[presentes]
+            self.m2[presentes] += delta * (puntuaciones[presentes] - self.media[presentes])
+
+            self.conteo[dominante] += 1
+            face_id = cara.get('face_id')
+            if face_id not in self.por_cara:
+                self.por_cara[face_id] = np.zeros(self.max_emociones, np.int64)
+            self.por_cara[face_id][dominante] += 1
+
+            segundo = int(timestamp // 1)
+            cubeta = segundo % self.horizonte
+            if self.cubeta_segundo[cubeta] != segundo:
+                self.cubeta_segundo[cubeta] = segundo
+                self.cubeta_conteo[cubeta] = 0
+            self.cubeta_conteo[cubeta, dominante] += 1
+
+            posicion = self.total % self.capacidad
+            self.anillo_puntuaciones[posicion] = puntuaciones
+            self.anillo_tiempos[posicion] = timestamp
+            self.anillo_dominante[posicion] = dominante
+            self.anillo_cara[posicion] = face_id if face_id is not None else -1
+
+            self.total += 1
+            if self.inicio is None:
+                self.inicio = timestamp
+            self.fin = timestamp
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def duracion(self):
+        """
+        Segundos entre la primera y la última detección
+        """
+        if self.inicio is None:
+            return 0.0
+        return self.fin - self.inicio
+
+    def _a_dict(self, valores):
+        return {emocion: valores[i] for i, emocion in enumerate(self.emociones)}
+
+    def conteos(self):
+        """
+        Veces que cada emoción fue la dominante
+        """
+        return {e: int(c) for e, c in self._a_dict(self.conteo).items() if c}
+
+    def porcentajes(self):
+        """
+        Frecuencia de cada emoción dominante en porcentaje
+        """
+        if not self.total:
+            return {}
+        return {e: 100 * c / self.total for e, c in self.conteos().items()}
+
+    def mas_frecuente(self):
+        conteos = self.conteos()
+        return max(conteos, key=conteos.get) if conteos else None
+
+    def medias(self):
+        """
+        Puntuación media de cada emoción
+        """
+        return {e: float(self.media[i]) for i, e in enumerate(self.emociones) if self.muestras[i]}
+
+    def varianzas(self):
+        return {e: float(self.m2[i] / self.muestras[i])
+                for i, e in enumerate(self.emociones) if self.muestras[i]}
+
+    def ventana(self, segundos):
+        """
+        Conteo de emociones dominantes en los últimos 'segundos' (hasta el
+        horizonte), contados desde la última detección
+        """
+        if self.fin is None:
+            return {}
+        vigentes = self.cubeta_segundo > int(self.fin // 1) - min(segundos, self.horizonte)
+        suma = self.cubeta_conteo[vigentes].sum(axis=0)
+        return {e: int(c) for e, c in self._a_dict(suma).items() if c}
+
+    def ventanas(self, segundos=VENTANAS):
+        return {s: self.ventana(s) for s in segundos}
+
+    def conteos_por_cara(self):
+        return {face_id: {e: int(c) for e, c in self._a_dict(conteo).items() if c}
+                for face_id, conteo in self.por_cara.items()}
+
+    def recientes(self):
+        """
+        Retorna (tiempos, puntuaciones, dominantes) de las detecciones del
+        anillo, de la más antigua a la más reciente. Son vistas del anillo
+        mientras no haya dado la vuelta.
+        """
+        n = min(self.total, self.capacidad)
+        columnas = len(self.emociones)
+        if self.total <= self.capacidad:
+            orden = slice(0, n)
+            return (self.anillo_tiempos[orden], self.anillo_puntuaciones[orden, :columnas],
+                    self.anillo_dominante[orden])
+        inicio = self.total % self.capacidad
+        orden = np.r_[inicio:self.capacidad, 0:inicio]
+        return (self.anillo_tiempos[orden], self.anillo_puntuaciones[orden, :columnas],
+                self.anillo_dominante[orden])
+
+    def cargar(self, emociones, tiempos, puntuaciones, dominantes, caras):
+        """
+        Reconstruye el historial de golpe a partir de arreglos (por ejemplo, de
+        una sesión grabada) con operaciones vectorizadas. 'puntuaciones' es
+        (N, len(emociones)) con los valores de DeepFace y NaN donde falte la
+        emoción; 'dominantes' son índices de columna.
+        """
+        self.clear()
+        n = len(tiempos)
+        if not n:
+            return self
+        e = len(emociones)
+        for emocion in emociones:
+            self._columna(emocion)
+        dominantes = np.asarray(dominantes, np.int64)
+        caras = np.asarray(caras)
+        puntuaciones = np.asarray(puntuaciones, np.float64)[:, :e]
+        presentes = ~np.isnan(puntuaciones)
+
+        self.total = n
+        self.inicio, self.fin = float(tiempos[0]), float(tiempos[-1])
+        self.conteo[:e] = np.bincount(dominantes, minlength=e)[:e]
+        self.muestras[:e] = presentes.sum(axis=0)
+        con_datos = self.muestras[:e] > 0
+        self.media[:e][con_datos] = np.nanmean(puntuaciones[:, con_datos], axis=0)
+        self.m2[:e][con_datos] = np.nanvar(puntuaciones[:, con_datos], axis=0) * self.muestras[:e][con_datos]
+        for face_id in np.unique(caras):
+            conteo = np.zeros(self.max_emociones, np.int64)
+            conteo[:e] = np.bincount(dominantes[caras == face_id], minlength=e)[:e]
+            self.por_cara[None if face_id < 0 else int(face_id)] = conteo
+
+        # Solo las detecciones dentro del horizonte alimentan las cubetas
+        segundos = np.floor(np.asarray(tiempos)).astype(np.int64)
+        vigentes = segundos > int(self.fin // 1) - self.horizonte
+        cubetas = segundos[vigentes] % self.horizonte
+        self.cubeta_segundo[cubetas] = segundos[vigentes]
+        np.add.at(self.cubeta_conteo, (cubetas, dominantes[vigentes]), 1)
+
+        # Las últimas 'capacidad' detecciones van al anillo en su posición
+        ultimas = slice(max(0, n - self.capacidad), n)
+        posiciones = np.arange(n)[ultimas] % self.capacidad
+        self.anillo_puntuaciones[posiciones, :e] = np.nan_to_num(puntuaciones[ultimas])
+        self.anillo_tiempos[posiciones] = tiempos[ultimas]
+        self.anillo_dominante[posiciones] = dominantes[ultimas]
+        self.anillo_cara[posiciones] = caras[ultimas]
+        return self
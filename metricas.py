@@ -0,0 +1,210 @@
+"""
+Instrumentación de latencia por etapa del procesamiento de frames.
+
+Cada etapa guarda sus últimas muestras en un anillo de tamaño fijo para
+calcular percentiles móviles (p50/p95/p99). Las métricas se pueden dibujar en
+pantalla, volcar a un archivo JSON o servir en un endpoint HTTP local
+(formato de texto de Prometheus en /metrics y JSON en /metrics.json).
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Orden en el que se muestran las etapas
+ETAPAS = ["captura", "deteccion", "seguimiento", "clasificacion", "conversion", "dibujo", "tk", "frame"]
+
+
+class EstadisticaEtapa:
+    """
+    Latencias recientes de una etapa (en segundos) y totales acumulados
+    """
+
+    def __init__(self, capacidad=512):
+        self.muestras = np.zeros(capacidad, np.float64)
+        self.escritas = 0
+        self.total = 0.0
+
+    def agregar(self, segundos):
+        self.muestras[self.escritas % len(self.muestras)] = segundos
+        self.escritas += 1
+        self.total += segundos
+
+    def percentiles(self, ps=(50, 95, 99)):
+        n = min(self.escritas, len(self.muestras))
+        if not n:
+            return {p: 0.0 for p in ps}
+        valores = np.percentile(self.muestras[:n], ps)
+        return {p: float(v) for p, v in zip(ps, valores)}
+
+
+class MedidorFPS:
+    """
+    Frames por segundo sobre una ventana móvil de tiempo
+    """
+
+    def __init__(self, ventana=2.0):
+        self.ventana = ventana
+        self.marcas = deque()
+        self.total = 0
+
+    def tick(self, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        self.marcas.append(ahora)
+        self.total += 1
+        while self.marcas and ahora - self.marcas[0] > self.ventana:
+            self.marcas.popleft()
+
+    @property
+    def fps(self):
+        if len(self.marcas) < 2:
+            return 0.0
+        return (len(self.marcas) - 1) / (self.marcas[-1] - self.marcas[0] or 1e-9)
+
+
+class Metricas:
+    """
+    Registro de latencias por etapa, medidores de FPS y contadores
+    (por ejemplo, frames descartados). Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, capacidad=512):
+        self.capacidad = capacidad
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.etapas = {}
+            self.medidores = {}
+            self.contadores = {}
+            self.inicio = time.monotonic()
+
+    def registrar(self, etapa, segundos):
+        with self.lock:
+            estadistica = self.etapas.get(etapa)
+            if estadistica is None:
+                estadistica = self.etapas[etapa] = EstadisticaEtapa(self.capacidad)
+            estadistica.agregar(segundos)
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def tick(self, nombre):
+        with self.lock:
+            medidor = self.medidores.get(nombre)
+            if medidor is None:
+                medidor = self.medidores[nombre] = MedidorFPS()
+            medidor.tick()
+
+    def contar(self, nombre, valor):
+        with self.lock:
+            self.contadores[nombre] = valor
+
+    def resumen(self):
+        """
+        Instantánea serializable: percentiles en ms, FPS y contadores
+        """
+        with self.lock:
+            orden = sorted(self.etapas, key=lambda e: ETAPAS.index(e) if e in ETAPAS else len(ETAPAS))
+            etapas = {}
+            for etapa in orden:
+                estadistica = self.etapas[etapa]
+                p = estadistica.percentiles()
+                etapas[etapa] = {
+                    "p50_ms": p[50] * 1000, "p95_ms": p[95] * 1000, "p99_ms": p[99] * 1000,
+                    "muestras": estadistica.escritas, "total_s": estadistica.total,
+                }
+            return {
+                "tiempo_s": time.monotonic() - self.inicio,
+                "etapas": etapas,
+                "fps": {nombre: m.fps for nombre, m in self.medidores.items()},
+                "frames": {nombre: m.total for nombre, m in self.medidores.items()},
+                "contadores": dict(self.contadores),
+            }
+
+    def lineas_hud(self):
+        """
+        Texto corto para dibujar sobre el video
+        """
+        resumen = self.resumen()
+        lineas = [" ".join(f"{n} {fps:.1f}fps" for n, fps in resumen["fps"].items())]
+        for etapa, datos in resumen["etapas"].items():
+            lineas.append(f"{etapa:<13}{datos['p50_ms']:6.1f} {datos['p95_ms']:6.1f} {datos['p99_ms']:6.1f} ms")
+        if resumen["contadores"]:
+            lineas.append(" ".join(f"{n} {v}" for n, v in resumen["contadores"].items()))
+        return lineas
+
+    def exportar_json(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resumen(), f, indent=2)
+
+    def formato_prometheus(self):
+        resumen = self.resumen()
+        lineas = ["# TYPE emotiontracker_etapa_segundos summary"]
+        for etapa, datos in resumen["etapas"].items():
+            for cuantil, clave in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lineas.append(f'emotiontracker_etapa_segundos{{etapa="{etapa}",quantile="{cuantil}"}} '
+                              f"{datos[clave] / 1000:.6f}")
+            lineas.append(f'emotiontracker_etapa_segundos_sum{{etapa="{etapa}"}} {datos["total_s"]:.6f}')
+            lineas.append(f'emotiontracker_etapa_segundos_count{{etapa="{etapa}"}} {datos["muestras"]}')
+        lineas.append("# TYPE emotiontracker_fps gauge")
+        for nombre, fps in resumen["fps"].items():
+            lineas.append(f'emotiontracker_fps{{tipo="{nombre}"}} {fps:.3f}')
+        for nombre, valor in resumen["contadores"].items():
+            lineas.append(f"emotiontracker_{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global que usan el pipeline y el análisis
+METRICAS = Metricas()
+
+
+def medir(etapa):
+    return METRICAS.medir(etapa)
+
+
+class ServidorMetricas:
+    """
+    Sirve las métricas en http://127.0.0.1:<puerto>/metrics desde un hilo
+    """
+
+    def __init__(self, metricas=METRICAS, puerto=9464):
+        metricas_servidas = metricas
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    cuerpo = metricas_servidas.formato_prometheus().encode()
+                    tipo = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    cuerpo = json.dumps(metricas_servidas.resumen()).encode()
+                    tipo = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -0,0 +1,210 @@
+"""
+Motor de inferencia para el modelo propio my_emotion_model.h5 (MobileNetV2 +
+cabeza densa entrenada en my_emotion_model.py).
+
+Preprocesa en lote con NumPy igual que en el entrenamiento (recorte, 224x224,
+RGB, rescale 1/255) y predice con Keras o con una versión cuantizada en
+TFLite que corre en CPU.
+
+Uso:
+    python motor_emociones.py exportar --cuantizacion dinamica
+    python motor_emociones.py exportar --cuantizacion int8 --datos dataset/
+"""
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+RUTA_MODELO = "my_emotion_model.h5"
+RUTA_TFLITE = "my_emotion_model.tflite"
+RUTA_CLASES = "my_emotion_model_clases.json"
+TAMANO = 224
+
+
+def cargar_clases(ruta_clases=RUTA_CLASES, n_clases=None, dataset="dataset/"):
+    """
+    Nombres de las clases en el orden de salida del modelo. Se leen del JSON
+    que guarda my_emotion_model.py; si no existe se usa el orden alfabético
+    de las carpetas del dataset, como hace flow_from_directory.
+    """
+    if os.path.exists(ruta_clases):
+        with open(ruta_clases, encoding="utf-8") as f:
+            indices = json.load(f)
+        return [clase for clase, _ in sorted(indices.items(), key=lambda x: x[1])]
+    if os.path.isdir(dataset):
+        return sorted(d for d in os.listdir(dataset) if os.path.isdir(os.path.join(dataset, d)))
+    return [f"clase_{i}" for i in range(n_clases or 0)]
+
+
+def preprocesar(caras, salida=None):
+    """
+    Convierte una lista de recortes en un lote float32 (N, 224, 224, 3) en
+    RGB y escala [0, 1]. Los recortes uint8 se asumen BGR (frames de OpenCV);
+    los flotantes, RGB en [0, 1] (DeepFace.extract_faces).
+    """
+    lote = np.empty((len(caras), TAMANO, TAMANO, 3), np.uint8)
+    for i, cara in enumerate(caras):
+        if cara.dtype != np.uint8:
+            cara = cv2.cvtColor(np.clip(cara * 255, 0, 255).astype(np.uint8), cv2.COLOR_RGB2BGR)
+        # load_img de Keras usa interpolación 'nearest' al entrenar
+        cv2.resize(cara, (TAMANO, TAMANO), dst=lote[i], interpolation=cv2.INTER_NEAREST)
+    # BGR -> RGB y reescalado de todo el lote en una sola operación
+    if salida is None:
+        salida = np.empty(lote.shape, np.float32)
+    np.multiply(lote[..., ::-1], np.float32(1.0 / 255), out=salida, dtype=np.float32)
+    return salida
+
+
+def a_porcentajes(predicciones, clases):
+    """
+    Convierte probabilidades en diccionarios emoción -> porcentaje
+    """
+    resultados = []
+    for pred in predicciones:
+        total = float(pred.sum()) or 1.0
+        resultados.append({clase: float(100 * p / total) for clase, p in zip(clases, pred)})
+    return resultados
+
+
+class MotorKeras:
+    """
+    Ejecuta my_emotion_model.h5 con Keras
+    """
+    nombre = "keras"
+
+    def __init__(self, ruta=RUTA_MODELO):
+        from tensorflow.keras.models import load_model
+        self.model = load_model(ruta)
+        self.clases = cargar_clases(n_clases=self.model.output_shape[-1])
+
+    def predecir(self, lote):
+        return np.asarray(self.model(lote, training=False))
+
+    def clasificar_caras(self, caras):
+        if not caras:
+            return []
+        return a_porcentajes(self.predecir(preprocesar(caras)), self.clases)
+
+
+class MotorTFLite:
+    """
+    Ejecuta la exportación TFLite (posiblemente cuantizada) del modelo en CPU
+    """
+    nombre = "tflite"
+
+    def __init__(self, ruta=RUTA_TFLITE, hilos=None):
+        import tensorflow as tf
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No existe {ruta}; ejecuta 'python motor_emociones.py exportar'")
+        self.interpreter = tf.lite.Interpreter(model_path=ruta, num_threads=hilos or os.cpu_count())
+        self.entrada = self.interpreter.get_input_details()[0]
+        self.salida = self.interpreter.get_output_details()[0]
+        self.tamano_lote = None
+        self.clases = cargar_clases(n_clases=int(self.salida["shape"][-1]))
+
+    def _preparar(self, n):
+        # Reasignar tensores solo cuando cambia el tamaño del lote
+        if n != self.tamano_lote:
+            self.interpreter.resize_tensor_input(self.entrada["index"], [n, TAMANO, TAMANO, 3])
+            self.interpreter.allocate_tensors()
+            self.entrada = self.interpreter.get_input_details()[0]
+            self.salida = self.interpreter.get_output_details()[0]
+            self.tamano_lote = n
+
+    def predecir(self, lote):
+        self._preparar(len(lote))
+        escala, cero = self.entrada["quantization"]
+        if self.entrada["dtype"] in (np.int8, np.uint8) and escala:
+            lote = np.round(lote / escala + cero).astype(self.entrada["dtype"])
+        self.interpreter.set_tensor(self.entrada["index"], lote)
+        self.interpreter.invoke()
+        pred = self.interpreter.get_tensor(self.salida["index"])
+        escala, cero = self.salida["quantization"]
+        if self.salida["dtype"] in (np.int8, np.uint8) and escala:
+            pred = (pred.astype(np.float32) - cero) * escala
+        return pred
+
+    def clasificar_caras(self, caras):
+        if not caras:
+            return []
+        return a_porcentajes(self.predecir(preprocesar(caras)), self.clases)
+
+
+MOTORES = ["deepface", "keras", "tflite"]
+
+
+def crear_motor(nombre):
+    """
+    Retorna el motor pedido, o None para el clasificador de DeepFace
+    """
+    if nombre in (None, "deepface"):
+        return None
+    if nombre == "keras":
+        return MotorKeras()
+    if nombre == "tflite":
+        return MotorTFLite()
+    raise ValueError(f"Motor desconocido: {nombre}")
+
+
+def imagenes_representativas(dataset, n=200):
+    """
+    Lotes de una imagen del dataset para calibrar la cuantización int8
+    """
+    rutas = []
+    for carpeta, _, archivos in os.walk(dataset):
+        rutas.extend(os.path.join(carpeta, a) for a in sorted(archivos)
+                     if a.lower().endswith((".jpg", ".jpeg", ".png")))
+    rng = np.random.default_rng(0)
+    for ruta in rng.permutation(rutas)[:n]:
+        img = cv2.imread(str(ruta))
+        if img is not None:
+            yield [preprocesar([img])]
+
+
+def exportar_tflite(ruta_h5=RUTA_MODELO, ruta_salida=RUTA_TFLITE, cuantizacion="dinamica",
+                    dataset="dataset/"):
+    """
+    Exporta el modelo Keras a TFLite. 'cuantizacion' puede ser "ninguna",
+    "dinamica" (pesos int8), "float16" o "int8" (pesos y activaciones,
+    calibrado con imágenes del dataset).
+    """
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(load_model(ruta_h5))
+    if cuantizacion != "ninguna":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if cuantizacion == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif cuantizacion == "int8":
+        converter.representative_dataset = lambda: imagenes_representativas(dataset)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    with open(ruta_salida, "wb") as f:
+        f.write(converter.convert())
+    return ruta_salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    exportar = sub.add_parser("exportar", help="exportar el modelo a TFLite")
+    exportar.add_argument("--modelo", default=RUTA_MODELO)
+    exportar.add_argument("--salida", default=RUTA_TFLITE)
+    exportar.add_argument("--cuantizacion", choices=["ninguna", "dinamica", "float16", "int8"],
+                          default="dinamica")
+    exportar.add_argument("--datos", default="dataset/", help="imágenes para calibrar int8")
+    args = parser.parse_args()
+
+    ruta = exportar_tflite(args.modelo, args.salida, args.cuantizacion, args.datos)
+    print(f"Modelo exportado a {ruta} ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
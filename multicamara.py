@@ -0,0 +1,288 @@
+"""
+Monitoreo simultáneo de varias cámaras o videos sin interfaz.
+
+Cada fuente (índice de dispositivo o archivo de video) tiene su propio hilo
+de captura, una cola "el último gana" de un solo frame y sus propias
+estadísticas (HistorialEmociones, identificadores de cara y reutilización de
+frames sin cambios). Un único hilo de inferencia atiende a todas las fuentes
+por turnos (round-robin): toma el frame más reciente de cada una, detecta sus
+caras y clasifica las caras de todo el lote en una sola llamada al modelo.
+
+El modelo se carga una sola vez y cada fuente solo retiene su último frame,
+de modo que la memoria y la CPU no crecen en proporción al número de
+fuentes: con más fuentes, cada una recibe menos inferencias por segundo.
+
+Uso:
+    python multicamara.py 0 1 sala3.mp4 --lote 8 --duracion 60 --salida resumen.json
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+import cv2
+
+from analisis import construir_resultados, detectar_caras, clasificar_caras, interpretar_resultados
+from historial import HistorialEmociones
+from metricas import METRICAS, MedidorFPS, medir
+from pipeline import CaptureThread, LatestQueue
+from reutilizacion import ReutilizadorFrames
+from seguimiento import FaceIdentifier
+
+
+class CapturaConRitmo:
+    """
+    Entrega los frames de un archivo de video a su ritmo nativo (como una
+    cámara) y, si 'repetir', vuelve al inicio al terminar
+    """
+
+    def __init__(self, cap, fps=30.0, repetir=True):
+        self.cap = cap
+        self.periodo = 1.0 / (fps or 30.0)
+        self.repetir = repetir
+        self.siguiente = None
+
+    def read(self):
+        ahora = time.monotonic()
+        if self.siguiente is not None and self.siguiente > ahora:
+            time.sleep(self.siguiente - ahora)
+        self.siguiente = max(ahora, self.siguiente or ahora) + self.periodo
+        ret, frame = self.cap.read()
+        if not ret and self.repetir:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def abrir_fuente(fuente, repetir=True):
+    """
+    Abre un índice de dispositivo ("0", "1"...) o un archivo de video
+    """
+    dispositivo = isinstance(fuente, int) or str(fuente).isdigit()
+    cap = cv2.VideoCapture(int(fuente) if dispositivo else fuente)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir la fuente: {fuente}")
+    if dispositivo:
+        return cap
+    return CapturaConRitmo(cap, cap.get(cv2.CAP_PROP_FPS), repetir)
+
+
+class Flujo:
+    """
+    Una fuente con su hilo de captura y sus estadísticas propias
+    """
+
+    def __init__(self, nombre, cap, reutilizar=True, capacidad_historial=2048):
+        self.nombre = str(nombre)
+        self.cap = cap
+        self.cola = LatestQueue()
+        self.captura = CaptureThread(cap, [self.cola])
+        self.historial = HistorialEmociones(capacidad=capacidad_historial)
+        self.identificador = FaceIdentifier()
+        self.reutilizador = ReutilizadorFrames() if reutilizar else None
+        self.fps = MedidorFPS()
+        self.analizados = 0
+        self.errores = 0
+        self.ultimas_caras = None
+        self.inicio = None
+
+    def registrar(self, paquete, caras):
+        self.analizados += 1
+        self.fps.tick()
+        self.ultimas_caras = caras
+        if caras:
+            self.historial.registrar(caras, paquete.timestamp - self.inicio)
+
+    def resumen(self):
+        return {
+            "fuente": self.nombre,
+            "frames_leidos": self.captura.frames_read,
+            "frames_analizados": self.analizados,
+            "frames_descartados": self.cola.dropped,
+            "reutilizados": self.reutilizador.reutilizados if self.reutilizador else 0,
+            "errores": self.errores,
+            "fps_inferencia": self.fps.fps,
+            "fallo_captura": self.captura.failed,
+            "detecciones": len(self.historial),
+            "mas_frecuente": self.historial.mas_frecuente(),
+            "porcentajes": self.historial.porcentajes(),
+        }
+
+
+class InferenciaCompartida(threading.Thread):
+    """
+    Hilo único de inferencia para todos los flujos. En cada vuelta toma el
+    frame más reciente de cada flujo, empezando por el siguiente al último
+    atendido, hasta 'max_lote' frames. 'detectar' y 'clasificar' reemplazan
+    a analisis.detectar_caras y analisis.clasificar_caras.
+    """
+
+    def __init__(self, flujos, max_lote=8, detectar=None, clasificar=None, espera=0.005):
+        super().__init__(daemon=True)
+        self.flujos = flujos
+        self.max_lote = max_lote
+        self.detectar = detectar or detectar_caras
+        self.clasificar = clasificar or clasificar_caras
+        self.espera = espera
+        self.turno = 0
+        self.lotes = 0
+        self.frames = 0
+        self.running = threading.Event()
+
+    def _recoger(self):
+        n = len(self.flujos)
+        lote = []
+        for k in range(n):
+            i = (self.turno + k) % n
+            flujo = self.flujos[i]
+            paquete = flujo.cola.get_nowait()
+            if paquete is None:
+                continue
+            if flujo.reutilizador is not None:
+                previo = flujo.reutilizador.buscar(paquete.frame)
+                if previo is not None:
+                    flujo.registrar(paquete, previo)
+                    continue
+            lote.append((flujo, paquete))
+            if len(lote) == self.max_lote:
+                # El próximo lote empieza por el primer flujo no atendido
+                self.turno = (i + 1) % n
+                return lote
+        self.turno = (self.turno + 1) % n
+        return lote
+
+    def _analizar(self, lote):
+        detecciones = []
+        for flujo, paquete in lote:
+            try:
+                detecciones.append(self.detectar(paquete.frame))
+            except Exception:
+                flujo.errores += 1
+                detecciones.append(None)
+
+        recortes = [cara['face'] for caras in detecciones if caras for cara in caras]
+        with medir("clasificacion"):
+            emociones = self.clasificar(recortes) if recortes else []
+
+        inicio = 0
+        for (flujo, paquete), caras in zip(lote, detecciones):
+            if caras is None:
+                continue
+            resultado = construir_resultados(caras, emociones[inicio:inicio + len(caras)])
+            inicio += len(caras)
+            resultado = interpretar_resultados(flujo.identificador.assign(resultado)) if resultado else []
+            if flujo.reutilizador is not None:
+                flujo.reutilizador.guardar(resultado)
+            flujo.registrar(paquete, resultado)
+        self.lotes += 1
+        self.frames += len(lote)
+        METRICAS.tick("inferencia")
+
+    def run(self):
+        self.running.set()
+        while self.running.is_set():
+            lote = self._recoger()
+            if not lote:
+                if all(f.cola.closed for f in self.flujos):
+                    break
+                time.sleep(self.espera)
+                continue
+            self._analizar(lote)
+
+    def stop(self):
+        self.running.clear()
+
+
+class MonitorMulticamara:
+    """
+    Abre las fuentes y las une a un único InferenciaCompartida
+    """
+
+    def __init__(self, fuentes, max_lote=8, reutilizar=True, detectar=None, clasificar=None, abrir=abrir_fuente):
+        self.flujos = [Flujo(fuente, abrir(fuente), reutilizar) for fuente in fuentes]
+        self.inferencia = InferenciaCompartida(self.flujos, max_lote, detectar, clasificar)
+        self.inicio = None
+
+    def start(self):
+        self.inicio = time.monotonic()
+        for flujo in self.flujos:
+            flujo.inicio = self.inicio
+            flujo.captura.start()
+        self.inferencia.start()
+
+    def stop(self, timeout=1.0):
+        for flujo in self.flujos:
+            flujo.captura.stop()
+        self.inferencia.stop()
+        # Cada hilo de captura libera su fuente al salir de cap.read()
+        for flujo in self.flujos:
+            flujo.captura.join(timeout)
+        self.inferencia.join(timeout)
+
+    def resumen(self):
+        duracion = time.monotonic() - self.inicio if self.inicio else 0.0
+        flujos = [f.resumen() for f in self.flujos]
+        analizados = sum(f["frames_analizados"] for f in flujos)
+        return {
+            "fuentes": len(self.flujos),
+            "duracion_s": duracion,
+            "fps_total": analizados / duracion if duracion else 0.0,
+            "lote_medio": self.inferencia.frames / self.inferencia.lotes if self.inferencia.lotes else 0.0,
+            "flujos": flujos,
+        }
+
+
+def main():
+    from analisis import precalentar, usar_motor
+    from autotune_detector import agregar_argumentos_detector, aplicar_argumentos_detector
+    from motor_emociones import MOTORES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fuentes", nargs="+", help="índices de cámara o archivos de video")
+    parser.add_argument("--lote", type=int, default=8, help="frames máximos por lote de inferencia")
+    parser.add_argument("--duracion", type=float, default=0, help="segundos a monitorear (0 = hasta Ctrl+C)")
+    parser.add_argument("--cada", type=float, default=5.0, help="segundos entre reportes")
+    parser.add_argument("--sin-reutilizar", action="store_true", help="analizar también frames sin cambios")
+    parser.add_argument("--motor", choices=MOTORES, default="deepface")
+    parser.add_argument("--salida", help="guardar el resumen final en JSON")
+    parser.add_argument("--perfil", type=float, metavar="SEGUNDOS",
+                        help="habilitar capturas de perfil de SEGUNDOS con SIGUSR1 (ver perfilado.py)")
+    agregar_argumentos_detector(parser)
+    args = parser.parse_args()
+
+    if args.perfil:
+        from perfilado import perfil_sin_interfaz
+        perfil_sin_interfaz(args.perfil)
+
+    usar_motor(args.motor)
+    # El trabajador compartido detecta con la misma configuración que la interfaz
+    aplicar_argumentos_detector(args)
+    precalentar()
+    monitor = MonitorMulticamara(args.fuentes, args.lote, reutilizar=not args.sin_reutilizar)
+    monitor.start()
+    try:
+        while not args.duracion or time.monotonic() - monitor.inicio < args.duracion:
+            time.sleep(args.cada)
+            for flujo in monitor.flujos:
+                print(f"{flujo.nombre:>12} | {flujo.fps.fps:5.1f} inf/s | {flujo.analizados:6d} analizados | "
+                      f"{flujo.historial.mas_frecuente() or '-'}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+
+    resumen = monitor.resumen()
+    print(f"{resumen['fuentes']} fuentes: {resumen['fps_total']:.1f} inferencias/s en total, "
+          f"lote medio {resumen['lote_medio']:.1f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,376 @@
-from tensorflow.keras.models import load_model
+"""
+Entrenamiento de my_emotion_model.h5: MobileNetV2 congelada + cabeza densa.
+
+Como la base no se entrena, por defecto (--modo caracteristicas) se calculan
+una sola vez los vectores de 1280 valores de la base (tras
+GlobalAveragePooling2D) para cada imagen, se guardan en un arreglo en disco
+(np.memmap) y la cabeza Dense/Dropout se entrena directamente sobre ellos.
+Las épocas ya no decodifican JPEG ni pasan por la base.
+
+--modo tfdata entrena el modelo completo con un pipeline tf.data paralelo
+(decodificación en paralelo y prefetch), necesario cuando se descongelan
+capas (--ajuste-fino N descongela las últimas N capas de la base y sigue
+entrenando desde la cabeza ya entrenada). --modo generador es el
+entrenamiento original con ImageDataGenerator, como referencia.
+
+Con --compilado las imágenes se leen de los fragmentos de
+compilar_dataset.py (ya recortadas y en 224x224) en lugar de dataset/.
+
+Al terminar se imprime (y con --reporte se guarda) el tiempo de cada fase y
+de cada época; --comparar mide además unas épocas del modo generador y
+estima cuánto tardaría el entrenamiento original completo.
+
+Uso:
+    python my_emotion_model.py --epocas 40
+    python my_emotion_model.py --epocas 40 --comparar 2 --reporte tiempos.json
+    python my_emotion_model.py --ajuste-fino 30 --epocas-ajuste 5
+    python my_emotion_model.py --modo generador --epocas 40
+    python my_emotion_model.py --compilado dataset_compilado --ajuste-fino 30
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
 from tensorflow.keras.applications import MobileNetV2
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, Input
 from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from compilar_dataset import VALIDACION, DatasetCompilado, listar_dataset
+from motor_emociones import RUTA_CLASES, RUTA_MODELO, TAMANO
+
+DATASET = "dataset/"
+CACHE = "cache_caracteristicas"
+DIMENSION = 1280
+
+
+class TiempoEpocas(Callback):
+    """
+    Registra la duración de cada época
+    """
+
+    def on_train_begin(self, logs=None):
+        self.tiempos = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.inicio = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.tiempos.append(time.perf_counter() - self.inicio)
+
+
+def construir_base():
+    # 1. Base del modelo (MobileNetV2 preentrenada en ImageNet), congelada
+    base_model = MobileNetV2(weights="imagenet", include_top=False, input_shape=(TAMANO, TAMANO, 3))
+    for layer in base_model.layers:
+        layer.trainable = False
+    return base_model
+
+
+def construir_modelo(base_model, n_clases):
+    """
+    Modelo completo: base + cabeza de clasificación (la arquitectura que
+    carga motor_emociones.py)
+    """
+    x = GlobalAveragePooling2D()(base_model.output)
+    x = Dense(256, activation="relu")(x)
+    x = Dropout(0.5)(x)
+    preds = Dense(n_clases, activation="softmax")(x)
+    return Model(inputs=base_model.input, outputs=preds)
+
+
+def construir_cabeza(n_clases):
+    """
+    La misma cabeza que construir_modelo, sobre las características ya calculadas
+    """
+    entrada = Input(shape=(DIMENSION,))
+    x = Dense(256, activation="relu")(entrada)
+    x = Dropout(0.5)(x)
+    preds = Dense(n_clases, activation="softmax")(x)
+    return Model(inputs=entrada, outputs=preds)
+
+
+def copiar_cabeza(cabeza, modelo):
+    """
+    Copia los pesos de las capas densas de la cabeza al modelo completo
+    """
+    densas_cabeza = [l for l in cabeza.layers if isinstance(l, Dense)]
+    densas_modelo = [l for l in modelo.layers if isinstance(l, Dense)]
+    for origen, destino in zip(densas_cabeza, densas_modelo):
+        destino.set_weights(origen.get_weights())
+
+
+def _firma(rutas):
+    return [[ruta, os.path.getsize(ruta), int(os.path.getmtime(ruta))] for ruta in rutas]
+
+
+def dataset_imagenes(rutas, etiquetas=None, n_clases=None, lote=32, mezclar=False):
+    """
+    Pipeline tf.data: lectura y decodificación en paralelo, redimensionado
+    'nearest' a 224x224 en RGB y escala [0, 1] (igual que load_img con
+    rescale=1/255), por lotes y con prefetch
+    """
+    def cargar(ruta):
+        img = tf.io.decode_image(tf.io.read_file(ruta), channels=3, expand_animations=False)
+        img = tf.image.resize(img, (TAMANO, TAMANO), method="nearest")
+        return tf.cast(img, tf.float32) / 255.0
+
+    datos = tf.data.Dataset.from_tensor_slices(rutas)
+    if etiquetas is not None:
+        datos = tf.data.Dataset.zip((datos, tf.data.Dataset.from_tensor_slices(
+            tf.one_hot(etiquetas, n_clases))))
+    if mezclar:
+        datos = datos.shuffle(len(rutas), reshuffle_each_iteration=True)
+    if etiquetas is not None:
+        datos = datos.map(lambda r, e: (cargar(r), e), num_parallel_calls=tf.data.AUTOTUNE)
+    else:
+        datos = datos.map(cargar, num_parallel_calls=tf.data.AUTOTUNE)
+    return datos.batch(lote).prefetch(tf.data.AUTOTUNE)
+
+
+class DatasetImagenes:
+    """
+    Imágenes de dataset/ leídas con tf.data, con la misma interfaz que
+    compilar_dataset.DatasetCompilado
+    """
+    nombre = "imagenes"
+
+    def __init__(self, dataset=DATASET, validacion=VALIDACION):
+        self.clases, entrenamiento, validacion_ = listar_dataset(dataset, validacion)
+        self.partes = {"training": entrenamiento, "validation": validacion_}
+
+    def etiquetas(self, subconjunto):
+        return np.array(self.partes[subconjunto][1], np.int64)
+
+    def firma(self, subconjunto):
+        return _firma(self.partes[subconjunto][0])
+
+    def parametros(self):
+        return {"origen": self.nombre, "tamano": TAMANO}
+
+
+def crear_tf_dataset(datos, subconjunto, lote=32, mezclar=False, etiquetas=True):
+    """
+    tf.data de un subconjunto ("training" o "validation"): desde los
+    archivos con decodificación en paralelo o desde los fragmentos
+    compilados, siempre con prefetch
+    """
+    n_clases = len(datos.clases)
+    if not isinstance(datos, DatasetCompilado):
+        rutas, etiquetas_ = datos.partes[subconjunto]
+        return dataset_imagenes(rutas, etiquetas_ if etiquetas else None, n_clases, lote, mezclar)
+
+    imagen = tf.TensorSpec((None, datos.tamano, datos.tamano, 3), tf.float32)
+    if etiquetas:
+        firma = (imagen, tf.TensorSpec((None,), tf.int64))
+    else:
+        firma = imagen
+    # Cada época vuelve a llamar al generador y obtiene otra permutación
+    tf_datos = tf.data.Dataset.from_generator(
+        lambda: datos.lotes(subconjunto, lote, mezclar, etiquetas=etiquetas), output_signature=firma)
+    if etiquetas:
+        tf_datos = tf_datos.map(lambda x, e: (x, tf.one_hot(e, n_clases)))
+    return tf_datos.prefetch(tf.data.AUTOTUNE)
+
+
+def identificar_base(base_model):
+    """
+    Nombre de la base y hash de sus pesos
+    """
+    h = hashlib.sha1()
+    for peso in base_model.weights:
+        h.update(np.ascontiguousarray(peso.numpy()).tobytes())
+    return {"nombre": base_model.name, "pesos": h.hexdigest()}
+
+
+def extraer_caracteristicas(base_model, datos, subconjunto, cache=CACHE, lote=64):
+    """
+    Retorna un np.memmap (n, 1280) con las características del subconjunto.
+    Se calculan una sola vez: si el índice guardado coincide (mismas rutas,
+    tamaños y fechas, mismos parámetros de compilado y misma base con los
+    mismos pesos) se reutiliza el archivo.
+    """
+    os.makedirs(cache, exist_ok=True)
+    nombre = f"{datos.nombre}_{subconjunto}"
+    ruta_datos = os.path.join(cache, f"{nombre}.f32")
+    ruta_indice = os.path.join(cache, f"{nombre}.json")
+    firma = datos.firma(subconjunto)
+    indice = {"firma": firma, "parametros": datos.parametros(), "base": identificar_base(base_model)}
+    if os.path.exists(ruta_datos) and os.path.exists(ruta_indice):
+        with open(ruta_indice, encoding="utf-8") as f:
+            if json.load(f) == indice:
+                return np.memmap(ruta_datos, np.float32, "r", shape=(len(firma), DIMENSION))
+
+    extractor = Model(base_model.input, GlobalAveragePooling2D()(base_model.output))
+    salida = np.memmap(ruta_datos, np.float32, "w+", shape=(len(firma), DIMENSION))
+    fila = 0
+    for imagenes in crear_tf_dataset(datos, subconjunto, lote, etiquetas=False):
+        vectores = extractor(imagenes, training=False).numpy()
+        salida[fila:fila + len(vectores)] = vectores
+        fila += len(vectores)
+    salida.flush()
+    with open(ruta_indice, "w", encoding="utf-8") as f:
+        json.dump(indice, f)
+    return np.memmap(ruta_datos, np.float32, "r", shape=(len(firma), DIMENSION))
+
+
+def entrenar_caracteristicas(base_model, datos, epocas, lote, tiempos):
+    """
+    Entrena la cabeza sobre las características en caché y retorna el
+    modelo completo con los pesos copiados
+    """
+    n_clases = len(datos.clases)
+    inicio = time.perf_counter()
+    x_train = extraer_caracteristicas(base_model, datos, "training")
+    x_val = extraer_caracteristicas(base_model, datos, "validation")
+    tiempos["caracteristicas_s"] = time.perf_counter() - inicio
+    y_train = tf.keras.utils.to_categorical(datos.etiquetas("training"), n_clases)
+    y_val = tf.keras.utils.to_categorical(datos.etiquetas("validation"), n_clases)
+
+    cabeza = construir_cabeza(n_clases)
+    cabeza.compile(optimizer=Adam(1e-4), loss="categorical_crossentropy", metrics=["accuracy"])
+    epocas_cb = TiempoEpocas()
+    inicio = time.perf_counter()
+    history = cabeza.fit(x_train, y_train, validation_data=(x_val, y_val),
+                         epochs=epocas, batch_size=lote, shuffle=True, callbacks=[epocas_cb])
+    tiempos["entrenamiento_s"] = time.perf_counter() - inicio
+    tiempos["epocas_s"] = epocas_cb.tiempos
+
+    model = construir_modelo(base_model, n_clases)
+    copiar_cabeza(cabeza, model)
+    return model, history
+
+
+def entrenar_tfdata(model, datos, epocas, lote, lr, tiempos, prefijo=""):
+    """
+    Entrena el modelo completo leyendo las imágenes con tf.data
+    """
+    train_data = crear_tf_dataset(datos, "training", lote, mezclar=True)
+    val_data = crear_tf_dataset(datos, "validation", lote)
+    model.compile(optimizer=Adam(lr), loss="categorical_crossentropy", metrics=["accuracy"])
+    epocas_cb = TiempoEpocas()
+    inicio = time.perf_counter()
+    history = model.fit(train_data, validation_data=val_data, epochs=epocas, callbacks=[epocas_cb])
+    tiempos[prefijo + "entrenamiento_s"] = time.perf_counter() - inicio
+    tiempos[prefijo + "epocas_s"] = epocas_cb.tiempos
+    return history
+
+
+def entrenar_generador(base_model, epocas, lote, tiempos, dataset=DATASET):
+    """
+    Entrenamiento original: ImageDataGenerator decodifica cada imagen y la
+    pasa por la base en todas las épocas
+    """
+    datagen = ImageDataGenerator(rescale=1./255, validation_split=VALIDACION)
+    train_data = datagen.flow_from_directory(dataset, target_size=(TAMANO, TAMANO), batch_size=lote,
+                                             class_mode="categorical", subset="training")
+    val_data = datagen.flow_from_directory(dataset, target_size=(TAMANO, TAMANO), batch_size=lote,
+                                           class_mode="categorical", subset="validation")
+    model = construir_modelo(base_model, train_data.num_classes)
+    model.compile(optimizer=Adam(1e-4), loss="categorical_crossentropy", metrics=["accuracy"])
+    epocas_cb = TiempoEpocas()
+    inicio = time.perf_counter()
+    history = model.fit(train_data, validation_data=val_data, epochs=epocas, callbacks=[epocas_cb])
+    tiempos["entrenamiento_s"] = time.perf_counter() - inicio
+    tiempos["epocas_s"] = epocas_cb.tiempos
+    return model, history
+
+
+def descongelar(base_model, n):
+    """
+    Descongela las últimas 'n' capas de la base (las BatchNormalization
+    siguen congeladas para no alterar sus estadísticas)
+    """
+    for layer in base_model.layers[-n:]:
+        if not isinstance(layer, tf.keras.layers.BatchNormalization):
+            layer.trainable = True
+
+
+def imprimir_reporte(tiempos, comparacion=None):
+    def media(epocas):
+        return float(np.mean(epocas)) if epocas else 0.0
 
-# 1. Base del modelo (preentrenado en DeepFace)
-base_model = MobileNetV2(weights="imagenet", include_top=False, input_shape=(224,224,3))  # también podrías usar Facenet, ArcFace, etc.
+    print(f"\nModo {tiempos['modo']}: total {tiempos['total_s']:.1f} s")
+    if "caracteristicas_s" in tiempos:
+        print(f"  características (una vez): {tiempos['caracteristicas_s']:.1f} s")
+    print(f"  entrenamiento: {tiempos['entrenamiento_s']:.1f} s, "
+          f"{media(tiempos['epocas_s']) * 1000:.0f} ms por época")
+    if "ajuste_entrenamiento_s" in tiempos:
+        print(f"  ajuste fino: {tiempos['ajuste_entrenamiento_s']:.1f} s, "
+              f"{media(tiempos['ajuste_epocas_s']) * 1000:.0f} ms por época")
+    if comparacion:
+        # La primera época del generador incluye la compilación del grafo
+        epoca = media(comparacion["epocas_s"][1:] or comparacion["epocas_s"])
+        estimado = epoca * tiempos["epocas"]
+        print(f"  generador original: {epoca * 1000:.0f} ms por época, "
+              f"~{estimado:.1f} s estimados para {tiempos['epocas']} épocas")
+        actual = tiempos["total_s"] - tiempos.get("ajuste_entrenamiento_s", 0.0)
+        print(f"  aceleración: {epoca / (media(tiempos['epocas_s']) or 1e-9):.1f}x por época, "
+              f"{estimado / (actual or 1e-9):.1f}x en total")
 
-# 2. Congelamos capas base
-for layer in base_model.layers:
-    layer.trainable = False
 
-# 3. Añadimos nuevas capas de clasificación
-x = GlobalAveragePooling2D()(base_model.output)
-x = Dense(256, activation="relu")(x)
-x = Dropout(0.5)(x)
-preds = Dense(5, activation="softmax")(x)
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["caracteristicas", "tfdata", "generador"], default="caracteristicas")
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--compilado", help="carpeta de compilar_dataset.py (en lugar de --dataset)")
+    parser.add_argument("--epocas", type=int, default=40)
+    parser.add_argument("--lote", type=int, default=32)
+    parser.add_argument("--ajuste-fino", type=int, default=0, metavar="N",
+                        help="descongelar las últimas N capas de la base y seguir entrenando con tf.data")
+    parser.add_argument("--epocas-ajuste", type=int, default=5)
+    parser.add_argument("--comparar", type=int, default=0, metavar="EPOCAS",
+                        help="medir también EPOCAS épocas del entrenamiento original")
+    parser.add_argument("--reporte", help="guardar los tiempos en JSON")
+    args = parser.parse_args()
 
-model = Model(inputs=base_model.input, outputs=preds)
+    inicio = time.perf_counter()
+    tiempos = {"modo": args.modo, "epocas": args.epocas}
+    base_model = construir_base()
 
-model.compile(optimizer=Adam(1e-4), loss="categorical_crossentropy", metrics=["accuracy"])
+    # 4. Dataset con tus imágenes (ejemplo estilo FER2013) y 5. entrenamiento
+    if args.modo == "generador":
+        model, history = entrenar_generador(base_model, args.epocas, args.lote, tiempos, args.dataset)
+        clases = sorted(d for d in os.listdir(args.dataset) if os.path.isdir(os.path.join(args.dataset, d)))
+    else:
+        datos = DatasetCompilado(args.compilado) if args.compilado else DatasetImagenes(args.dataset)
+        clases = datos.clases
+        if args.modo == "caracteristicas":
+            model, history = entrenar_caracteristicas(base_model, datos, args.epocas, args.lote, tiempos)
+        else:
+            model = construir_modelo(base_model, len(clases))
+            history = entrenar_tfdata(model, datos, args.epocas, args.lote, 1e-4, tiempos)
+        if args.ajuste_fino:
+            descongelar(base_model, args.ajuste_fino)
+            entrenar_tfdata(model, datos, args.epocas_ajuste, args.lote, 1e-5, tiempos, prefijo="ajuste_")
+    tiempos["total_s"] = time.perf_counter() - inicio
 
-# 4. Dataset con tus imágenes (ejemplo estilo FER2013)
-datagen = ImageDataGenerator(rescale=1./255, validation_split=0.2)
+    # 6. Guardar el modelo
+    model.save(RUTA_MODELO)
 
-train_data = datagen.flow_from_directory(
-    "dataset/",
-    target_size=(224,224),  # tamaño para VGG-Face
-    batch_size=32,
-    class_mode="categorical",
-    subset="training"
-)
+    # 7. Guardar el orden de las clases para el motor de inferencia (motor_emociones.py)
+    with open(RUTA_CLASES, "w", encoding="utf-8") as f:
+        json.dump({clase: i for i, clase in enumerate(clases)}, f, ensure_ascii=False, indent=2)
 
-val_data = datagen.flow_from_directory(
-    "dataset/",
-    target_size=(224,224),
-    batch_size=32,
-    class_mode="categorical",
-    subset="validation"
-)
+    comparacion = None
+    if args.comparar and args.modo != "generador":
+        comparacion = {}
+        entrenar_generador(construir_base(), args.comparar, args.lote, comparacion, args.dataset)
+        tiempos["generador"] = comparacion
+    imprimir_reporte(tiempos, comparacion)
+    tiempos["precision_validacion"] = history.history.get("val_accuracy", [None])[-1]
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as f:
+            json.dump(tiempos, f, indent=2)
+    return 0
 
-# 5. Entrenamiento
-history = model.fit(train_data, validation_data=val_data, epochs=40)
 
-# 6. Guardar el modelo
-model.save("my_emotion_model.h5")
+if __name__ == "__main__":
+    sys.exit(main())
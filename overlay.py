@@ -0,0 +1,165 @@
+"""
+Dibujo de las etiquetas sobre el video sin copiar el frame completo.
+
+Cada etiqueta (contenedor semitransparente + texto con sombra) se renderiza
+una sola vez como un sprite con su máscara alfa precalculada y se guarda en
+una caché LRU. Cada frame solo mezcla la región que ocupa la etiqueta, en
+búferes del propio sprite, sin reservar memoria nueva.
+"""
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Transparencia del contenedor principal (1 = opaco)
+ALPHA_CONTENEDOR = 0.85
+
+
+def cuantizar(confianza, paso=0.5):
+    """
+    Redondea la confianza a múltiplos de 'paso' para que las etiquetas se
+    repitan y se aprovechen los sprites en caché
+    """
+    return round(confianza / paso) * paso
+
+
+class Sprite:
+    """
+    Etiqueta ya renderizada: colores premultiplicados por alfa y el
+    complemento de alfa, listos para mezclar con la región del frame
+    """
+
+    def __init__(self, color, alpha):
+        self.alto, self.ancho = alpha.shape
+        self.opaco = bool((alpha >= 1).all())
+        if self.opaco:
+            self.imagen = color
+            return
+        # +0.5 para que el truncado al volver a uint8 redondee igual que addWeighted
+        self.colores = color.astype(np.float32) * alpha[..., None] + 0.5
+        self.inverso = np.repeat((1 - alpha)[..., None], 3, axis=2).astype(np.float32)
+        self.buffer = np.empty(self.colores.shape, np.float32)
+
+    def componer(self, img, x, y):
+        """
+        Mezcla el sprite sobre 'img' (en su lugar) con la esquina en (x, y);
+        recorta lo que quede fuera de la imagen
+        """
+        h, w = img.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.ancho, w), min(y + self.alto, h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        roi = img[y0:y1, x0:x1]
+        region = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        if self.opaco:
+            np.copyto(roi, self.imagen[region])
+            return
+        tmp = self.buffer[region]
+        np.multiply(roi, self.inverso[region], out=tmp)
+        np.add(tmp, self.colores[region], out=tmp)
+        np.copyto(roi, tmp, casting="unsafe")
+
+
+class OverlayRenderer:
+    """
+    Dibuja el contenedor con la emoción principal y las etiquetas de cada
+    cara reutilizando sprites. La clave de la caché es el texto, el
+    porcentaje (ya cuantizado), el color y la escala.
+    """
+
+    def __init__(self, max_sprites=256):
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _sprite(self, clave, crear):
+        sprite = self.sprites.get(clave)
+        if sprite is not None:
+            self.sprites.move_to_end(clave)
+            self.aciertos += 1
+            return sprite
+        self.fallos += 1
+        sprite = self.sprites[clave] = crear()
+        if len(self.sprites) > self.max_sprites:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def contenedor(self, img, emocion, porcentaje, color, escala=1.0):
+        """
+        Dibuja el contenedor principal centrado arriba del frame (mismo
+        aspecto que el draw_emotion_display original)
+        """
+        sprite = self._sprite(("contenedor", emocion, porcentaje, color, escala),
+                              lambda: self._crear_contenedor(emocion, porcentaje, color, escala))
+        # El sprite incluye el borde de 5 px alrededor del contenedor
+        x = (img.shape[1] - (sprite.ancho - 11)) // 2 - 5
+        sprite.componer(img, x, 10)
+        return img
+
+    def _crear_contenedor(self, emocion, porcentaje, color, escala):
+        font_emotion = cv2.FONT_HERSHEY_DUPLEX
+        font_percentage = cv2.FONT_HERSHEY_SIMPLEX
+        emotion_scale = 1.2 * escala
+        percentage_scale = 0.8 * escala
+        thickness = 2
+        padding = int(20 * escala)
+
+        (emotion_w, emotion_h), _ = cv2.getTextSize(emocion, font_emotion, emotion_scale, thickness)
+        (percent_w, percent_h), _ = cv2.getTextSize(porcentaje, font_percentage, percentage_scale, thickness)
+        container_height = emotion_h + percent_h + padding * 3
+        container_width = max(emotion_w, percent_w) + padding * 2
+
+        # Coordenadas relativas al sprite: el contenedor empieza en (5, 5)
+        alto, ancho = container_height + 11, container_width + 11
+        imagen = np.zeros((alto, ancho, 3), np.uint8)
+        alpha = np.zeros((alto, ancho), np.float32)
+        cx, cy = 5, 5
+        for destino, valores in ((imagen, ((30, 30, 30), (45, 45, 45), color)),
+                                 (alpha, (ALPHA_CONTENEDOR,) * 3)):
+            cv2.rectangle(destino, (0, 0), (ancho - 1, alto - 1), valores[0], -1)
+            cv2.rectangle(destino, (cx, cy), (cx + container_width, cy + container_height), valores[1], -1)
+            cv2.rectangle(destino, (cx, cy), (cx + container_width, cy + 4), valores[2], -1)
+
+        emotion_x = cx + (container_width - emotion_w) // 2
+        emotion_y = cy + padding + emotion_h
+        percent_x = cx + (container_width - percent_w) // 2
+        percent_y = emotion_y + padding + percent_h
+
+        # Texto opaco con sombra sobre el contenedor
+        textos = [
+            (emocion, (emotion_x + 2, emotion_y + 2), font_emotion, emotion_scale, (0, 0, 0), thickness + 1),
+            (emocion, (emotion_x, emotion_y), font_emotion, emotion_scale, (255, 255, 255), thickness),
+            (porcentaje, (percent_x + 1, percent_y + 1), font_percentage, percentage_scale, (0, 0, 0), thickness),
+            (porcentaje, (percent_x, percent_y), font_percentage, percentage_scale, color, thickness),
+        ]
+        for texto, posicion, font, scale, color_texto, grosor in textos:
+            cv2.putText(imagen, texto, posicion, font, scale, color_texto, grosor)
+            cv2.putText(alpha, texto, posicion, font, scale, 1.0, grosor)
+        return Sprite(imagen, alpha)
+
+    def _crear_etiqueta(self, texto, color, escala):
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        (label_w, label_h), _ = cv2.getTextSize(texto, font, escala, 1)
+        imagen = np.full((label_h + 9, label_w + 7, 3), 45, np.uint8)
+        cv2.putText(imagen, texto, (3, label_h + 4), font, escala, color, 1)
+        return Sprite(imagen, np.ones(imagen.shape[:2], np.float32))
+
+    def caras(self, img, caras, colores, textos, escala=1.0):
+        """
+        Dibuja en una pasada la caja y la etiqueta de cada cara. 'colores' y
+        'textos' son listas paralelas a 'caras'.
+        """
+        for cara, color, texto in zip(caras, colores, textos):
+            region = cara['region']
+            if not region:
+                continue
+            x, y = int(region['x'] * escala), int(region['y'] * escala)
+            w, h = int(region['w'] * escala), int(region['h'] * escala)
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
+            sprite = self._sprite(("etiqueta", texto, color, 0.5),
+                                  lambda: self._crear_etiqueta(texto, color, 0.5))
+            label_y = max(y - 6, sprite.alto - 5)
+            sprite.componer(img, x, label_y - sprite.alto + 5)
+        return img
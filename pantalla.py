@@ -0,0 +1,89 @@
+"""
+Camino de display sin reservas de memoria por frame.
+
+El frame BGR se reduce primero al tamaño del display y después se convierte
+a RGB, ambos en búferes que se reutilizan mientras no cambie el tamaño. La
+PhotoImage de Tk es una sola y se actualiza en su lugar con paste(). El
+tamaño del display se guarda al recibir <Configure> en vez de consultarlo a
+Tk en cada frame.
+"""
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class Pantalla:
+    """
+    Prepara y muestra frames en 'label' (un tk.Label)
+    """
+
+    def __init__(self, label, interpolacion=cv2.INTER_LINEAR):
+        self.label = label
+        self.interpolacion = interpolacion
+        self.tamano = None         # (ancho, alto) del display según <Configure>
+        self.foto = None
+        self.visible = False
+        self._redimensionado = None
+        self._convertido = None
+        self._rgb = None
+        self.reservas = 0          # veces que se (re)crearon búferes o la PhotoImage
+
+    def configurar(self, ancho, alto):
+        self.tamano = (ancho, alto)
+
+    def tamano_destino(self, frame_w, frame_h):
+        """
+        Tamaño que cabe en el display manteniendo la proporción
+        """
+        if not self.tamano or min(self.tamano) <= 1:
+            return frame_w, frame_h  # Aún no se ha renderizado el display
+        disp_w, disp_h = self.tamano
+        scale = min(disp_w / frame_w, disp_h / frame_h)
+        return max(1, int(frame_w * scale)), max(1, int(frame_h * scale))
+
+    def _buffer(self, actual, forma):
+        if actual is None or actual.shape != forma:
+            self.reservas += 1
+            return np.empty(forma, np.uint8)
+        return actual
+
+    def preparar(self, frame):
+        """
+        Retorna (frame RGB al tamaño del display, escala aplicada). El arreglo
+        es un búfer reutilizado: solo es válido hasta la siguiente llamada.
+        """
+        h, w = frame.shape[:2]
+        new_w, new_h = self.tamano_destino(w, h)
+        self._rgb = self._buffer(self._rgb, (new_h, new_w, 3))
+        if (new_w, new_h) == (w, h):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        elif new_w * new_h < w * h:
+            # Reducir primero: la conversión de color trabaja sobre menos píxeles
+            self._redimensionado = self._buffer(self._redimensionado, (new_h, new_w, 3))
+            cv2.resize(frame, (new_w, new_h), dst=self._redimensionado, interpolation=self.interpolacion)
+            cv2.cvtColor(self._redimensionado, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        else:
+            self._convertido = self._buffer(self._convertido, (h, w, 3))
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._convertido)
+            cv2.resize(self._convertido, (new_w, new_h), dst=self._rgb, interpolation=self.interpolacion)
+        return self._rgb, new_w / w
+
+    def mostrar(self, rgb):
+        """
+        Copia 'rgb' a la PhotoImage persistente; solo se crea una nueva si
+        cambia el tamaño
+        """
+        imagen = Image.fromarray(rgb)
+        if self.foto is None or (self.foto.width(), self.foto.height()) != imagen.size:
+            self.reservas += 1
+            self.foto = ImageTk.PhotoImage(imagen, master=self.label)
+            self.label.config(image=self.foto)
+        else:
+            self.foto.paste(imagen)
+            if not self.visible:
+                self.label.config(image=self.foto)
+        self.visible = True
+
+    def limpiar(self):
+        self.label.config(image='')
+        self.visible = False
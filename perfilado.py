@@ -0,0 +1,250 @@
+"""
+Captura de perfil bajo demanda, sin reiniciar la aplicación.
+
+Durante una ventana acotada (por defecto 30 s) un hilo muestrea las pilas de
+todos los hilos con sys._current_frames() cada pocos milisegundos, y
+tracemalloc registra las asignaciones hechas en la ventana. A diferencia de
+cProfile, el muestreo ve a todos los hilos (interfaz, captura, inferencia,
+consejos) y su costo no depende de cuántas funciones se llamen.
+
+Al terminar se escriben en perfiles/ con la fecha y hora de la captura:
+
+    perfil_<fecha>.txt          resumen: funciones de interés, puntos calientes,
+                                crecimiento de memoria y latencias por etapa
+    perfil_<fecha>.pilas        pilas colapsadas (flamegraph.pl, speedscope)
+    perfil_<fecha>_inicio.snap  instantáneas de tracemalloc para comparar con
+    perfil_<fecha>_fin.snap     tracemalloc.Snapshot.load
+
+EmotionApp alterna la captura con F4; servidor.py y multicamara.py la
+alternan con la señal SIGUSR1 cuando se inician con --perfil SEGUNDOS.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from metricas import METRICAS
+
+CARPETA = "perfiles"
+
+# Funciones cuyo tiempo inclusivo se resume siempre, estén o no entre las
+# más costosas
+FUNCIONES_INTERES = [
+    "update_frame", "render_frame", "draw_emotion_display", "show_frame", "analyze_frame",
+    "analizar_caras", "detectar_caras", "extract_faces", "clasificar_caras", "analyze", "consejo",
+]
+
+# Un hilo cuya pila termina aquí está esperando, no trabajando
+MODULOS_ESPERA = {"threading", "queue", "selectors", "socketserver", "socket"}
+FUNCIONES_ESPERA = {"mainloop", "wait", "get", "select", "sleep", "accept", "recv", "readline"}
+
+
+def _ubicacion(frame):
+    codigo = frame.f_code
+    return f"{os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno} {codigo.co_name}"
+
+
+def _en_espera(frame):
+    modulo = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return modulo in MODULOS_ESPERA or frame.f_code.co_name in FUNCIONES_ESPERA
+
+
+class Perfilador:
+    """
+    Captura acotada de perfil de CPU (por muestreo) y de memoria
+    (tracemalloc). 'al_terminar(ruta_resumen, error)' se llama desde el hilo
+    del perfilador al terminar: con la ruta del resumen, o con None y el
+    motivo si la captura falló.
+    """
+
+    def __init__(self, duracion=30.0, intervalo=0.005, carpeta=CARPETA, cuadros_memoria=10,
+                 al_terminar=None):
+        self.duracion = duracion
+        self.intervalo = intervalo
+        self.carpeta = carpeta
+        self.cuadros_memoria = cuadros_memoria
+        self.al_terminar = al_terminar
+        self.hilo = None
+        self.detener_evento = threading.Event()
+        self.ultimo_resumen = None
+        self.error = None
+
+    @property
+    def activo(self):
+        return self.hilo is not None and self.hilo.is_alive()
+
+    def iniciar(self):
+        if self.activo:
+            return False
+        self.detener_evento.clear()
+        self.ultimo_resumen = self.error = None
+        self.hilo = threading.Thread(target=self._capturar, name="perfilador", daemon=True)
+        self.hilo.start()
+        return True
+
+    def detener(self):
+        """
+        Termina la captura antes de tiempo; los archivos se escriben igual
+        """
+        self.detener_evento.set()
+
+    def alternar(self):
+        if self.activo:
+            self.detener()
+        else:
+            self.iniciar()
+
+    def _capturar(self):
+        # Si tracemalloc ya estaba activo (python -X tracemalloc) se respeta
+        iniciado_aqui = not tracemalloc.is_tracing()
+        if iniciado_aqui:
+            tracemalloc.start(self.cuadros_memoria)
+        try:
+            self.ultimo_resumen = self._perfilar(iniciado_aqui)
+        except Exception as e:
+            # Por ejemplo, sin permiso de escritura en la carpeta de perfiles
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            if iniciado_aqui and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        if self.al_terminar:
+            self.al_terminar(self.ultimo_resumen, self.error)
+
+    def _perfilar(self, iniciado_aqui):
+        """
+        Muestrea hasta que termina la ventana y retorna la ruta del resumen
+        """
+        fecha = time.strftime("%Y%m%d_%H%M%S")
+        propio = threading.get_ident()
+        nombres = {t.ident: t.name for t in threading.enumerate()}
+        tracemalloc.reset_peak()
+        memoria_inicio = tracemalloc.take_snapshot()
+        etapas_inicio = METRICAS.resumen()["etapas"]
+
+        propias = Counter()       # muestras con la función en la cima de la pila
+        inclusivas = Counter()    # muestras con la función en cualquier nivel
+        interes = Counter()       # muestras (de cualquier hilo) dentro de cada función de interés
+        pilas = Counter()
+        por_hilo = Counter()
+        esperas = Counter()
+        muestras = 0
+        inicio = time.perf_counter()
+        while not self.detener_evento.is_set() and time.perf_counter() - inicio < self.duracion:
+            vistas = set()
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                hilo = nombres.get(ident) or f"hilo-{ident}"
+                if ident not in nombres:
+                    nombres.update((t.ident, t.name) for t in threading.enumerate())
+                    hilo = nombres.get(ident, hilo)
+                if _en_espera(frame):
+                    esperas[hilo] += 1
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(_ubicacion(frame))
+                    frame = frame.f_back
+                por_hilo[hilo] += 1
+                propias[pila[0]] += 1
+                for ubicacion in set(pila):
+                    inclusivas[ubicacion] += 1
+                    vistas.add(ubicacion.rsplit(" ", 1)[1])
+                pilas[";".join([hilo] + pila[::-1])] += 1
+            for funcion in FUNCIONES_INTERES:
+                if funcion in vistas:
+                    interes[funcion] += 1
+            muestras += 1
+            time.sleep(self.intervalo)
+        transcurrido = time.perf_counter() - inicio
+
+        memoria_fin = tracemalloc.take_snapshot()
+        actual, pico = tracemalloc.get_traced_memory()
+        if iniciado_aqui:
+            tracemalloc.stop()
+        etapas_fin = METRICAS.resumen()["etapas"]
+
+        os.makedirs(self.carpeta, exist_ok=True)
+        base = os.path.join(self.carpeta, f"perfil_{fecha}")
+        memoria_inicio.dump(base + "_inicio.snap")
+        memoria_fin.dump(base + "_fin.snap")
+        with open(base + ".pilas", "w", encoding="utf-8") as f:
+            for pila, n in pilas.most_common():
+                f.write(f"{pila} {n}\n")
+
+        lineas = [
+            f"Perfil {fecha}: {transcurrido:.1f} s, {muestras} muestras cada {self.intervalo * 1000:.0f} ms",
+            "",
+            "Funciones de interés (% del tiempo con algún hilo dentro)",
+        ]
+        for funcion in FUNCIONES_INTERES:
+            if interes[funcion]:
+                lineas.append(f"  {interes[funcion] / muestras:7.1%}  {funcion}")
+        lineas += ["", "Hilos (% del tiempo trabajando / esperando)"]
+        for hilo in sorted(set(por_hilo) | set(esperas), key=lambda h: -por_hilo[h]):
+            lineas.append(f"  {por_hilo[hilo] / muestras:7.1%} / {esperas[hilo] / muestras:7.1%}  {hilo}")
+        lineas += ["", "Puntos calientes (tiempo propio)"]
+        for ubicacion, n in propias.most_common(15):
+            lineas.append(f"  {n / muestras:7.1%}  {ubicacion}")
+        lineas += ["", "Tiempo inclusivo"]
+        # El arranque de los hilos está en todas las pilas y no dice nada
+        inclusivas = Counter({u: n for u, n in inclusivas.items() if not u.startswith("threading.py:")})
+        for ubicacion, n in inclusivas.most_common(15):
+            lineas.append(f"  {n / muestras:7.1%}  {ubicacion}")
+
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        cambios = memoria_fin.filter_traces(filtros).compare_to(memoria_inicio.filter_traces(filtros), "lineno")
+        crecimiento = sum(c.size_diff for c in cambios)
+        lineas += ["", f"Memoria: {crecimiento / 1e6:+.2f} MB en la ventana, "
+                       f"{actual / 1e6:.1f} MB vivos, pico {pico / 1e6:.1f} MB (asignado en la ventana)",
+                   "Mayor crecimiento de memoria"]
+        for cambio in sorted(cambios, key=lambda c: -c.size_diff)[:10]:
+            if cambio.size_diff <= 0:
+                break
+            cuadro = cambio.traceback[0]
+            lineas.append(f"  {cambio.size_diff / 1e3:+9.1f} KB {cambio.count_diff:+7d} bloques  "
+                          f"{os.path.basename(cuadro.filename)}:{cuadro.lineno}")
+
+        lineas += ["", "Latencias por etapa en la ventana (metricas.py)"]
+        for etapa, datos in etapas_fin.items():
+            previo = etapas_inicio.get(etapa, {"muestras": 0, "total_s": 0.0})
+            n = datos["muestras"] - previo["muestras"]
+            if n > 0:
+                media = (datos["total_s"] - previo["total_s"]) / n * 1000
+                lineas.append(f"  {etapa:<13} {n:6d} llamadas  media {media:7.1f} ms  p95 {datos['p95_ms']:7.1f} ms")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        return base + ".txt"
+
+
+def instalar_senal(perfilador, senal=getattr(signal, "SIGUSR1", None)):
+    """
+    Alterna la captura con 'senal' (kill -USR1 <pid>). Retorna False si la
+    plataforma no la tiene (Windows); en ese caso la captura empieza ya.
+    """
+    if senal is None:
+        perfilador.iniciar()
+        return False
+    signal.signal(senal, lambda *_: perfilador.alternar())
+    return True
+
+
+def perfil_sin_interfaz(segundos):
+    """
+    Prepara el perfilador de los modos sin interfaz (--perfil SEGUNDOS)
+    """
+    def al_terminar(ruta, error):
+        if error:
+            print(f"Error en la captura de perfil: {error}", file=sys.stderr, flush=True)
+        else:
+            print(f"Perfil guardado en {ruta}", flush=True)
+
+    perfilador = Perfilador(segundos, al_terminar=al_terminar)
+    if instalar_senal(perfilador):
+        print(f"Perfilado: 'kill -USR1 {os.getpid()}' inicia o detiene una captura de {segundos:g} s",
+              flush=True)
+    return perfilador
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+
+from metricas import medir
+
+
+class LatestQueue:
+    """
+    Cola acotada en la que el elemento más reciente gana: cuando está
+    llena se descarta el elemento más antiguo en lugar de bloquear.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Espera hasta que haya un elemento. Retorna None si la cola se cerró
+        o se agotó el tiempo de espera.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_nowait(self):
+        with self._cond:
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePacket:
+    """
+    Frame capturado junto con su número de secuencia y marca de tiempo
+    """
+    __slots__ = ("frame_id", "timestamp", "frame")
+
+    def __init__(self, frame_id, timestamp, frame):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.frame = frame
+
+
+class ResultPacket:
+    """
+    Resultado del análisis de un frame. 'error' contiene la excepción
+    si el análisis falló; 'frame' es el frame analizado.
+    """
+    __slots__ = ("frame_id", "timestamp", "result", "error", "frame")
+
+    def __init__(self, frame_id, timestamp, result=None, error=None, frame=None):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.result = result
+        self.error = error
+        self.frame = frame
+
+
+class CaptureThread(threading.Thread):
+    """
+    Lee frames de la cámara a su ritmo nativo y los publica en todas
+    las colas de salida. La cámara es del hilo: la libera él mismo al salir
+    del bucle, nunca mientras otro hilo puede estar dentro de cap.read().
+    """
+
+    def __init__(self, cap, outputs):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.outputs = outputs
+        self.running = threading.Event()
+        self.failed = False
+        self.frames_read = 0
+
+    def run(self):
+        self.running.set()
+        try:
+            while self.running.is_set():
+                with medir("captura"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    self.failed = True
+                    break
+                packet = FramePacket(self.frames_read, time.monotonic(), frame)
+                self.frames_read += 1
+                for queue in self.outputs:
+                    queue.put(packet)
+        finally:
+            self.cap.release()
+            for queue in self.outputs:
+                queue.close()
+
+    def stop(self):
+        self.running.clear()
+
+
+class InferenceWorker(threading.Thread):
+    """
+    Toma siempre el frame más reciente de la cola de entrada, lo analiza
+    y publica el resultado. 'throttle' es una función opcional que retorna
+    los segundos a esperar antes de tomar el siguiente frame.
+    """
+
+    def __init__(self, analyze_fn, inputs, outputs, throttle=None):
+        super().__init__(daemon=True)
+        self.analyze_fn = analyze_fn
+        self.inputs = inputs
+        self.outputs = outputs
+        self.throttle = throttle
+        self.running = threading.Event()
+        self.frames_analyzed = 0
+
+    def run(self):
+        self.running.set()
+        while self.running.is_set():
+            if self.throttle is not None:
+                wait = self.throttle()
+                if wait > 0:
+                    # Esperar antes de tomar el frame para analizar el más reciente
+                    time.sleep(min(wait, 0.1))
+                    continue
+            packet = self.inputs.get(timeout=0.1)
+            if packet is None:
+                if self.inputs.closed:
+                    break
+                continue
+            try:
+                result = ResultPacket(packet.frame_id, packet.timestamp,
+                                      result=self.analyze_fn(packet.frame), frame=packet.frame)
+            except Exception as e:
+                result = ResultPacket(packet.frame_id, packet.timestamp, error=e)
+            self.frames_analyzed += 1
+            self.outputs.put(result)
+
+    def stop(self):
+        self.running.clear()
+
+
+class FramePipeline:
+    """
+    Une un hilo de captura y un hilo de inferencia mediante colas
+    "el último gana". El renderizador (hilo de Tk) consume 'frames' y
+    'results' sin bloquear.
+    """
+
+    def __init__(self, cap, analyze_fn, throttle=None):
+        self.frames = LatestQueue()
+        self.results = LatestQueue()
+        self._to_inference = LatestQueue()
+        self.capture = CaptureThread(cap, [self.frames, self._to_inference])
+        self.worker = InferenceWorker(analyze_fn, self._to_inference, self.results, throttle)
+
+    @property
+    def failed(self):
+        return self.capture.failed
+
+    @property
+    def dropped_frames(self):
+        """
+        Frames que nunca llegaron a mostrarse o a analizarse
+        """
+        return self.frames.dropped, self._to_inference.dropped
+
+    def start(self):
+        self.capture.start()
+        self.worker.start()
+
+    def stop(self, timeout=1.0):
+        self.capture.stop()
+        self.worker.stop()
+        self._to_inference.close()
+        self.capture.join(timeout)
+        self.worker.join(timeout)
@@ -0,0 +1,156 @@
+"""
+Planificación adaptativa del bucle de la webcam.
+
+El planificador mide la duración de cada inferencia, el costo de mostrar un
+frame y el uso de CPU del proceso, y elige por separado cuántas inferencias
+y cuántos frames mostrados por segundo hacer para respetar los objetivos
+(por ejemplo, "como máximo 50% de un núcleo" o "al menos 10 inferencias
+por segundo"). Cuando la inferencia va más lenta que el display, el
+suavizador mantiene estable la emoción mostrada.
+"""
+import math
+import time
+
+
+class PlanificadorAdaptativo:
+    """
+    Controlador de las frecuencias de inferencia y de display. 'max_cpu' es
+    la fracción de un núcleo (1.0 = un núcleo completo); 'min_fps_inferencia'
+    tiene prioridad sobre el límite de CPU.
+    """
+
+    def __init__(self, max_cpu=0.8, min_fps_inferencia=5.0, max_fps_inferencia=30.0,
+                 fps_display=30.0, min_fps_display=10.0, periodo=0.5, alfa=0.3):
+        self.max_cpu = max_cpu
+        self.min_fps_inferencia = min_fps_inferencia
+        self.max_fps_inferencia = max(max_fps_inferencia, min_fps_inferencia)
+        self.objetivo_display = fps_display
+        self.min_fps_display = min(min_fps_display, fps_display)
+        self.periodo = periodo
+        self.alfa = alfa
+        self.reset()
+
+    def reset(self):
+        self.fps_inferencia = self.max_fps_inferencia
+        self.fps_display = self.objetivo_display
+        self.duracion_inferencia = None   # EMA en segundos
+        self.duracion_display = None      # EMA en segundos (hilo de Tk)
+        self.cpu = 0.0
+        self.limitado_por = "inicio"
+        self._ultima_inferencia = 0.0
+        self._inferencias_periodo = 0
+        self._inicio_periodo = time.monotonic()
+        self._cpu_periodo = time.process_time()
+
+    def _ema(self, previo, valor):
+        return valor if previo is None else previo + self.alfa * (valor - previo)
+
+    def registrar_inferencia(self, segundos):
+        self.duracion_inferencia = self._ema(self.duracion_inferencia, segundos)
+        self._inferencias_periodo += 1
+
+    def registrar_display(self, segundos):
+        self.duracion_display = self._ema(self.duracion_display, segundos)
+
+    def espera_inferencia(self, ahora=None):
+        """
+        Segundos que faltan para la próxima inferencia; si es 0 el turno
+        queda tomado
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        espera = self._ultima_inferencia + 1.0 / self.fps_inferencia - ahora
+        if espera <= 0:
+            self._ultima_inferencia = ahora
+            return 0.0
+        return espera
+
+    def intervalo_display_ms(self, transcurrido=0.0):
+        """
+        Milisegundos hasta el próximo frame mostrado, descontando lo que ya
+        tardó el actual
+        """
+        return max(1, int(1000 * (1.0 / self.fps_display - transcurrido)))
+
+    def actualizar(self, ahora=None):
+        """
+        Recalcula las frecuencias una vez por periodo a partir de lo medido
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        transcurrido = ahora - self._inicio_periodo
+        if transcurrido < self.periodo:
+            return
+        cpu_ahora = time.process_time()
+        self.cpu = (cpu_ahora - self._cpu_periodo) / transcurrido
+        real = self._inferencias_periodo / transcurrido
+        self._inicio_periodo, self._cpu_periodo = ahora, cpu_ahora
+        self._inferencias_periodo = 0
+
+        # Inferencia: lo que permite la CPU (proporcional a la frecuencia
+        # lograda) y lo que permite la duración de cada inferencia
+        candidatos = {"máx": self.max_fps_inferencia}
+        if real > 0 and self.cpu > 0:
+            candidatos["cpu"] = real * self.max_cpu / self.cpu
+        if self.duracion_inferencia:
+            candidatos["latencia"] = 1.0 / self.duracion_inferencia
+        self.limitado_por = min(candidatos, key=candidatos.get)
+        objetivo = candidatos[self.limitado_por]
+        if objetivo < self.min_fps_inferencia:
+            objetivo, self.limitado_por = self.min_fps_inferencia, "mín"
+        self.fps_inferencia = self._ema(self.fps_inferencia, objetivo)
+
+        # Display: no dedicar más de la mitad del hilo de Tk a dibujar y, si
+        # la inferencia ya está en su mínimo, ceder también CPU desde aquí
+        display = self.objetivo_display
+        if self.duracion_display:
+            display = min(display, 0.5 / self.duracion_display)
+        if self.limitado_por == "mín" and self.cpu > self.max_cpu:
+            display *= self.max_cpu / self.cpu
+        self.fps_display = max(self.min_fps_display, display)
+
+    def resumen(self):
+        latencia = f" {self.duracion_inferencia * 1000:.0f}ms" if self.duracion_inferencia else ""
+        return (f"inf {self.fps_inferencia:.1f}/s{latencia} disp {self.fps_display:.0f}/s "
+                f"cpu {self.cpu:.0%} [{self.limitado_por}]")
+
+
+class SuavizadorEmociones:
+    """
+    Media móvil exponencial de las puntuaciones de cada cara (por face_id).
+    'tau' es la constante de tiempo en segundos; 0 desactiva el suavizado.
+    """
+
+    def __init__(self, tau=0.3, olvido=1.0):
+        self.tau = tau
+        self.olvido = olvido
+        self.estados = {}
+
+    def reset(self):
+        self.estados = {}
+
+    def actualizar(self, caras, ahora=None):
+        """
+        Retorna copias de 'caras' con 'emotion', 'dominant_emotion' y
+        'confidence' suavizados
+        """
+        if not caras or self.tau <= 0:
+            return caras
+        ahora = time.monotonic() if ahora is None else ahora
+        suavizadas = []
+        for cara in caras:
+            clave = cara.get('face_id')
+            previo = self.estados.get(clave)
+            if previo is None or ahora - previo[1] > self.olvido:
+                emociones = dict(cara['emotion'])
+            else:
+                alfa = 1 - math.exp(-(ahora - previo[1]) / self.tau)
+                emociones = {e: previo[0].get(e, v) + alfa * (v - previo[0].get(e, v))
+                             for e, v in cara['emotion'].items()}
+            self.estados[clave] = (emociones, ahora)
+            dominante = max(emociones, key=emociones.get)
+            suavizadas.append(dict(cara, emotion=emociones, dominant_emotion=dominante,
+                                   confidence=emociones[dominante]))
+
+        # Olvidar las caras que ya no aparecen
+        for clave in [c for c, (_, t) in self.estados.items() if ahora - t > self.olvido]:
+            del self.estados[clave]
+        return suavizadas
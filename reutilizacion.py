@@ -0,0 +1,102 @@
+"""
+Reutilización de resultados para no repetir el análisis sobre imágenes que
+no cambiaron: frames casi idénticos de la webcam y fotos ya analizadas.
+"""
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+class ReutilizadorFrames:
+    """
+    Compara una miniatura en gris de cada frame con la del último frame
+    analizado (diferencia absoluta media, niveles 0-255). Si el cambio está
+    por debajo de 'umbral' y el resultado tiene menos de 'max_edad' segundos,
+    se reutiliza en lugar de volver a analizar.
+    """
+
+    def __init__(self, umbral=3.0, max_edad=1.0, tamano=(64, 36)):
+        self.umbral = umbral
+        self.max_edad = max_edad
+        self.tamano = tamano
+        self.reset()
+
+    def reset(self):
+        self.instante = 0.0
+        self.referencia = None
+        self.resultado = None
+        self._pendiente = None
+        self.analizados = 0
+        self.reutilizados = 0
+
+    def _miniatura(self, frame):
+        small = cv2.resize(frame, self.tamano, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def buscar(self, frame, ahora=None):
+        """
+        Retorna el resultado anterior si el frame apenas cambió, o None si hay
+        que analizarlo (en ese caso se debe llamar a guardar con el resultado)
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        miniatura = self._miniatura(frame)
+        if (self.referencia is not None and self.resultado is not None
+                and ahora - self.instante < self.max_edad
+                and cv2.absdiff(miniatura, self.referencia).mean() < self.umbral):
+            self.reutilizados += 1
+            return self.resultado
+        self._pendiente = (miniatura, ahora)
+        return None
+
+    def guardar(self, resultado):
+        if self._pendiente is None:
+            return
+        self.referencia, self.instante = self._pendiente
+        self.resultado = resultado
+        self._pendiente = None
+        self.analizados += 1
+
+    @property
+    def tasa(self):
+        total = self.analizados + self.reutilizados
+        return self.reutilizados / total if total else 0.0
+
+
+class CacheImagenes:
+    """
+    Caché LRU de resultados de imágenes fijas, indexada por el hash del
+    contenido decodificado (abrir otra vez la misma foto es inmediato)
+    """
+
+    def __init__(self, capacidad=32):
+        self.capacidad = capacidad
+        self.entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(img):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str((img.shape, img.dtype.str)).encode())
+        h.update(img.tobytes() if not img.flags.c_contiguous else img.data)
+        return h.hexdigest()
+
+    def obtener(self, img, calcular):
+        """
+        Retorna el resultado guardado para 'img' o lo calcula con calcular(img).
+        Se entregan copias para que quien llama pueda modificarlas.
+        """
+        clave = self.clave(img)
+        if clave in self.entradas:
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            return copy.deepcopy(self.entradas[clave])
+        self.fallos += 1
+        resultado = calcular(img)
+        self.entradas[clave] = copy.deepcopy(resultado)
+        if len(self.entradas) > self.capacidad:
+            self.entradas.popitem(last=False)
+        return resultado
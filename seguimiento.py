@@ -0,0 +1,206 @@
+import cv2
+
+from analisis import analizar_caras, clasificar_caras, construir_resultado
+from metricas import medir
+
+
+class TemplateTracker:
+    """
+    Seguimiento barato de una cara mediante correlación de plantilla sobre
+    una versión reducida en escala de grises del frame.
+    """
+
+    def __init__(self, scale=0.5, search_margin=0.5):
+        self.scale = scale
+        self.search_margin = search_margin
+        self.template = None
+        self.box = None
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale,
+                          interpolation=cv2.INTER_AREA)
+
+    def init(self, frame, box):
+        """
+        Toma como plantilla la región 'box' = (x, y, w, h) del frame
+        """
+        gray = self._gray(frame)
+        x, y, w, h = [int(round(v * self.scale)) for v in box]
+        self.template = gray[y:y + h, x:x + w].copy()
+        self.box = (x, y, w, h)
+
+    def update(self, frame):
+        """
+        Busca la plantilla alrededor de su última posición. Retorna la nueva
+        caja en coordenadas del frame original y la confianza (0 a 1).
+        """
+        if self.template is None or self.template.size == 0:
+            return None, 0.0
+        gray = self._gray(frame)
+        x, y, w, h = self.box
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1 = min(gray.shape[1], x + w + mx)
+        y1 = min(gray.shape[0], y + h + my)
+        region = gray[y0:y1, x0:x1]
+        if region.shape[0] < h or region.shape[1] < w:
+            return None, 0.0
+
+        scores = cv2.matchTemplate(region, self.template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, (dx, dy) = cv2.minMaxLoc(scores)
+        self.box = (x0 + dx, y0 + dy, w, h)
+        box = tuple(int(round(v / self.scale)) for v in self.box)
+        return box, max(0.0, float(confidence))
+
+
+class FaceTrackScheduler:
+    """
+    Ejecuta la detección completa de caras solo cada 'detect_every' frames o
+    cuando la confianza del seguimiento cae por debajo de 'min_confidence'.
+    Entre detecciones sigue las caras con TemplateTracker y envía únicamente
+    el recorte de cada cara al clasificador de emociones.
+    """
+
+    def __init__(self, detector=None, detect_every=10, min_confidence=0.6,
+                 detector_backend=None):
+        self.detector = detector
+        self.detect_every = detect_every
+        self.min_confidence = min_confidence
+        self.detector_backend = detector_backend
+        self.reset()
+
+    def reset(self):
+        self.trackers = []
+        self.frames_since_detection = 0
+        self.detections = 0
+        self.tracked = 0
+
+    @property
+    def ratio(self):
+        """
+        Proporción de frames resueltos con detección completa
+        """
+        total = self.detections + self.tracked
+        return self.detections / total if total else 0.0
+
+    def summary(self):
+        return f"det/seg {self.detections}/{self.tracked}"
+
+    def process(self, frame):
+        """
+        Analiza el frame y retorna una lista de resultados con el mismo
+        formato que DeepFace.analyze.
+        """
+        if (not self.trackers or self.frames_since_detection >= self.detect_every - 1):
+            return self._detect(frame)
+
+        boxes = []
+        with medir("seguimiento"):
+            for tracker in self.trackers:
+                box, confidence = tracker.update(frame)
+                if box is None or confidence < self.min_confidence:
+                    break
+                boxes.append(box)
+        if len(boxes) < len(self.trackers):
+            # El seguimiento se perdió: volver a detectar
+            return self._detect(frame)
+
+        self.frames_since_detection += 1
+        self.tracked += 1
+        return self._classify_crops(frame, boxes)
+
+    def _detect(self, frame):
+        resultado = analizar_caras(frame, detector=self.detector,
+                                   detector_backend=self.detector_backend)
+
+        self.trackers = []
+        for res in resultado:
+            # Sin cara real DeepFace devuelve el frame completo con confianza 0
+            if not res.get('face_confidence'):
+                continue
+            region = res['region']
+            tracker = TemplateTracker()
+            tracker.init(frame, (region['x'], region['y'], region['w'], region['h']))
+            self.trackers.append(tracker)
+
+        self.frames_since_detection = 0
+        self.detections += 1
+        return resultado
+
+    def _classify_crops(self, frame, boxes):
+        """
+        Clasifica los recortes de todas las caras seguidas en un único lote
+        """
+        crops = []
+        for x, y, w, h in boxes:
+            crops.append(frame[max(0, y):y + h, max(0, x):x + w])
+        with medir("clasificacion"):
+            emociones = clasificar_caras(crops)
+        return [
+            construir_resultado(emotions, {'x': x, 'y': y, 'w': w, 'h': h}, 1.0)
+            for (x, y, w, h), emotions in zip(boxes, emociones)
+        ]
+
+
+def iou(a, b):
+    """
+    Intersección sobre unión de dos regiones {'x', 'y', 'w', 'h'}
+    """
+    x0, y0 = max(a['x'], b['x']), max(a['y'], b['y'])
+    x1 = min(a['x'] + a['w'], b['x'] + b['w'])
+    y1 = min(a['y'] + a['h'], b['y'] + b['h'])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a['w'] * a['h'] + b['w'] * b['h'] - inter
+    return inter / union if union else 0.0
+
+
+class FaceIdentifier:
+    """
+    Asigna un identificador estable a cada persona emparejando sus regiones
+    con las del frame anterior por solapamiento (IoU).
+    """
+
+    def __init__(self, min_iou=0.3, max_missing=15):
+        self.min_iou = min_iou
+        self.max_missing = max_missing
+        self.reset()
+
+    def reset(self):
+        self.faces = {}  # face_id -> [region, frames sin verse]
+        self.next_id = 1
+
+    def assign(self, resultado):
+        """
+        Agrega 'face_id' a cada resultado y lo retorna
+        """
+        libres = set(self.faces)
+        pares = []
+        for i, res in enumerate(resultado):
+            for face_id in libres:
+                pares.append((iou(res['region'], self.faces[face_id][0]), i, face_id))
+        pares.sort(reverse=True)
+
+        asignados = {}
+        for score, i, face_id in pares:
+            if score < self.min_iou:
+                break
+            if i in asignados or face_id not in libres:
+                continue
+            asignados[i] = face_id
+            libres.discard(face_id)
+
+        for i, res in enumerate(resultado):
+            face_id = asignados.get(i)
+            if face_id is None:
+                face_id = self.next_id
+                self.next_id += 1
+            res['face_id'] = face_id
+            self.faces[face_id] = [res['region'], 0]
+
+        # Olvidar las caras que llevan demasiado tiempo sin aparecer
+        for face_id in libres:
+            self.faces[face_id][1] += 1
+            if self.faces[face_id][1] > self.max_missing:
+                del self.faces[face_id]
+        return resultado
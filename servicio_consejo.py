@@ -0,0 +1,167 @@
+"""
+Servicio de consejos compartido por todo el proceso.
+
+Un único cliente AsyncOpenAI (con conexiones HTTP reutilizables) vive en un
+hilo con su propio bucle de asyncio. Al iniciar la aplicación se envía una
+petición mínima de calentamiento para que Ollama cargue el modelo y el
+prompt del sistema antes de que el usuario pida el primer consejo. Cada
+petición se puede cancelar (por ejemplo, al cerrar la ventana) y registra el
+tiempo hasta el primer token y los tokens por segundo.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from metricas import METRICAS
+
+# Servidor compatible con OpenAI (Ollama); la variable de entorno permite
+# apuntar a otro, por ejemplo al de stub_llm.py
+MODELO = "qwen3:1.7b"
+SERVIDOR_MODELO = os.environ.get("EMOTIONTRACKER_LLM", "http://localhost:11434/v1")
+
+SYSTEM_MESSAGE = """
+Eres un Psicólogo experto en análisis de emociones y un consejero empático. Tu objetivo principal es ayudar a las personas a entender y gestionar sus estados emocionales.
+
+Cuando se te presente un conjunto de emociones, debes:
+1.  Validar y reconocer las emociones del usuario de forma empática.
+2.  Analizar la combinación de emociones para identificar posibles causas subyacentes o interacciones.
+3.  Proporcionar una serie de consejos cortos y concisos para que el usuario pueda tomar para gestionar esas emociones de forma constructiva.
+
+Tu tono debe ser siempre comprensivo, alentador y profesional.
+"""
+
+
+class ServicioConsejo:
+    """
+    Cliente del modelo de consejos con su bucle de asyncio en segundo plano.
+    Los métodos públicos se llaman desde cualquier hilo y retornan un
+    concurrent.futures.Future (cancelarlo cancela la petición).
+    """
+
+    def __init__(self, servidor=SERVIDOR_MODELO, modelo=MODELO, system_message=SYSTEM_MESSAGE, conexiones=4):
+        self.servidor = servidor
+        self.modelo = modelo
+        self.system_message = system_message
+        self.conexiones = conexiones
+        self.cliente = None
+        self.estadisticas = deque(maxlen=100)
+        self.precalentado = threading.Event()
+        self.tiempo_precalentado = None
+        self.error_precalentado = None
+
+        self.loop = asyncio.new_event_loop()
+        self.hilo = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.hilo.start()
+
+    def _cliente(self):
+        # openai y httpx se importan en el hilo del servicio, no en el de Tk
+        if self.cliente is None:
+            import httpx
+            from openai import AsyncOpenAI
+            http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.conexiones,
+                                    max_keepalive_connections=self.conexiones,
+                                    keepalive_expiry=600),
+                timeout=httpx.Timeout(300, connect=5),
+            )
+            self.cliente = AsyncOpenAI(base_url=self.servidor, api_key="ollama", http_client=http, max_retries=0)
+        return self.cliente
+
+    def _mensajes(self, prompt):
+        return [{'role': 'system', 'content': self.system_message}, {'role': 'user', 'content': prompt}]
+
+    def _enviar(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def precalentar(self):
+        """
+        Abre la conexión y hace que el servidor cargue el modelo con una
+        respuesta de un solo token
+        """
+        return self._enviar(self._precalentar())
+
+    async def _precalentar(self):
+        inicio = time.perf_counter()
+        try:
+            await self._cliente().chat.completions.create(
+                model=self.modelo, messages=self._mensajes("Hola"), max_tokens=1)
+            self.tiempo_precalentado = time.perf_counter() - inicio
+        except Exception as e:
+            self.error_precalentado = e
+        finally:
+            self.precalentado.set()
+
+    def pedir(self, prompt, al_texto=None, max_tokens=None):
+        """
+        Pide un consejo en streaming. 'al_texto' recibe el texto acumulado
+        (desde el hilo del servicio) con cada fragmento nuevo. El resultado
+        del futuro es un diccionario con el texto y las medidas de latencia.
+        """
+        return self._enviar(self._pedir(prompt, al_texto, max_tokens))
+
+    async def _pedir(self, prompt, al_texto, max_tokens):
+        inicio = time.perf_counter()
+        kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+        stream = await self._cliente().chat.completions.create(
+            model=self.modelo, messages=self._mensajes(prompt), stream=True,
+            stream_options={"include_usage": True}, **kwargs)
+        texto = ""
+        primer_token = None
+        fragmentos = 0
+        tokens = None
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    tokens = chunk.usage.completion_tokens
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if primer_token is None:
+                    primer_token = time.perf_counter() - inicio
+                fragmentos += 1
+                texto += chunk.choices[0].delta.content
+                if al_texto is not None:
+                    al_texto(texto)
+        finally:
+            # Al cancelar se cierra la respuesta y el servidor deja de generar
+            await stream.close()
+
+        total = time.perf_counter() - inicio
+        tokens = tokens or fragmentos
+        generacion = total - (primer_token or total)
+        medidas = {
+            "texto": texto,
+            "primer_token_s": primer_token,
+            "total_s": total,
+            "tokens": tokens,
+            "tokens_s": (tokens - 1) / generacion if generacion > 0 and tokens > 1 else 0.0,
+        }
+        self.estadisticas.append({k: v for k, v in medidas.items() if k != "texto"})
+        if primer_token is not None:
+            METRICAS.registrar("llm_primer_token", primer_token)
+        METRICAS.contar("llm_tokens_s", round(medidas["tokens_s"], 1))
+        return medidas
+
+    def cerrar(self):
+        async def _cerrar():
+            if self.cliente is not None:
+                await self.cliente.close()
+        self._enviar(_cerrar()).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.hilo.join(timeout=5)
+
+
+_servicio = None
+_lock = threading.Lock()
+
+
+def obtener_servicio():
+    """
+    Retorna el servicio compartido, creándolo la primera vez
+    """
+    global _servicio
+    with _lock:
+        if _servicio is None:
+            _servicio = ServicioConsejo()
+        return _servicio
@@ -0,0 +1,283 @@
+"""
+Servicio HTTP local de análisis de emociones con micro-lotes dinámicos.
+
+Cada petición decodifica su imagen y detecta las caras en su propio hilo;
+los recortes de todas las peticiones concurrentes se juntan durante unos
+milisegundos (--max-espera-ms) o hasta --max-lote caras y se clasifican en
+una sola llamada al modelo. Si la cola de peticiones pendientes está llena
+el servidor responde 503 con Retry-After en lugar de acumular latencia.
+
+La respuesta tiene el mismo formato de caras que usa EmotionApp.load_image
+(interpretar_resultados):
+
+    {"caras": [{"face_id": 1, "dominant_emotion": "happy", "confidence": 87.1,
+                "emotion": {...}, "region": {"x": ..., "y": ..., "w": ..., "h": ...}}],
+     "latencia_ms": 12.3}
+
+Uso:
+    python servidor.py --puerto 5000 --max-lote 32 --max-espera-ms 5 --motor tflite
+    gunicorn -w 1 --threads 32 -b 0.0.0.0:5000 'servidor:crear_app()'
+    curl -F imagen=@foto.jpg http://localhost:5000/analizar
+    curl --data-binary @frame.jpg -H "Content-Type: image/jpeg" http://localhost:5000/analizar
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from metricas import METRICAS, medir
+
+
+class ColaLlena(Exception):
+    """
+    La cola del agrupador está llena; el cliente debe reintentar más tarde
+    """
+
+
+class AgrupadorLotes:
+    """
+    Junta las peticiones concurrentes en lotes para 'procesar', que recibe la
+    lista concatenada de elementos y retorna un resultado por elemento.
+
+    Cada petición aporta una lista de elementos (las caras de una imagen).
+    Un lote se cierra al llegar a 'max_lote' elementos o 'max_espera'
+    segundos después de su primera petición; 'cola_max' limita las
+    peticiones en espera.
+    """
+
+    def __init__(self, procesar, max_lote=32, max_espera=0.005, cola_max=64):
+        self.procesar = procesar
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self.cola = queue.Queue(maxsize=cola_max)
+        self.lotes = 0
+        self.elementos = 0
+        self.rechazadas = 0
+        # Los rechazos se cuentan desde los hilos de las peticiones
+        self.lock_rechazadas = threading.Lock()
+        self.activo = True
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+
+    def enviar(self, elementos):
+        """
+        Encola los elementos de una petición y retorna un Future con sus
+        resultados. Lanza ColaLlena si no hay espacio.
+        """
+        futuro = Future()
+        if not elementos:
+            futuro.set_result([])
+            return futuro
+        try:
+            self.cola.put_nowait((list(elementos), futuro))
+        except queue.Full:
+            self.rechazar()
+            raise ColaLlena()
+        return futuro
+
+    def rechazar(self):
+        """
+        Cuenta una petición rechazada con 503
+        """
+        with self.lock_rechazadas:
+            self.rechazadas += 1
+            METRICAS.contar("rechazadas", self.rechazadas)
+
+    def lleno(self):
+        return self.cola.full()
+
+    def _bucle(self):
+        pendiente = None
+        while self.activo:
+            if pendiente is None:
+                try:
+                    pendiente = self.cola.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            lote, pendiente = [pendiente], None
+            cantidad = len(lote[0][0])
+            limite = time.monotonic() + self.max_espera
+            while cantidad < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    peticion = self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                if cantidad + len(peticion[0]) > self.max_lote:
+                    # No cabe: abre el siguiente lote
+                    pendiente = peticion
+                    break
+                lote.append(peticion)
+                cantidad += len(peticion[0])
+            self._ejecutar(lote)
+
+    def _ejecutar(self, lote):
+        lote = [(elementos, futuro) for elementos, futuro in lote if futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        todos = [e for elementos, _ in lote for e in elementos]
+        try:
+            with medir("clasificacion"):
+                resultados = self.procesar(todos)
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.elementos += len(todos)
+        METRICAS.contar("lote_medio", round(self.elementos / self.lotes, 2))
+        inicio = 0
+        for elementos, futuro in lote:
+            futuro.set_result(resultados[inicio:inicio + len(elementos)])
+            inicio += len(elementos)
+
+    def estado(self):
+        return {
+            "lotes": self.lotes,
+            "elementos": self.elementos,
+            "lote_medio": self.elementos / self.lotes if self.lotes else 0.0,
+            "en_cola": self.cola.qsize(),
+            "rechazadas": self.rechazadas,
+        }
+
+    def cerrar(self):
+        self.activo = False
+        self.hilo.join(timeout=1)
+
+
+def _a_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo no serializable: {type(obj)}")
+
+
+def decodificar(datos):
+    """
+    Decodifica una imagen codificada (JPEG, PNG...) a BGR, o None
+    """
+    if not datos:
+        return None
+    return cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_COLOR)
+
+
+def crear_app(max_lote=32, max_espera_ms=5.0, cola_max=64, timeout=10.0, detector_backend=None,
+              motor=None, detectar=None, clasificar=None, precalentar_modelo=True, escala_deteccion=None,
+              config_detector=None):
+    """
+    Construye la aplicación Flask con su agrupador. 'detectar' y 'clasificar'
+    reemplazan a analisis.detectar_caras y analisis.clasificar_caras. El
+    detector es el mismo que usa la interfaz: el de autotune_detector.py
+    (config_detector, por defecto detector_config.json) salvo que se indiquen
+    'detector_backend' o 'escala_deteccion'.
+    """
+    from flask import Flask, Response, request
+
+    import analisis
+    from autotune_detector import RUTA_CONFIG, aplicar_config
+    if motor:
+        analisis.usar_motor(motor)
+    if detectar is None:
+        detector_backend, _ = aplicar_config(config_detector or RUTA_CONFIG, detector_backend, escala_deteccion)
+    if precalentar_modelo and detectar is None and clasificar is None:
+        analisis.precalentar(detector_backend)
+    detectar = detectar or (lambda img: analisis.detectar_caras(img, detector_backend=detector_backend))
+    clasificar = clasificar or analisis.clasificar_caras
+
+    agrupador = AgrupadorLotes(clasificar, max_lote=max_lote, max_espera=max_espera_ms / 1000,
+                               cola_max=cola_max)
+    app = Flask(__name__)
+    app.config["agrupador"] = agrupador
+
+    def responder(datos, estado=200, cabeceras=None):
+        return Response(json.dumps(datos, default=_a_json, ensure_ascii=False), status=estado,
+                        headers=cabeceras, mimetype="application/json")
+
+    @app.post("/analizar")
+    def analizar():
+        inicio = time.perf_counter()
+        if agrupador.lleno():
+            # Rechazar antes de decodificar y detectar: sin trabajo inútil
+            agrupador.rechazar()
+            return responder({"error": "Servidor ocupado"}, 503, {"Retry-After": "1"})
+        archivo = request.files.get("imagen")
+        img_bgr = decodificar(archivo.read() if archivo else request.get_data())
+        if img_bgr is None:
+            return responder({"error": "No se pudo cargar la imagen."}, 400)
+
+        futuro = None
+        try:
+            caras = detectar(img_bgr)
+            futuro = agrupador.enviar([cara['face'] for cara in caras])
+            emociones = futuro.result(timeout=timeout)
+        except ColaLlena:
+            return responder({"error": "Servidor ocupado"}, 503, {"Retry-After": "1"})
+        except TimeoutError:
+            futuro.cancel()
+            return responder({"error": "Tiempo de espera agotado"}, 504)
+        except Exception as e:
+            # Fallo del detector o del modelo: respuesta JSON, no la página de error de Flask
+            METRICAS.registrar("peticion", time.perf_counter() - inicio)
+            METRICAS.tick("errores")
+            return responder({"error": f"Error al analizar: {e}"}, 500)
+
+        resultado = analisis.construir_resultados(caras, emociones)
+        for face_id, res in enumerate(resultado, start=1):
+            res['face_id'] = face_id
+        latencia = time.perf_counter() - inicio
+        METRICAS.registrar("peticion", latencia)
+        METRICAS.tick("peticiones")
+        return responder({"caras": analisis.interpretar_resultados(resultado),
+                          "latencia_ms": latencia * 1000})
+
+    @app.get("/estado")
+    def estado():
+        return responder(dict(agrupador.estado(), metricas=METRICAS.resumen()))
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(METRICAS.formato_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def main():
+    from motor_emociones import MOTORES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=5000)
+    parser.add_argument("--max-lote", type=int, default=32, help="caras por llamada al modelo")
+    parser.add_argument("--max-espera-ms", type=float, default=5.0,
+                        help="espera máxima para completar un lote (0 = solo lo que ya esté en cola)")
+    parser.add_argument("--cola-max", type=int, default=64, help="peticiones en espera antes de responder 503")
+    parser.add_argument("--timeout", type=float, default=10.0, help="segundos antes de responder 504")
+    parser.add_argument("--detector-backend", default=None,
+                        help="backend de detección de DeepFace (opencv, mtcnn, retinaface...)")
+    parser.add_argument("--escala-deteccion", type=float,
+                        help="escala de la imagen al detectar (0.5 = mitad); las caras se recortan a resolución completa")
+    parser.add_argument("--config-detector", default=None,
+                        help="configuración elegida por autotune_detector.py (por defecto detector_config.json)")
+    parser.add_argument("--motor", choices=MOTORES, default="deepface")
+    parser.add_argument("--perfil", type=float, metavar="SEGUNDOS",
+                        help="habilitar capturas de perfil de SEGUNDOS con SIGUSR1 (ver perfilado.py)")
+    args = parser.parse_args()
+
+    if args.perfil:
+        from perfilado import perfil_sin_interfaz
+        perfil_sin_interfaz(args.perfil)
+
+    app = crear_app(args.max_lote, args.max_espera_ms, args.cola_max, args.timeout,
+                    args.detector_backend, args.motor, escala_deteccion=args.escala_deteccion,
+                    config_detector=args.config_detector)
+    app.run(host=args.host, port=args.puerto, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
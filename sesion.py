@@ -0,0 +1,248 @@
+"""
+Grabación y reproducción de sesiones en un formato binario compacto.
+
+Archivo .emo: una cabecera fija de 512 bytes seguida de registros de tamaño
+fijo (uno por cara detectada) que solo se agregan al final, de modo que se
+puede leer con np.memmap sin interpretar nada. Las miniaturas opcionales de
+cada cara van en un archivo aparte (.emo.miniaturas) para que el archivo
+principal siga siendo pequeño.
+
+Uso:
+    python sesion.py resumen sesiones/sesion_20250101_120000.emo
+"""
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from historial import HistorialEmociones
+
+MAGIA = b"EMOSES01"
+VERSION = 1
+TAMANO_CABECERA = 512
+MAX_EMOCIONES = 16
+LARGO_NOMBRE = 24
+# magia, versión, máx. emociones, ancho y alto de miniatura
+FORMATO_CABECERA = "<8sIIHH"
+
+REGISTRO = np.dtype([
+    ("t", "<f8"),                        # segundos desde el inicio de la sesión
+    ("miniatura", "<i8"),                # índice en el archivo de miniaturas o -1
+    ("face_id", "<i4"),
+    ("caja", "<i4", (4,)),               # x, y, w, h en el frame original
+    ("dominante", "<i2"),                # columna de la emoción dominante o -1
+    ("reservado", "<i2"),
+    ("puntuaciones", "<f4", (MAX_EMOCIONES,)),  # NaN si la emoción no aparece
+])
+
+
+def escribir_cabecera(archivo, emociones, miniatura):
+    ancho, alto = miniatura or (0, 0)
+    datos = struct.pack(FORMATO_CABECERA, MAGIA, VERSION, MAX_EMOCIONES, ancho, alto)
+    for emocion in emociones:
+        datos += emocion.encode("utf-8")[:LARGO_NOMBRE].ljust(LARGO_NOMBRE, b"\0")
+    archivo.write(datos.ljust(TAMANO_CABECERA, b"\0"))
+
+
+def leer_cabecera(archivo):
+    datos = archivo.read(TAMANO_CABECERA)
+    magia, version, max_emociones, ancho, alto = struct.unpack_from(FORMATO_CABECERA, datos)
+    if magia != MAGIA:
+        raise ValueError("No es un archivo de sesión de EmotionTracker")
+    inicio = struct.calcsize(FORMATO_CABECERA)
+    emociones = []
+    for i in range(max_emociones):
+        nombre = datos[inicio + i * LARGO_NOMBRE:inicio + (i + 1) * LARGO_NOMBRE].rstrip(b"\0")
+        if not nombre:
+            break
+        emociones.append(nombre.decode("utf-8"))
+    return emociones, ((ancho, alto) if ancho else None)
+
+
+class GrabadorSesion:
+    """
+    Graba los resultados de una sesión desde un hilo de escritura propio:
+    'agregar' nunca bloquea a la captura (si la cola se llena, el resultado
+    se descarta y se cuenta). A la cola solo van las miniaturas, no el frame,
+    para que su memoria no dependa de la resolución de la cámara.
+    """
+
+    def __init__(self, ruta, miniatura=(32, 32), max_pendientes=1024):
+        self.ruta = ruta
+        self.miniatura = miniatura
+        self.emociones = []
+        self.indices = {}
+        self.registros = 0
+        self.miniaturas = 0
+        self.descartados = 0
+
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.archivo = open(ruta, "wb")
+        escribir_cabecera(self.archivo, self.emociones, miniatura)
+        self.archivo_miniaturas = open(ruta + ".miniaturas", "wb") if miniatura else None
+
+        self.cola = queue.Queue(max_pendientes)
+        self.hilo = threading.Thread(target=self._run, daemon=True)
+        self.hilo.start()
+
+    def agregar(self, timestamp, caras, frame=None):
+        miniaturas = None
+        if self.archivo_miniaturas and frame is not None:
+            miniaturas = [self._miniatura(frame, cara.get("region")) for cara in caras]
+        try:
+            self.cola.put_nowait((timestamp, caras, miniaturas))
+        except queue.Full:
+            self.descartados += 1
+
+    def _miniatura(self, frame, region):
+        """
+        Miniatura en gris de la cara, o None si la región está vacía
+        """
+        if not region:
+            return None
+        x, y = max(0, region["x"]), max(0, region["y"])
+        recorte = frame[y:y + region["h"], x:x + region["w"]]
+        if recorte.size == 0:
+            return None
+        gris = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY) if recorte.ndim == 3 else recorte
+        return cv2.resize(gris, self.miniatura, interpolation=cv2.INTER_AREA)
+
+    def cerrar(self):
+        self.cola.put(None)
+        self.hilo.join()
+
+    def _columna(self, emocion):
+        columna = self.indices.get(emocion)
+        if columna is None:
+            if len(self.emociones) == MAX_EMOCIONES:
+                return None
+            columna = self.indices[emocion] = len(self.emociones)
+            self.emociones.append(emocion)
+            # La cabecera es de tamaño fijo: se reescribe en su lugar
+            self.archivo.seek(0)
+            escribir_cabecera(self.archivo, self.emociones, self.miniatura)
+            self.archivo.seek(0, os.SEEK_END)
+        return columna
+
+    def _run(self):
+        while True:
+            item = self.cola.get()
+            if item is None:
+                break
+            self._escribir(*item)
+            if self.cola.empty():
+                # Hacer visible lo escrito a los lectores cuando no hay trabajo pendiente
+                self.archivo.flush()
+        self.archivo.close()
+        if self.archivo_miniaturas:
+            self.archivo_miniaturas.close()
+
+    def _escribir(self, timestamp, caras, miniaturas):
+        registros = np.zeros(len(caras), REGISTRO)
+        registros["puntuaciones"] = np.nan
+        registros["miniatura"] = -1
+        registros["t"] = timestamp
+        for i, cara in enumerate(caras):
+            registro = registros[i]
+            registro["face_id"] = cara.get("face_id") if cara.get("face_id") is not None else -1
+            # Más allá de MAX_EMOCIONES no hay columna: dominante -1 y la
+            # puntuación no se guarda
+            dominante = self._columna(cara["dominant_emotion"])
+            registro["dominante"] = -1 if dominante is None else dominante
+            for emocion, valor in cara["emotion"].items():
+                columna = self._columna(emocion)
+                if columna is not None:
+                    registro["puntuaciones"][columna] = valor
+            region = cara.get("region")
+            if region:
+                registro["caja"] = (region["x"], region["y"], region["w"], region["h"])
+            if miniaturas is not None and miniaturas[i] is not None:
+                self.archivo_miniaturas.write(miniaturas[i].tobytes())
+                registro["miniatura"] = self.miniaturas
+                self.miniaturas += 1
+        self.archivo.write(registros.tobytes())
+        self.registros += len(registros)
+
+
+class LectorSesion:
+    """
+    Abre una sesión grabada mediante memory-mapping; los agregados se
+    calculan con operaciones vectorizadas sobre las columnas
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            self.emociones, self.miniatura = leer_cabecera(f)
+        # Un registro a medio escribir al final se ignora
+        n = (os.path.getsize(ruta) - TAMANO_CABECERA) // REGISTRO.itemsize
+        if n > 0:
+            self.registros = np.memmap(ruta, REGISTRO, "r", offset=TAMANO_CABECERA, shape=(n,))
+        else:
+            self.registros = np.zeros(0, REGISTRO)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def miniaturas(self):
+        """
+        Arreglo (N, alto, ancho) de miniaturas mapeado en memoria
+        """
+        ruta = self.ruta + ".miniaturas"
+        if not self.miniatura or not os.path.exists(ruta) or not os.path.getsize(ruta):
+            return np.zeros((0, 0, 0), np.uint8)
+        ancho, alto = self.miniatura
+        return np.memmap(ruta, np.uint8, "r").reshape(-1, alto, ancho)
+
+    def historial(self, **kwargs):
+        """
+        Reconstruye un HistorialEmociones para show_emotion_statistics y
+        consejo; los registros sin emoción dominante (-1) se omiten
+        """
+        e = len(self.emociones)
+        registros = self.registros[self.registros["dominante"] >= 0]
+        return HistorialEmociones(**kwargs).cargar(
+            self.emociones,
+            registros["t"],
+            registros["puntuaciones"][:, :e],
+            registros["dominante"],
+            registros["face_id"],
+        )
+
+
+def nueva_ruta(carpeta="sesiones"):
+    return os.path.join(carpeta, time.strftime("sesion_%Y%m%d_%H%M%S.emo"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    resumen = sub.add_parser("resumen", help="mostrar los agregados de una sesión")
+    resumen.add_argument("archivo")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    lector = LectorSesion(args.archivo)
+    historial = lector.historial()
+    tiempo = time.perf_counter() - inicio
+
+    print(f"{len(lector)} detecciones en {historial.duracion:.1f}s de sesión "
+          f"(leído en {tiempo * 1000:.1f} ms)")
+    medias = historial.medias()
+    for emocion, porcentaje in sorted(historial.porcentajes().items(), key=lambda x: -x[1]):
+        print(f"  {emocion}: {porcentaje:.1f}% dominante, puntuación media {medias.get(emocion, 0):.1f}")
+    for segundos, conteos in historial.ventanas().items():
+        print(f"  últimos {segundos // 60} min: {conteos}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Servidor local que imita la API compatible con OpenAI de Ollama
+(/v1/chat/completions con y sin streaming, /v1/models) para probar consejo
+y medir latencias sin descargar qwen3:1.7b.
+
+Responde siempre el mismo texto, dividido en "tokens" (palabras) que se
+envían con un retardo fijo después de una espera inicial. La primera
+petición espera además '--carga' segundos, como Ollama al cargar el modelo.
+
+Uso:
+    python stub_llm.py --puerto 11435 --retardo 0.02 --primer-token 0.3 --carga 2
+    EMOTIONTRACKER_LLM=http://127.0.0.1:11435/v1 python emociones.py
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPUESTA = (
+    "Es comprensible sentir esta mezcla de emociones. Predomina un estado tranquilo, "
+    "con momentos de alegría y algo de tristeza o preocupación. "
+    "1. Reconoce lo que sientes sin juzgarlo. "
+    "2. Dedica unos minutos a respirar de forma pausada. "
+    "3. Anota qué situaciones despertaron la preocupación. "
+    "4. Busca una actividad breve que te guste para reforzar la alegría. "
+    "Si la tristeza persiste varios días, conversar con alguien de confianza puede ayudar."
+)
+
+
+class StubLLM:
+    """
+    Servidor en un hilo propio; 'peticiones' cuenta las completions atendidas
+    """
+
+    def __init__(self, puerto=0, retardo=0.02, primer_token=0.3, carga=0.0, respuesta=RESPUESTA,
+                 modelo="qwen3:1.7b"):
+        self.retardo = retardo
+        self.primer_token = primer_token
+        self.carga = carga
+        self.lock_carga = threading.Lock()
+        self.tokens = [t + " " for t in respuesta.split(" ")]
+        self.modelo = modelo
+        self.peticiones = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json({"object": "list", "data": [{"id": stub.modelo, "object": "model"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                largo = int(self.headers.get("Content-Length", 0))
+                peticion = json.loads(self.rfile.read(largo) or b"{}")
+                stub.peticiones += 1
+                max_tokens = peticion.get("max_tokens") or len(stub.tokens)
+                tokens = stub.tokens[:max_tokens]
+                with stub.lock_carga:
+                    # Solo la primera petición paga la carga del modelo
+                    carga, stub.carga = stub.carga, 0.0
+                    time.sleep(carga)
+                time.sleep(stub.primer_token)
+                if peticion.get("stream"):
+                    self._stream(tokens)
+                else:
+                    time.sleep(stub.retardo * len(tokens))
+                    self._json(stub._completion("".join(tokens)))
+
+            def _json(self, datos):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _stream(self, tokens):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(stub.retardo)
+                        self._evento(stub._chunk({"role": "assistant", "content": token} if i == 0
+                                                 else {"content": token}))
+                    self._evento(stub._chunk({}, "stop"))
+                    self._enviar(b"data: [DONE]\n\n")
+                    self._enviar(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # El cliente canceló la petición
+
+            def _evento(self, datos):
+                self._enviar(b"data: " + json.dumps(datos).encode() + b"\n\n")
+
+            def _enviar(self, datos):
+                self.wfile.write(f"{len(datos):x}\r\n".encode() + datos + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        self.servidor.daemon_threads = True
+        self.puerto = self.servidor.server_address[1]
+        self.url = f"http://127.0.0.1:{self.puerto}/v1"
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+
+    def _base(self):
+        return {"id": f"chatcmpl-stub{self.peticiones}", "created": int(time.time()), "model": self.modelo}
+
+    def _chunk(self, delta, finish_reason=None):
+        return dict(self._base(), object="chat.completion.chunk",
+                    choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+    def _completion(self, texto):
+        return dict(self._base(), object="chat.completion",
+                    choices=[{"index": 0, "message": {"role": "assistant", "content": texto},
+                              "finish_reason": "stop"}],
+                    usage={"prompt_tokens": 0, "completion_tokens": len(self.tokens),
+                           "total_tokens": len(self.tokens)})
+
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=11435)
+    parser.add_argument("--retardo", type=float, default=0.02, help="segundos entre tokens")
+    parser.add_argument("--primer-token", type=float, default=0.3, help="segundos hasta el primer token")
+    parser.add_argument("--carga", type=float, default=0.0, help="segundos extra de la primera petición")
+    args = parser.parse_args()
+
+    stub = StubLLM(args.puerto, args.retardo, args.primer_token, args.carga)
+    print(f"Servidor de prueba en {stub.url} (Ctrl+C para salir)")
+    try:
+        stub.hilo.join()
+    except KeyboardInterrupt:
+        stub.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
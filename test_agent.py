@@ -1,27 +1,112 @@
-from qwen_agent.agents import Assistant
-from qwen_agent.utils.output_beautify import typewriter_print
+"""
+Benchmark de latencia del consejo: tiempo hasta el primer token y tokens por
+segundo, comparando un cliente nuevo por petición (como cuando cada ventana
+creaba su propio Assistant) contra el servicio compartido y precalentado de
+servicio_consejo.py.
 
-llm_cfg = {
-    "model": "qwen3:1.7b",
-    "model_server": "http://localhost:11434/v1",
-}
+Por defecto usa el servidor de prueba de stub_llm.py, con una carga del
+modelo simulada en la primera petición; --servidor mide contra Ollama.
 
-system_message = """
-Eres un Psicólogo experto en análisis de emociones y un consejero empático. Tu objetivo principal es ayudar a las personas a entender y gestionar sus estados emocionales.
+Uso:
+    python test_agent.py --peticiones 10 --carga 2
+    python test_agent.py --servidor http://localhost:11434/v1
+"""
+import argparse
+import asyncio
+import sys
+import time
 
-Cuando se te presente un conjunto de emociones, debes:
-1.  Validar y reconocer las emociones del usuario de forma empática.
-2.  Analizar la combinación de emociones para identificar posibles causas subyacentes o interacciones.
-3.  Proporcionar una serie de consejos cortos y concisos para que el usuario pueda tomar para gestionar esas emociones de forma constructiva.
+import numpy as np
 
-Tu tono debe ser siempre comprensivo, alentador y profesional.
-"""
+from servicio_consejo import MODELO, SYSTEM_MESSAGE, ServicioConsejo
+from stub_llm import StubLLM
+
+PROMPT = "{'neutral': '38.33%', 'happy': '22.47%', 'sad': '13.22%', 'fear': '12.78%', 'angry': '12.78%', 'surprise': '0.44%'}"
+
+
+async def peticion_en_frio(servidor, max_tokens):
+    """
+    Crea el cliente, abre la conexión y pide un consejo, como hacía cada
+    ventana de consejo antes del servicio compartido
+    """
+    from openai import AsyncOpenAI
+    inicio = time.perf_counter()
+    async with AsyncOpenAI(base_url=servidor, api_key="ollama", max_retries=0) as cliente:
+        stream = await cliente.chat.completions.create(
+            model=MODELO, stream=True, max_tokens=max_tokens,
+            messages=[{'role': 'system', 'content': SYSTEM_MESSAGE}, {'role': 'user', 'content': PROMPT}])
+        primer_token = None
+        tokens = 0
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if primer_token is None:
+                    primer_token = time.perf_counter() - inicio
+                tokens += 1
+    total = time.perf_counter() - inicio
+    generacion = total - primer_token
+    return {"primer_token_s": primer_token, "total_s": total, "tokens": tokens,
+            "tokens_s": (tokens - 1) / generacion if generacion > 0 and tokens > 1 else 0.0}
+
+
+def medir_en_frio(servidor, peticiones, max_tokens):
+    return [asyncio.run(peticion_en_frio(servidor, max_tokens)) for _ in range(peticiones)]
+
+
+def medir_servicio(servidor, peticiones, max_tokens):
+    servicio = ServicioConsejo(servidor=servidor)
+    try:
+        # Al abrir la aplicación: el calentamiento no bloquea al usuario
+        servicio.precalentar().result()
+        if servicio.error_precalentado:
+            raise servicio.error_precalentado
+        medidas = [servicio.pedir(PROMPT, max_tokens=max_tokens).result() for _ in range(peticiones)]
+    finally:
+        servicio.cerrar()
+    return servicio.tiempo_precalentado, medidas
+
+
+def imprimir(nombre, medidas):
+    ttft = np.array([m["primer_token_s"] for m in medidas]) * 1000
+    tokens_s = np.array([m["tokens_s"] for m in medidas])
+    print(f"{nombre:>10} | primer token p50 {np.percentile(ttft, 50):8.1f} ms  p95 {np.percentile(ttft, 95):8.1f} ms  "
+          f"máx {ttft.max():8.1f} ms | {tokens_s.mean():6.1f} tokens/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servidor", help="URL de un servidor compatible con OpenAI (por defecto, stub local)")
+    parser.add_argument("--peticiones", type=int, default=10)
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--carga", type=float, default=2.0, help="carga simulada del modelo en el stub (s)")
+    parser.add_argument("--primer-token", type=float, default=0.1, help="espera del stub hasta el primer token (s)")
+    parser.add_argument("--retardo", type=float, default=0.01, help="espera del stub entre tokens (s)")
+    args = parser.parse_args()
+
+    def servidor():
+        # Un stub nuevo por modo para que ambos empiecen con el modelo sin cargar
+        if args.servidor:
+            return args.servidor, None
+        stub = StubLLM(retardo=args.retardo, primer_token=args.primer_token, carga=args.carga)
+        return stub.url, stub
+
+    url, stub = servidor()
+    frio = medir_en_frio(url, args.peticiones, args.max_tokens)
+    if stub:
+        stub.cerrar()
+
+    url, stub = servidor()
+    precalentado, servicio = medir_servicio(url, args.peticiones, args.max_tokens)
+    if stub:
+        stub.cerrar()
 
-bot = Assistant(llm=llm_cfg, system_message=system_message)
+    print(f"{args.peticiones} peticiones contra {args.servidor or 'stub local'}")
+    imprimir("en frío", frio)
+    imprimir("servicio", servicio)
+    print(f"Calentamiento del servicio (al iniciar la app): {precalentado * 1000:.1f} ms")
+    print(f"Primera petición: en frío {frio[0]['primer_token_s'] * 1000:.1f} ms, "
+          f"con servicio {servicio[0]['primer_token_s'] * 1000:.1f} ms")
+    return 0
 
-messages = [{'role': 'user', 'content': "{'neutral': '38.33%', 'happy': '22.47%', 'sad': '13.22%', 'fear': '12.78%', 'angry': '12.78%', 'surprise': '0.44%'}"}]
 
-response_plain_text = ''
-print('bot response:')
-for response in bot.run(messages=messages):
-    response_plain_text = typewriter_print(response, response_plain_text)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
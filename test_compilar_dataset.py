@@ -0,0 +1,49 @@
+"""
+Pruebas de compilar_dataset: los lotes conservan el orden del índice
+después de una recompilación incremental.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from compilar_dataset import DatasetCompilado, compilar
+
+
+def escribir_imagenes(dataset, clase, etiqueta, nombres):
+    # El color codifica la clase y el nombre, para comprobar qué fila se leyó
+    os.makedirs(os.path.join(dataset, clase), exist_ok=True)
+    for nombre in nombres:
+        img = np.full((32, 32, 3), (etiqueta * 100, int(nombre[1:]), 0), np.uint8)
+        cv2.imwrite(os.path.join(dataset, clase, f"{nombre}.png"), img)
+
+
+def comprobar_lotes(carpeta):
+    datos = DatasetCompilado(carpeta)
+    for subconjunto in ("training", "validation"):
+        entradas = datos.subconjunto(subconjunto)
+        x, y = zip(*datos.lotes(subconjunto, lote=5, etiquetas=True))
+        y, x = np.concatenate(y), np.concatenate(x)
+        np.testing.assert_array_equal(y, datos.etiquetas(subconjunto))
+        # Canal B (último en RGB) = etiqueta * 100; canal G = número de la imagen
+        np.testing.assert_array_equal(np.round(x[:, 0, 0, 2] * 255), y * 100)
+        numeros = [int(os.path.splitext(os.path.basename(e["ruta"]))[0][1:]) for e in entradas]
+        np.testing.assert_array_equal(np.round(x[:, 0, 0, 1] * 255), numeros)
+
+
+def test_lotes_en_orden_del_indice_tras_recompilar(tmp_path):
+    dataset, salida = str(tmp_path / "dataset"), str(tmp_path / "compilado")
+    escribir_imagenes(dataset, "feliz", 0, [f"i{n:02d}" for n in range(10)])
+    escribir_imagenes(dataset, "triste", 1, [f"i{n:02d}" for n in range(10, 20)])
+    compilar(dataset, salida, procesos=1, recorte="ninguno", capacidad=4, tamano=8)
+    comprobar_lotes(salida)
+
+    # Las nuevas ocupan huecos de las borradas y fragmentos nuevos, fuera
+    # del orden del índice
+    for nombre in ("i03", "i05"):
+        os.remove(os.path.join(dataset, "feliz", f"{nombre}.png"))
+    escribir_imagenes(dataset, "feliz", 0, ["i20", "i21", "i22"])
+    escribir_imagenes(dataset, "triste", 1, ["i23", "i24"])
+    resumen = compilar(dataset, salida, procesos=1, recorte="ninguno", capacidad=4, tamano=8)
+    assert resumen["procesadas"] == 5
+    comprobar_lotes(salida)
@@ -0,0 +1,75 @@
+"""
+Pruebas de los consejos contra stub_llm: caché por perfil redondeado,
+entrega del texto por fragmentos y cancelación de una petición en curso.
+"""
+import threading
+import time
+
+import pytest
+
+from consejo import CacheConsejos
+from servicio_consejo import ServicioConsejo
+from stub_llm import RESPUESTA, StubLLM
+
+
+@pytest.fixture
+def servicio():
+    # Retardo entre tokens suficiente para cancelar a mitad de la respuesta
+    stub = StubLLM(retardo=0.02, primer_token=0.05)
+    servicio = ServicioConsejo(servidor=stub.url)
+    yield stub, servicio
+    servicio.cerrar()
+    stub.cerrar()
+
+
+def test_cache_por_perfil_redondeado(tmp_path):
+    ruta = str(tmp_path / "consejos.json")
+    cache = CacheConsejos(ruta, precision=5.0)
+    clave = cache.clave({"happy": 41.0, "sad": 59.0})
+    assert cache.obtener(clave) is None
+    cache.guardar(clave, "consejo")
+
+    # Redondean al mismo perfil (40/60): acierto, también desde disco
+    parecido = cache.clave({"happy": 42.4, "sad": 57.6})
+    assert parecido == clave
+    assert CacheConsejos(ruta, precision=5.0).obtener(parecido) == "consejo"
+    # Otro perfil u otro modelo: fallo
+    assert cache.obtener(cache.clave({"happy": 48.0, "sad": 52.0})) is None
+    assert cache.obtener(cache.clave({"happy": 41.0, "sad": 59.0}, modelo="otro")) is None
+
+
+def test_texto_por_fragmentos(servicio):
+    stub, servicio = servicio
+    parciales = []
+    medidas = servicio.pedir("{'happy': '100.00%'}", parciales.append).result(timeout=30)
+
+    assert medidas["texto"] == "".join(stub.tokens)
+    assert medidas["texto"].strip() == RESPUESTA
+    # Un llamado por token, cada uno extiende el texto anterior
+    assert len(parciales) == len(stub.tokens)
+    for anterior, actual in zip(parciales, parciales[1:]):
+        assert actual.startswith(anterior) and len(actual) > len(anterior)
+    assert parciales[-1] == medidas["texto"]
+    assert medidas["primer_token_s"] < medidas["total_s"]
+
+
+def test_cancelar_peticion(servicio):
+    stub, servicio = servicio
+    parciales = []
+    primer_fragmento = threading.Event()
+
+    def al_texto(texto):
+        parciales.append(texto)
+        primer_fragmento.set()
+
+    futuro = servicio.pedir("{'sad': '100.00%'}", al_texto)
+    assert primer_fragmento.wait(timeout=10)
+    assert futuro.cancel()
+    assert futuro.cancelled()
+
+    # Después de cancelar no llegan más fragmentos y la respuesta quedó incompleta
+    time.sleep(0.2)
+    recibidos = len(parciales)
+    time.sleep(0.2)
+    assert len(parciales) == recibidos
+    assert recibidos < len(stub.tokens)
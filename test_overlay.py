@@ -0,0 +1,39 @@
+"""
+Pruebas de overlay: la caché de sprites se aprovecha con salidas realistas
+de DeepFace.analyze (puntuaciones en porcentaje).
+"""
+import numpy as np
+
+from analisis import cara_principal, formatear_resultado, interpretar_resultados
+from overlay import OverlayRenderer, cuantizar
+
+EMOCIONES = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+
+def resultado_deepface(rng):
+    # Una cara feliz con puntuaciones que fluctúan entre frames, en 0-100
+    # como DeepFace.analyze
+    crudas = rng.dirichlet(np.ones(len(EMOCIONES)) * 0.3)
+    crudas[EMOCIONES.index('happy')] += 20
+    emociones = {e: float(v) for e, v in zip(EMOCIONES, 100 * crudas / crudas.sum())}
+    return [{
+        'emotion': emociones,
+        'dominant_emotion': max(emociones, key=emociones.get),
+        'region': {'x': 100, 'y': 80, 'w': 120, 'h': 120},
+        'face_confidence': 0.98,
+    }]
+
+
+def test_contenedor_reutiliza_sprites_con_salida_de_deepface():
+    rng = np.random.default_rng(0)
+    overlay = OverlayRenderer()
+    img = np.zeros((480, 640, 3), np.uint8)
+    for _ in range(500):
+        principal = cara_principal(interpretar_resultados(resultado_deepface(rng)))
+        assert 0 <= principal['confidence'] <= 100
+        texto, porcentaje = formatear_resultado(principal['dominant_emotion'], cuantizar(principal['confidence']))
+        overlay.contenedor(img, texto, porcentaje, (0, 215, 255))
+
+    # Con confianzas entre ~95 y 100 hay a lo sumo 11 etiquetas distintas
+    assert len(overlay.sprites) <= 11
+    assert overlay.aciertos / (overlay.aciertos + overlay.fallos) > 0.95
@@ -0,0 +1,263 @@
+"""
+Análisis de emociones sobre archivos de video grabados.
+
+Solo se decodifican por completo los frames que elige la política de
+muestreo: los intermedios se saltan con grab() (sin conversión de color) o,
+si el salto es largo, buscando directamente la posición.
+
+Uso:
+    python video.py sesion.mp4 --cada 15
+    python video.py sesion.mp4 --hz 2 --salida resultados.jsonl
+    python video.py sesion.mp4 --escena 12
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from historial import HistorialEmociones
+from motor_emociones import MOTORES
+
+
+class CadaN:
+    """
+    Analiza uno de cada 'n' frames
+    """
+
+    def __init__(self, n):
+        self.n = max(1, int(n))
+
+    def siguiente(self, indice, fps):
+        return indice + self.n
+
+    def aceptar(self, frame):
+        return True
+
+    def __str__(self):
+        return f"cada {self.n} frames"
+
+
+class FrecuenciaFija:
+    """
+    Analiza 'hz' frames por segundo de video, sin importar su fps
+    """
+
+    def __init__(self, hz):
+        self.hz = float(hz)
+        self.muestras = 0
+
+    def siguiente(self, indice, fps):
+        self.muestras += 1
+        return max(indice + 1, int(round(self.muestras * (fps or 30.0) / self.hz)))
+
+    def aceptar(self, frame):
+        return True
+
+    def __str__(self):
+        return f"{self.hz:g} Hz"
+
+
+class CambioDeEscena:
+    """
+    Revisa un frame de cada 'paso' y solo lo analiza si su miniatura difiere
+    del último frame analizado más que 'umbral' (diferencia absoluta media,
+    en niveles de gris 0-255).
+    """
+
+    def __init__(self, umbral=12.0, paso=5, tamano=(64, 36)):
+        self.umbral = umbral
+        self.paso = max(1, int(paso))
+        self.tamano = tamano
+        self.referencia = None
+
+    def siguiente(self, indice, fps):
+        return indice + self.paso
+
+    def aceptar(self, frame):
+        gray = cv2.cvtColor(cv2.resize(frame, self.tamano, interpolation=cv2.INTER_AREA),
+                            cv2.COLOR_BGR2GRAY)
+        if self.referencia is not None and cv2.absdiff(gray, self.referencia).mean() < self.umbral:
+            return False
+        self.referencia = gray
+        return True
+
+    def __str__(self):
+        return f"cambio de escena (umbral {self.umbral:g}, paso {self.paso})"
+
+
+class VideoSampler:
+    """
+    Recorre un cv2.VideoCapture entregando (índice, marca de tiempo en s,
+    frame) solo para los frames elegidos por la política.
+    """
+
+    def __init__(self, cap, politica, umbral_seek=90):
+        self.cap = cap
+        self.politica = politica
+        self.umbral_seek = umbral_seek
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.grabbed = 0
+        self.decoded = 0
+        self.seeks = 0
+        self.decode_time = 0.0
+
+    def __iter__(self):
+        indice = 0      # siguiente frame candidato
+        posicion = 0    # siguiente frame que entregará el decodificador
+        while True:
+            inicio = time.perf_counter()
+            if indice - posicion > self.umbral_seek:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, indice)
+                posicion = indice
+                self.seeks += 1
+            while posicion < indice:
+                if not self.cap.grab():
+                    self.decode_time += time.perf_counter() - inicio
+                    return
+                posicion += 1
+                self.grabbed += 1
+
+            if not self.cap.grab():
+                self.decode_time += time.perf_counter() - inicio
+                return
+            posicion += 1
+            timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and indice > 0 and self.fps:
+                timestamp = indice / self.fps
+            ret, frame = self.cap.retrieve()
+            self.decoded += 1
+            self.decode_time += time.perf_counter() - inicio
+
+            if ret and self.politica.aceptar(frame):
+                yield indice, timestamp, frame
+            indice = self.politica.siguiente(indice, self.fps)
+
+
+def analizar_video(ruta, politica, historial, analyze_fn=None, al_resultado=None, detener=None):
+    """
+    Analiza el video de 'ruta' con la política de muestreo dada y llena
+    'historial' con las marcas de tiempo reales del video. 'al_resultado'
+    recibe (timestamp, caras) tras cada frame analizado y 'detener' es un
+    threading.Event opcional para cancelar. Retorna un resumen con los fps de
+    decodificación y de análisis por separado.
+    """
+    if analyze_fn is None:
+        from analisis import analizar_caras, interpretar_resultados
+        from seguimiento import FaceIdentifier
+        identifier = FaceIdentifier()
+
+        def analyze_fn(frame):
+            return interpretar_resultados(identifier.assign(analizar_caras(frame)))
+
+    cap = cv2.VideoCapture(ruta)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {ruta}")
+
+    sampler = VideoSampler(cap, politica)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    analizados = 0
+    errores = 0
+    tiempo_analisis = 0.0
+    ultimo_timestamp = 0.0
+    inicio = time.perf_counter()
+    try:
+        for indice, timestamp, frame in sampler:
+            if detener is not None and detener.is_set():
+                break
+            t0 = time.perf_counter()
+            try:
+                caras = analyze_fn(frame)
+            except Exception:
+                caras = None
+                errores += 1
+            tiempo_analisis += time.perf_counter() - t0
+            analizados += 1
+            ultimo_timestamp = timestamp
+            if caras:
+                historial.registrar(caras, timestamp)
+            if al_resultado is not None:
+                al_resultado(timestamp, caras)
+    finally:
+        cap.release()
+    total = time.perf_counter() - inicio
+
+    leidos = sampler.grabbed + sampler.decoded
+    return {
+        "politica": str(politica),
+        "frames_video": total_frames,
+        "frames_leidos": leidos,
+        "frames_decodificados": sampler.decoded,
+        "frames_analizados": analizados,
+        "errores": errores,
+        "saltos": sampler.seeks,
+        "duracion_video_s": ultimo_timestamp,
+        "tiempo_total_s": total,
+        "fps_decodificacion": leidos / sampler.decode_time if sampler.decode_time else 0.0,
+        "fps_analisis": analizados / tiempo_analisis if tiempo_analisis else 0.0,
+        "velocidad_tiempo_real": ultimo_timestamp / total if total else 0.0,
+    }
+
+
+def politica_desde_args(args):
+    if args.hz:
+        return FrecuenciaFija(args.hz)
+    if args.escena is not None:
+        return CambioDeEscena(args.escena, paso=args.paso_escena)
+    return CadaN(args.cada)
+
+
+def agregar_argumentos_politica(parser):
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--cada", type=int, default=15, help="analizar uno de cada N frames")
+    grupo.add_argument("--hz", type=float, help="analizar a una frecuencia fija (frames por segundo de video)")
+    grupo.add_argument("--escena", type=float, metavar="UMBRAL",
+                       help="analizar solo cuando cambia la escena")
+    parser.add_argument("--paso-escena", type=int, default=5,
+                        help="frames entre comprobaciones de cambio de escena")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="ruta del archivo de video")
+    agregar_argumentos_politica(parser)
+    parser.add_argument("--salida", help="archivo JSONL con las caras de cada frame analizado")
+    parser.add_argument("--motor", choices=MOTORES, default="deepface",
+                        help="clasificador de emociones (ver motor_emociones.py)")
+    from autotune_detector import agregar_argumentos_detector, aplicar_argumentos_detector
+    agregar_argumentos_detector(parser)
+    args = parser.parse_args()
+
+    from analisis import usar_motor
+    usar_motor(args.motor)
+    # El mismo detector que la interfaz para que los resultados coincidan
+    aplicar_argumentos_detector(args)
+
+    salida = open(args.salida, "w", encoding="utf-8") if args.salida else None
+
+    def al_resultado(timestamp, caras):
+        if salida is not None:
+            registro = {"timestamp": round(timestamp, 3), "caras": caras or []}
+            salida.write(json.dumps(registro, default=lambda o: o.item(), ensure_ascii=False) + "\n")
+
+    historial = HistorialEmociones()
+    try:
+        resumen = analizar_video(args.video, politica_desde_args(args), historial,
+                                 al_resultado=al_resultado)
+    finally:
+        if salida is not None:
+            salida.close()
+
+    for clave, valor in resumen.items():
+        print(f"{clave}: {valor:.2f}" if isinstance(valor, float) else f"{clave}: {valor}")
+    if len(historial):
+        print("Emociones:")
+        for emocion, porcentaje in sorted(historial.porcentajes().items(), key=lambda x: -x[1]):
+            print(f"  {emocion}: {porcentaje:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())